@@ -0,0 +1,760 @@
+import asyncio
+import functools
+import html
+import logging
+from typing import Optional, Set, Tuple
+
+from telebot.async_telebot import AsyncTeleBot
+from telebot.asyncio_helper import ApiTelegramException
+
+from async_db_services import (
+    async_postgres_client,
+    refresh_schema_state,
+    get_all_categories_data,
+    get_categories_page,
+    get_dishes_page,
+    get_dish_parameters,
+    add_message_in_last_messages_table,
+    add_dish_selection_in_selection_dishes_table,
+    is_table_in_db,
+)
+from bot_answers import (
+    cb_admin_answer,
+    cb_create_menu_answer,
+    cb_add_category_answer,
+    cb_add_dish_answer,
+    cb_back_to_start_answer,
+    cb_menu_answer,
+    add_dish_answer,
+    cb_dishes_in_category_answer,
+    cb_back_to_menu_answer,
+    add_category_answer,
+    cb_import_menu_answer,
+    cb_unknown_answer,
+    data_export_answer,
+    report_answer,
+    report_truncated_answer,
+)
+from bot_keyboards import (
+    keyboard_cache,
+    get_keyboards_data_version,
+    build_menu_keyboard,
+    build_dishes_keyboard,
+    get_start_keyboard,
+    get_admin_keyboard as build_admin_keyboard,
+    back_to_dishes_button,
+)
+from callback_router import CallbackRouter, PageId, parse_page_id
+from config import (
+    BOT_TOKEN,
+    NAVIGATION_MODE,
+    METRICS_HOST,
+    METRICS_PORT,
+    REPORT_MAX_ROWS,
+    RETENTION_INTERVAL,
+    SEND_GLOBAL_RATE,
+    SEND_CHAT_RATE,
+    SEND_CHAT_BURST,
+    SEND_MAX_RETRIES,
+)
+from data_export import export_data_to_temporary_file
+from db_services import (
+    create_menu_tables,
+    flush_write_behind_queues,
+)
+from exceptions import DataExportError, ReportError
+from instrumentation import handler_timer
+from metrics import MetricsServer
+from reports import ReportPeriod, render_report_messages, export_report_to_temporary_file, get_report_period
+from retention import retention_job
+from send_scheduler import AsyncSendScheduler
+from services import (
+    add_category_in_menu,
+    add_dish_in_category,
+    get_nice_categories_format,
+    get_schema_status_report,
+    get_dish_parameters_report,
+    upgrade_schema,
+    get_menu_import_report,
+)
+from state_store import last_message_store
+from validators import admin_chat_validator
+
+
+logger = logging.getLogger(__name__)
+
+bot = AsyncTeleBot(BOT_TOKEN)
+# все нажатия на inline-кнопки разбираются одним обработчиком по словарю действий
+callback_router = CallbackRouter()
+bot.register_callback_query_handler(callback_router.dispatch, func=None)
+# запросы к Bot API идут через планировщик с теми же лимитами частоты и повторами после ответа 429, что и в bot_app.py
+send_scheduler = AsyncSendScheduler(
+    global_rate=SEND_GLOBAL_RATE,
+    chat_rate=SEND_CHAT_RATE,
+    chat_burst=SEND_CHAT_BURST,
+    max_retries=SEND_MAX_RETRIES,
+    api_error=ApiTelegramException,
+)
+delete_message_tasks: Set[asyncio.Task] = set()
+
+
+def rewrite_last_message(func):
+    """
+    Декоратор, созданный для перезаписи последнего сообщения.
+
+    После отправки нового сообщения запоминает его в хранилище последних сообщений отдельно для каждого чата,
+    а предыдущее сообщение этого чата удаляет в отдельной задаче, не задерживая ответ пользователю.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(update, *args):
+        result = await func(update, *args)
+        if result is None:
+            return
+
+        chat_id, message_id = result
+        if last_message_store.blocking:
+            previous_message_id = await asyncio.to_thread(last_message_store.swap, chat_id, message_id)
+        else:
+            previous_message_id = last_message_store.swap(chat_id, message_id)
+
+        if previous_message_id and previous_message_id != message_id:
+            task = asyncio.create_task(_delete_message(chat_id, previous_message_id))
+            delete_message_tasks.add(task)
+            task.add_done_callback(delete_message_tasks.discard)
+
+    return wrapper
+
+
+async def _delete_message(chat_id: int, message_id: int) -> None:
+    """
+    Удаляет сообщение бота, игнорируя ошибку, если сообщение уже удалено или слишком старое.
+
+    На ответ 429 планировщик повторяет удаление после паузы retry_after.
+    """
+
+    try:
+        await send_scheduler.call(chat_id, bot.delete_message, chat_id, message_id)
+    except ApiTelegramException:
+        pass
+
+
+async def send_answer(update, text: str, reply_markup=None, parse_mode=None) -> Tuple[int, int]:
+    """
+    Отвечает пользователю на сообщение или нажатие кнопки и возвращает id чата и id сообщения с ответом.
+
+    Работает так же, как send_answer из bot_app.py: в режиме NAVIGATION_MODE="edit" редактирует сообщение с нажатой
+    кнопкой, а если это невозможно - отправляет новое сообщение.
+    """
+
+    message = getattr(update, "message", None) or update
+    if message is not update and NAVIGATION_MODE == "edit" and message.content_type == "text":
+        try:
+            if parse_mode is None and message.text == text:
+                await send_scheduler.call(
+                    message.chat.id,
+                    bot.edit_message_reply_markup,
+                    chat_id=message.chat.id,
+                    message_id=message.message_id,
+                    reply_markup=reply_markup,
+                )
+            else:
+                await send_scheduler.call(
+                    message.chat.id,
+                    bot.edit_message_text,
+                    text=text,
+                    chat_id=message.chat.id,
+                    message_id=message.message_id,
+                    parse_mode=parse_mode,
+                    reply_markup=reply_markup,
+                )
+            return message.chat.id, message.message_id
+        except ApiTelegramException as error:
+            if "message is not modified" in str(error.description):
+                return message.chat.id, message.message_id
+
+    last_message = await send_scheduler.call(
+        message.chat.id,
+        bot.send_message,
+        chat_id=message.chat.id,
+        text=text,
+        parse_mode=parse_mode,
+        reply_markup=reply_markup,
+    )
+    return message.chat.id, last_message.id
+
+
+def admin_chat_id_validator(func):
+    """
+    Декоратор, который проверяет полученный chat_id на соответствие аккаунту администратора.
+
+    Выполняет переданную функцию в случае, если она запущена из чата администратора, в противном случае отправляет
+    сообщение об отсутствии прав у пользователя.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(message, *args) -> Optional[Tuple[int, int]]:
+        try:
+            message_chat_id = message.message.chat.id
+        except AttributeError:
+            message_chat_id = message.chat.id
+
+        if admin_chat_validator(message_chat_id):
+            return await func(message, *args)
+        return await send_answer(
+            message,
+            text="У вашего аккаунта нет прав администратора. Обратитесь к менеджеру заведения.",
+            reply_markup=get_start_keyboard(),
+        )
+
+    return wrapper
+
+
+async def get_menu_keyboard(after: int = 0) -> str:
+    """Возвращает страницу кнопок с названиями категорий, загружая ее через асинхронный пул при промахе кэша."""
+
+    # версию каталога в базе данных уже сверил get_categories_page
+    categories_page = await get_categories_page(after)
+    return keyboard_cache.get(
+        ("menu", after),
+        get_keyboards_data_version(check_version=False),
+        lambda: build_menu_keyboard(categories_page),
+    )
+
+
+async def get_dishes_keyboard(category_id, after: int = 0) -> str:
+    """Возвращает страницу кнопок с блюдами категории, загружая ее через асинхронный пул при промахе кэша."""
+
+    dishes_page = await get_dishes_page(category_id, after)
+    return keyboard_cache.get(
+        ("dishes", str(category_id), after),
+        get_keyboards_data_version(check_version=False),
+        lambda: build_dishes_keyboard(category_id, dishes_page, after),
+    )
+
+
+async def get_admin_keyboard() -> str:
+    """
+    Возвращает кнопки с функциями администратора, строя их в отдельном потоке.
+
+    При пустом или устаревшем кэше состояния схемы клавиатура обращается к базе данных через синхронный psycopg2,
+    поэтому ее нельзя строить в цикле событий.
+    """
+
+    return await asyncio.to_thread(build_admin_keyboard)
+
+
+@bot.message_handler(commands=["start"])
+@handler_timer
+@rewrite_last_message
+async def start(message) -> Tuple[int, int]:
+    """Отображает пользователю приветственное сообщение и начальное меню."""
+
+    return await send_answer(
+        message,
+        text=f"Здравствуйте, {message.from_user.full_name}, выберите действие:",
+        reply_markup=get_start_keyboard(),
+    )
+
+
+@bot.message_handler(commands=["add_category"])
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def add_category(message) -> Tuple[int, int]:
+    """Отправляет пользователю ответ о результате добавления категории в меню."""
+
+    result = await asyncio.to_thread(add_category_in_menu, message)
+    return await send_answer(
+        message,
+        text=add_category_answer.answer if result else add_category_answer.false_answer,
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@bot.message_handler(commands=["add_dish"])
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def add_dish(message) -> Tuple[int, int]:
+    """Отправляет пользователю ответ о результате добавления блюда в меню."""
+
+    result = await asyncio.to_thread(add_dish_in_category, message)
+    return await send_answer(
+        message,
+        text=add_dish_answer.answer if result else add_dish_answer.false_answer,
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@bot.message_handler(
+    content_types=["document"],
+    func=lambda message: (message.caption or "").startswith("/import_menu"),
+)
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def import_menu_from_document(message) -> Tuple[int, int]:
+    """Загружает меню из присланного документа в формате CSV или JSON и отправляет пользователю отчет об импорте."""
+
+    file_info = await bot.get_file(message.document.file_id)
+    content = await bot.download_file(file_info.file_path)
+    report = await asyncio.to_thread(
+        get_menu_import_report, content, message.document.file_name or ""
+    )
+
+    return await send_answer(
+        message,
+        text=report,
+        parse_mode="html",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@bot.message_handler(commands=["export"])
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def export_data_command(message) -> Tuple[int, int]:
+    """
+    Выгружает данные в файл и отправляет его пользователю документом.
+
+    Команда принимает источник и формат выгрузки: '/export menu csv', '/export selections jsonl'.
+    """
+
+    arguments = message.text.split()[1:]
+    source_name = arguments[0] if arguments else "menu"
+    export_format = arguments[1] if len(arguments) > 1 else "csv"
+    return await _send_data_export(message, message.chat.id, source_name, export_format)
+
+
+@callback_router.route("export", id_type=str)
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def callback_export_data(callback, source_name: str) -> Tuple[int, int]:
+    """Выгружает меню или историю выбора блюд в CSV файл и отправляет его пользователю документом."""
+
+    return await _send_data_export(callback, callback.message.chat.id, source_name, "csv")
+
+
+async def _send_data_export(
+    update, chat_id: int, source_name: str, export_format: str
+) -> Tuple[int, int]:
+    """
+    Отправляет в чат chat_id документ с выгрузкой данных и отвечает пользователю количеством выгруженных строк.
+
+    Документ не запоминается как последнее сообщение бота, поэтому остается в чате при дальнейшей навигации.
+    """
+
+    try:
+        export_file = await asyncio.to_thread(
+            export_data_to_temporary_file, source_name, export_format
+        )
+    except DataExportError as error:
+        return await send_answer(
+            update,
+            text=data_export_answer.false_answer + html.escape(str(error)),
+            parse_mode="html",
+            reply_markup=await get_admin_keyboard(),
+        )
+
+    with export_file.file:
+        await send_scheduler.call(
+            chat_id, bot.send_document, chat_id, export_file.file, visible_file_name=export_file.file_name
+        )
+
+    return await send_answer(
+        update,
+        text=f"{data_export_answer.answer}{export_file.rows}",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@bot.message_handler(content_types=["text"])
+@handler_timer
+async def handle_text_message(message) -> None:
+    """Отлавливает все текстовые сообщения переданные боту и записывает их в таблицу базы данных."""
+
+    await add_message_in_last_messages_table(message.text)
+
+
+@callback_router.route("menu")
+@handler_timer
+@rewrite_last_message
+async def callback_menu(callback) -> Tuple[int, int]:
+    """Выводит кнопки категорий меню или сообщение об его отсутствии."""
+
+    validation_result = await is_table_in_db("menu_categories")
+    return await send_answer(
+        callback,
+        text=cb_menu_answer.answer
+        if validation_result
+        else cb_menu_answer.false_answer,
+        reply_markup=await get_menu_keyboard() if validation_result else None,
+    )
+
+
+@callback_router.route("admin")
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def callback_admin(callback) -> Tuple[int, int]:
+    """Выводит кнопки с функционалом администратора если id чата соответствует зарегистрированному админскому id."""
+
+    schema_status_report = await asyncio.to_thread(get_schema_status_report)
+    return await send_answer(
+        callback,
+        text=f"{cb_admin_answer.answer}\n\n{schema_status_report}",
+        parse_mode="html",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@callback_router.route("upgrade_schema")
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def callback_upgrade_schema(callback) -> Tuple[int, int]:
+    """Создает в базе данных недостающие индексы и сообщает пользователю о результате."""
+
+    report = await asyncio.to_thread(upgrade_schema)
+    return await send_answer(
+        callback,
+        text=report,
+        parse_mode="html",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@callback_router.route("create_menu")
+@handler_timer
+@rewrite_last_message
+async def callback_create_menu(callback) -> Tuple[int, int]:
+    """При нажатии кнопки 'Создать меню' создает пустые таблицы для меню в бд и уведомит об этом пользователя."""
+
+    await asyncio.to_thread(create_menu_tables)
+
+    return await send_answer(
+        callback,
+        text=cb_create_menu_answer.answer,
+    )
+
+
+@callback_router.route("add_category")
+@handler_timer
+@rewrite_last_message
+async def callback_add_category(callback) -> Tuple[int, int]:
+    """Сообщает пользователю в ответном сообщении действия, которые нужно сделать, чтобы добавить новую категорию."""
+
+    return await send_answer(
+        callback,
+        text=cb_add_category_answer.answer,
+        parse_mode="html",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@callback_router.route("import_menu")
+@handler_timer
+@rewrite_last_message
+async def callback_import_menu(callback) -> Tuple[int, int]:
+    """Сообщает пользователю в ответном сообщении, как загрузить меню из файла."""
+
+    return await send_answer(
+        callback,
+        text=cb_import_menu_answer.answer,
+        parse_mode="html",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@callback_router.route("add_dish")
+@handler_timer
+@rewrite_last_message
+async def callback_add_dish(callback) -> Tuple[int, int]:
+    """
+    Сообщает пользователю в ответном сообщении действия, которые нужно сделать, чтобы добавить новое блюдо.
+
+    В ответном сообщении присутствуют текущие доступные категории из меню, чтобы пользователь понимал с чем работать.
+    """
+
+    categories_data = await get_all_categories_data()
+    categories_text = get_nice_categories_format(categories_data)
+
+    return await send_answer(
+        callback,
+        text=cb_add_dish_answer.answer + f"<i>{categories_text}</i>",
+        parse_mode="html",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@callback_router.route("back_to_start")
+@handler_timer
+@rewrite_last_message
+async def callback_back_to_start(callback) -> Tuple[int, int]:
+    """Отправляет пользователю кнопки стартового меню."""
+
+    return await send_answer(
+        callback,
+        text=cb_back_to_start_answer.answer,
+        reply_markup=get_start_keyboard(),
+    )
+
+
+@callback_router.route("back_to_menu")
+@handler_timer
+@rewrite_last_message
+async def callback_back_to_menu(callback) -> Tuple[int, int]:
+    """Отправляет пользователю кнопки с категориями меню."""
+
+    return await send_answer(
+        callback,
+        text=cb_back_to_menu_answer.answer,
+        reply_markup=await get_menu_keyboard(),
+    )
+
+
+@callback_router.route("categories", id_type=int)
+@handler_timer
+@rewrite_last_message
+async def callback_categories_page(callback, after: int) -> Tuple[int, int]:
+    """Отправляет пользователю страницу кнопок с категориями меню после категории after."""
+
+    return await send_answer(
+        callback,
+        text=cb_menu_answer.answer,
+        reply_markup=await get_menu_keyboard(after),
+    )
+
+
+@callback_router.route("category", id_type=parse_page_id)
+@handler_timer
+@rewrite_last_message
+async def callback_dishes_in_category(callback, page: PageId) -> Tuple[int, int]:
+    """Отображает страницу блюд категории из нажатой кнопки."""
+
+    return await send_answer(
+        callback,
+        text=cb_dishes_in_category_answer.answer,
+        reply_markup=await get_dishes_keyboard(page.id, page.after),
+    )
+
+
+@callback_router.route("dish", id_type=parse_page_id)
+@handler_timer
+@rewrite_last_message
+async def callback_parameters_from_dish(callback, page: PageId) -> Tuple[int, int]:
+    """
+    Отображает пользователю полные данные о блюде из нажатой кнопки.
+
+    Записывает данные о нажатии в таблицу для статистики. Кнопка "Назад" ведет на страницу категории, с которой
+    было выбрано блюдо. На кнопку блюда, которого уже нет в меню, отвечает так же, как на неизвестную кнопку.
+    """
+
+    dish_parameters = await get_dish_parameters(page.id)
+    if dish_parameters is None:
+        return await send_answer(
+            callback,
+            text=cb_unknown_answer.answer,
+            reply_markup=get_start_keyboard(),
+        )
+
+    # нажатие записывается только после того, как блюдо нашлось в меню
+    await add_dish_selection_in_selection_dishes_table(
+        user_name=f"{callback.from_user.full_name}", dish_id=page.id
+    )
+
+    return await send_answer(
+        callback,
+        text=get_dish_parameters_report(dish_parameters),
+        parse_mode="html",
+        reply_markup=back_to_dishes_button(dish_parameters["category_id"], page.after),
+    )
+
+
+@bot.message_handler(commands=["report"])
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def report_command(message) -> Tuple[int, int]:
+    """
+    Отправляет пользователю отчет сообщениями или файлом.
+
+    Команда принимает те же аргументы, что и /report в bot_app.py: '/report last_messages 1000',
+    '/report top_users 100 file', '/report top_dishes 10 week', '/report top_dishes 10 2023-01-01..2023-01-31 file'.
+    """
+
+    arguments = message.text.split()[1:]
+    report_name = arguments[0] if arguments else "last_messages"
+    count = 100
+    if len(arguments) > 1:
+        # некорректное количество строк заменяется на 0, и при построении отчета пользователь получит подсказку
+        count = int(arguments[1]) if arguments[1].isdigit() else 0
+    options = arguments[2:]
+    as_file = "file" in options
+    period = next((option for option in options if option != "file"), None)
+    return await _send_report(message, message.chat.id, report_name, count, as_file, period)
+
+
+@callback_router.route("top_dishes_report")
+@handler_timer
+@rewrite_last_message
+async def callback_top_dishes(callback) -> Tuple[int, int]:
+    """Отправляет пользователю информацию о топе самых популярных блюд."""
+
+    return await _send_report(callback, callback.message.chat.id, "top_dishes", 3)
+
+
+@callback_router.route("top_users_report")
+@handler_timer
+@rewrite_last_message
+async def callback_top_users(callback) -> Tuple[int, int]:
+    """Отправляет пользователю информацию о топе самых активных пользователей."""
+
+    return await _send_report(callback, callback.message.chat.id, "top_users", 3)
+
+
+@callback_router.route("last_messages_report")
+@handler_timer
+@rewrite_last_message
+async def callback_last_messages(callback) -> Tuple[int, int]:
+    """Отправляет пользователю информацию о 100 последних сообщениях полученных ботом от пользователей."""
+
+    return await _send_report(callback, callback.message.chat.id, "last_messages", 100)
+
+
+@callback_router.route("report", id_type=str)
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def callback_report_file(callback, report_name: str) -> Tuple[int, int]:
+    """Отправляет пользователю отчет report_name с максимальным количеством строк файлом."""
+
+    return await _send_report(callback, callback.message.chat.id, report_name, REPORT_MAX_ROWS, as_file=True)
+
+
+@callback_router.route("period", id_type=str)
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+async def callback_report_period(callback, report_period: str) -> Tuple[int, int]:
+    """Отправляет пользователю топ 10 из отчета за период, id кнопки имеет вид <отчет>_<период>: top_dishes_week."""
+
+    report_name, _, period = report_period.rpartition("_")
+    return await _send_report(callback, callback.message.chat.id, report_name, 10, period=period)
+
+
+async def _send_report(
+    update, chat_id: int, report_name: str, count: int, as_file: bool = False, period: Optional[str] = None
+) -> Tuple[int, int]:
+    """
+    Отправляет в чат chat_id отчет report_name из count строк сообщениями или документом.
+
+    Работает так же, как _send_report из bot_app.py: отчет делится на части не длиннее лимита Telegram, последняя
+    часть приходит вместе с кнопками администратора, а отчет, не поместившийся в REPORT_MAX_MESSAGES сообщений,
+    обрезается с подсказкой, как получить его файлом. Строки отчета читаются из базы данных в отдельном потоке.
+    """
+
+    try:
+        report_period = get_report_period(period) if period is not None else None
+        if as_file:
+            return await _send_report_file(update, chat_id, report_name, count, report_period)
+        report = await asyncio.to_thread(render_report_messages, report_name, count, period=report_period)
+    except ReportError as error:
+        return await send_answer(
+            update,
+            text=report_answer.false_answer + html.escape(str(error)),
+            parse_mode="html",
+            reply_markup=await get_admin_keyboard(),
+        )
+
+    *messages, last_message = report.messages
+    if report.truncated:
+        messages.append(last_message)
+        command = " ".join(["/report", report_name, str(count)] + ([period] if period is not None else []) + ["file"])
+        last_message = report_truncated_answer.answer + html.escape(command)
+    if not messages:
+        return await send_answer(
+            update,
+            text=last_message,
+            parse_mode="html",
+            reply_markup=await get_admin_keyboard(),
+        )
+
+    for text in messages:
+        await send_scheduler.call(chat_id, bot.send_message, chat_id=chat_id, text=text, parse_mode="html")
+    # первые части отчета уже стоят ниже сообщения с нажатой кнопкой, поэтому последняя часть отправляется
+    # новым сообщением, а не редактирует его
+    return await send_answer(
+        getattr(update, "message", None) or update,
+        text=last_message,
+        parse_mode="html",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+async def _send_report_file(
+    update, chat_id: int, report_name: str, count: int, period: Optional[ReportPeriod] = None
+) -> Tuple[int, int]:
+    """Отправляет в чат chat_id отчет report_name текстовым файлом и отвечает пользователю количеством строк."""
+
+    report_file = await asyncio.to_thread(export_report_to_temporary_file, report_name, count, period)
+    with report_file.file:
+        await send_scheduler.call(
+            chat_id, bot.send_document, chat_id, report_file.file, visible_file_name=report_file.file_name
+        )
+
+    return await send_answer(
+        update,
+        text=f"{report_answer.answer}{report_file.rows}",
+        reply_markup=await get_admin_keyboard(),
+    )
+
+
+@callback_router.unknown
+@handler_timer
+@rewrite_last_message
+async def callback_unknown(callback) -> Tuple[int, int]:
+    """Отвечает на нажатие кнопки, которую не удалось разобрать, например оставшейся от старой версии бота."""
+
+    return await send_answer(
+        callback,
+        text=cb_unknown_answer.answer,
+        reply_markup=get_start_keyboard(),
+    )
+
+
+async def main() -> None:
+    """
+    Заполняет кэш состояния схемы и запускает асинхронный опрос Telegram.
+
+    Просмотр меню и запись сообщений идут через асинхронный пул соединений, а редкие действия администратора
+    выполняются синхронными функциями из db_services и services в отдельном потоке. При заданном METRICS_PORT
+    метрики обработчиков, кэшей и очередей отдаются HTTP-сервером в фоновом потоке, а при заданном RETENTION_INTERVAL
+    в фоновом потоке по расписанию очищаются старые строки.
+    """
+
+    try:
+        await refresh_schema_state()
+    except Exception:
+        # бот запускается и без базы данных, состояние схемы заполнится при первом обращении
+        logger.exception("Не удалось прочитать схему базы данных при старте.")
+    metrics_server = MetricsServer(host=METRICS_HOST, port=METRICS_PORT) if METRICS_PORT else None
+    if metrics_server is not None:
+        metrics_server.start()
+    if RETENTION_INTERVAL and retention_job.policies:
+        retention_job.start()
+    try:
+        await bot.polling(non_stop=True, interval=0)
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        retention_job.close()
+        await async_postgres_client.close()
+        flush_write_behind_queues()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
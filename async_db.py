@@ -0,0 +1,97 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+
+class AsyncPostgresClient:
+    """
+    Асинхронный класс для работы с базой данных PostgresSQL через пул соединений asyncpg.
+
+    Пул создается при первом запросе. Для работы нужен пакет asyncpg.
+    Параметры запросов передаются через плейсхолдеры asyncpg: $1, $2 и тп.
+    """
+
+    def __init__(
+        self,
+        dbname,
+        user,
+        password,
+        host,
+        port=None,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+    ):
+        if asyncpg is None:
+            raise ImportError("Для асинхронного режима бота установите пакет asyncpg.")
+
+        self.dbname = dbname
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def get_pool(self):
+        """Возвращает пул соединений, создавая его при первом обращении."""
+
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        database=self.dbname,
+                        user=self.user,
+                        password=self.password,
+                        host=self.host,
+                        port=int(self.port) if self.port else None,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                    )
+        return self._pool
+
+    async def execute(self, query: str, *params: Any) -> None:
+        """Выполняет запрос query с параметрами params."""
+
+        pool = await self.get_pool()
+        async with pool.acquire(timeout=self.timeout) as connection:
+            await connection.execute(query, *params)
+
+    async def fetch_all(self, query: str, *params: Any) -> List[Tuple[Any, ...]]:
+        """Выполняет запрос query с параметрами params и возвращает все полученные строки в виде кортежей."""
+
+        pool = await self.get_pool()
+        async with pool.acquire(timeout=self.timeout) as connection:
+            return [tuple(record) for record in await connection.fetch(query, *params)]
+
+    async def fetch_one(self, query: str, *params: Any) -> Optional[Tuple[Any, ...]]:
+        """Выполняет запрос query с параметрами params и возвращает первую строку или None."""
+
+        pool = await self.get_pool()
+        async with pool.acquire(timeout=self.timeout) as connection:
+            record = await connection.fetchrow(query, *params)
+        return tuple(record) if record is not None else None
+
+    async def close(self) -> None:
+        """Закрывает все соединения пула."""
+
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает словарь с текущим размером пула и количеством свободных соединений."""
+
+        if self._pool is None:
+            return {"size": 0, "idle": 0, "in_use": 0, "max_size": self.max_size}
+
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        return {"size": size, "idle": idle, "in_use": size - idle, "max_size": self.max_size}
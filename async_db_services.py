@@ -0,0 +1,231 @@
+from typing import List, Tuple, Optional, Dict, Any
+
+from async_db import AsyncPostgresClient, asyncpg
+from config import (
+    DB_NAME,
+    DB_USER,
+    DB_PASSWORD,
+    DB_HOST,
+    DB_PORT,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_TIMEOUT,
+    LAST_MESSAGES_BUFFERED,
+    MENU_PAGE_SIZE,
+)
+from db_services import (
+    MenuPage,
+    catalog_cache,
+    schema_state,
+    last_messages_writer,
+    make_menu_page,
+    add_dish_selection_in_selection_dishes_table as put_dish_selection,
+    is_table_in_db as is_table_in_schema_state,
+)
+
+
+async_postgres_client = AsyncPostgresClient(
+    dbname=DB_NAME,
+    user=DB_USER,
+    password=DB_PASSWORD,
+    host=DB_HOST,
+    port=DB_PORT,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+)
+
+
+async def select_catalog_version() -> Optional[int]:
+    """Асинхронно возвращает номер версии каталога меню или None, если таблица catalog_version еще не создана."""
+
+    try:
+        row = await async_postgres_client.fetch_one("SELECT version FROM catalog_version")
+    except asyncpg.UndefinedTableError:
+        return None
+    return row[0] if row else None
+
+
+catalog_cache.async_version_loader = select_catalog_version
+
+
+async def refresh_schema_state() -> None:
+    """Асинхронно перечитывает из базы данных список таблиц и готовых индексов и сбрасывает кэш каталога."""
+
+    relations = await async_postgres_client.fetch_all(
+        """
+        SELECT table_name FROM information_schema.tables
+         WHERE table_schema NOT IN ('information_schema', 'pg_catalog')
+        UNION ALL
+        SELECT index_class.relname
+          FROM pg_index
+          JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+          JOIN pg_namespace ON pg_namespace.oid = index_class.relnamespace
+         WHERE pg_namespace.nspname NOT IN ('information_schema', 'pg_catalog', 'pg_toast')
+           AND pg_index.indisvalid
+        """
+    )
+    schema_state.refresh(lambda: relations)
+    catalog_cache.invalidate()
+
+
+async def is_table_in_db(table_name: str) -> bool:
+    """Проверяет по кэшу состояния схемы, существует ли таблица table_name, перечитывая пустой кэш через пул."""
+
+    if schema_state.is_stale():
+        await refresh_schema_state()
+    return is_table_in_schema_state(table_name)
+
+
+async def get_all_categories_data() -> List[Tuple[str, ...]]:
+    """
+    Возвращает кортежи с id и названием категории из таблицы menu_categories.
+
+    Вернет пустой список, если не найдет таблицу или категории. Данные читаются из кэша каталога.
+    """
+
+    return await catalog_cache.get_categories_async(_select_all_categories_data)
+
+
+async def _select_all_categories_data() -> List[Tuple[str, ...]]:
+    """Загружает из базы данных все категории из таблицы menu_categories."""
+
+    try:
+        return await async_postgres_client.fetch_all("SELECT * FROM menu_categories")
+    except asyncpg.UndefinedTableError:
+        return []
+
+
+async def get_dishes_from_category_where(category_id: str) -> Optional[List[Tuple[int, str]]]:
+    """Возвращает кортеж с данными из таблицы dishes, где поле category_id соответствует переданному id."""
+
+    return await catalog_cache.get_dishes_async(
+        category_id, lambda: _select_dishes_from_category_where(category_id)
+    )
+
+
+async def _select_dishes_from_category_where(category_id: str) -> Optional[List[Tuple[int, str]]]:
+    """Загружает из базы данных блюда категории category_id."""
+
+    result = await async_postgres_client.fetch_all(
+        "SELECT dish_id, name_dish FROM dishes WHERE category_id = $1", int(category_id)
+    )
+    return result if result else None
+
+
+async def get_categories_page(after: int = 0, page_size: int = MENU_PAGE_SIZE) -> MenuPage:
+    """Возвращает страницу из page_size категорий с id больше after. Страницы читаются из кэша каталога."""
+
+    return await catalog_cache.get_categories_page_async(
+        after, page_size, lambda: _select_categories_page(after, page_size)
+    )
+
+
+async def _select_categories_page(after: int, page_size: int) -> MenuPage:
+    """Загружает из базы данных страницу категорий после категории after."""
+
+    try:
+        rows = await async_postgres_client.fetch_all(
+            "SELECT category_id, name_category FROM menu_categories WHERE category_id > $1 "
+            "ORDER BY category_id LIMIT $2",
+            after,
+            page_size + 1,
+        )
+        previous_cursor = None
+        if after:
+            previous_row = await async_postgres_client.fetch_one(
+                "SELECT category_id FROM menu_categories WHERE category_id <= $1 "
+                "ORDER BY category_id DESC OFFSET $2 LIMIT 1",
+                after,
+                page_size,
+            )
+            previous_cursor = previous_row[0] if previous_row else 0
+    except asyncpg.UndefinedTableError:
+        return MenuPage([], None, None)
+    return make_menu_page(rows, page_size, previous_cursor)
+
+
+async def get_dishes_page(category_id: int, after: int = 0, page_size: int = MENU_PAGE_SIZE) -> MenuPage:
+    """Возвращает страницу из page_size блюд категории category_id с id больше after. Страницы читаются из кэша каталога."""
+
+    return await catalog_cache.get_dishes_page_async(
+        category_id, after, page_size, lambda: _select_dishes_page(category_id, after, page_size)
+    )
+
+
+async def _select_dishes_page(category_id: int, after: int, page_size: int) -> MenuPage:
+    """Загружает из базы данных страницу блюд категории category_id после блюда after."""
+
+    rows = await async_postgres_client.fetch_all(
+        "SELECT dish_id, name_dish FROM dishes WHERE category_id = $1 AND dish_id > $2 ORDER BY dish_id LIMIT $3",
+        int(category_id),
+        after,
+        page_size + 1,
+    )
+    previous_cursor = None
+    if after:
+        previous_row = await async_postgres_client.fetch_one(
+            "SELECT dish_id FROM dishes WHERE category_id = $1 AND dish_id <= $2 "
+            "ORDER BY dish_id DESC OFFSET $3 LIMIT 1",
+            int(category_id),
+            after,
+            page_size,
+        )
+        previous_cursor = previous_row[0] if previous_row else 0
+    return make_menu_page(rows, page_size, previous_cursor)
+
+
+async def get_dish_parameters(dish_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает словарь с информацией о конкретном товаре, id которого совпадает с переданным dish_id.
+
+    Вернет None, если блюда нет в меню, например если его удалили после отправки кнопки пользователю.
+    """
+
+    return await catalog_cache.get_dish_async(dish_id, lambda: _select_dish_parameters(dish_id))
+
+
+async def _select_dish_parameters(dish_id: str) -> Optional[Dict[str, Any]]:
+    """Загружает из базы данных параметры блюда dish_id. Вернет None, если блюда нет в меню."""
+
+    cursor_data = await async_postgres_client.fetch_one(
+        "SELECT * FROM dishes WHERE dish_id = $1", int(dish_id)
+    )
+    if cursor_data is None:
+        return None
+
+    return {
+        "id": cursor_data[0],
+        "dish_name": cursor_data[1],
+        "category_id": cursor_data[2],
+        "price": cursor_data[3],
+        "description": cursor_data[4],
+        "is_active": cursor_data[5],
+    }
+
+
+async def add_message_in_last_messages_table(message: str) -> None:
+    """
+    Добавляет строку message в таблицу last_messages.
+
+    При включенной настройке LAST_MESSAGES_BUFFERED сообщение ставится в общую очередь фоновой записи без ожидания:
+    при переполненной очереди оно отбрасывается, чтобы не останавливать цикл событий.
+    """
+
+    if LAST_MESSAGES_BUFFERED:
+        last_messages_writer.put((message,), block=False)
+        return
+
+    await async_postgres_client.execute(
+        "INSERT INTO last_messages (text_message) VALUES ($1)", message
+    )
+
+
+async def add_dish_selection_in_selection_dishes_table(user_name: str, dish_id: str) -> None:
+    """
+    Ставит нажатие пользователя user_name на блюдо dish_id в очередь записи в таблицу selection_dishes.
+
+    Запись ставится без ожидания: при переполненной очереди она отбрасывается, чтобы не останавливать цикл событий.
+    """
+
+    put_dish_selection(user_name, dish_id, block=False)
@@ -0,0 +1,578 @@
+import argparse
+import itertools
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from unittest import mock
+
+
+BenchmarkResult = namedtuple(
+    "BenchmarkResult", "scenario updates errors seconds updates_per_second p50 p95 p99 max api_calls"
+)
+
+
+class FakeResponse:
+    """Ответ FakeTelegramApi в том виде, в котором его разбирает telebot.apihelper."""
+
+    def __init__(self, payload: Dict[str, Any], status_code: int = 200):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = json.dumps(payload)
+        self.reason = "OK"
+
+    def json(self) -> Dict[str, Any]:
+        return self._payload
+
+
+class FakeTelegramApi:
+    """
+    Поддельный Bot API, который подставляется в telebot через apihelper.CUSTOM_REQUEST_SENDER.
+
+    Отвечает на запросы бота правдоподобными результатами без обращения к сети, при необходимости с задержкой
+    latency секунд на каждый запрос, и считает вызовы каждого метода.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1)
+        self.calls = Counter()
+
+    def __call__(self, method: str, url: str, params=None, files=None, **kwargs) -> FakeResponse:
+        api_method = url.rsplit("/", 1)[-1]
+        with self._lock:
+            self.calls[api_method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        params = params or {}
+        if api_method in ("sendMessage", "sendDocument", "editMessageText", "editMessageReplyMarkup"):
+            message_id = params.get("message_id") or next(self._message_ids)
+            result = {
+                "message_id": int(message_id),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        elif api_method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "benchmark", "username": "benchmark_bot"}
+        else:
+            result = True
+        return FakeResponse({"ok": True, "result": result})
+
+    @contextmanager
+    def installed(self) -> Iterator["FakeTelegramApi"]:
+        """Подменяет отправку запросов telebot на этот объект на время блока."""
+
+        from telebot import apihelper
+
+        with mock.patch.object(apihelper, "CUSTOM_REQUEST_SENDER", self):
+            yield self
+
+
+class StandInDatabase:
+    """
+    Заменитель базы данных в памяти процесса для прогона бенчмарка без PostgreSQL.
+
+    Подменяет функции db_services, которые обращаются к базе данных, поэтому кэши каталога, клавиатуры, очереди
+    фоновой записи и весь остальной код обработчиков работают так же, как с настоящей базой.
+    """
+
+    def __init__(self, categories: int = 10, dishes_per_category: int = 20):
+        self.categories = [(category_id, f"Категория {category_id}") for category_id in range(1, categories + 1)]
+        self.dishes = {}
+        dish_ids = itertools.count(1)
+        for category_id, _ in self.categories:
+            for _ in range(dishes_per_category):
+                dish_id = next(dish_ids)
+                self.dishes[dish_id] = {
+                    "id": dish_id,
+                    "dish_name": f"Блюдо {dish_id}",
+                    "category_id": category_id,
+                    "price": Decimal("9.90"),
+                    "description": f"Описание блюда {dish_id}",
+                    "is_active": True,
+                }
+        self._lock = threading.Lock()
+        self.dish_selections = Counter()
+        self.user_selections = Counter()
+        self.last_messages: List[str] = []
+
+    @property
+    def dish_ids(self) -> List[int]:
+        return list(self.dishes)
+
+    def select_all_categories_data(self) -> List[Tuple[int, str]]:
+        return list(self.categories)
+
+    def select_dishes_from_category_where(self, category_id: str) -> Optional[List[Tuple[int, str]]]:
+        dishes = [
+            (dish_id, dish["dish_name"])
+            for dish_id, dish in self.dishes.items()
+            if dish["category_id"] == int(category_id)
+        ]
+        return dishes or None
+
+    def select_categories_page(self, after: int, page_size: int) -> Any:
+        return self._page(self.categories, after, page_size)
+
+    def select_dishes_page(self, category_id: int, after: int, page_size: int) -> Any:
+        return self._page(self.select_dishes_from_category_where(category_id) or [], after, page_size)
+
+    def _page(self, rows: List[Tuple[int, str]], after: int, page_size: int) -> Any:
+        from db_services import make_menu_page
+
+        earlier = [row for row in rows if row[0] <= after]
+        previous_cursor = None
+        if after:
+            previous_cursor = earlier[-page_size - 1][0] if len(earlier) > page_size else 0
+        return make_menu_page([row for row in rows if row[0] > after][: page_size + 1], page_size, previous_cursor)
+
+    def select_dish_parameters(self, dish_id: str) -> Optional[Dict[str, Any]]:
+        dish = self.dishes.get(int(dish_id))
+        return dict(dish) if dish is not None else None
+
+    def select_catalog_version(self) -> int:
+        # меню прогона не меняется, поэтому версия каталога постоянна
+        return 0
+
+    def get_schema_relations_name(self) -> List[Tuple[str]]:
+        from db_services import SCHEMA_INDEXES
+
+        tables = (
+            "menu_categories",
+            "dishes",
+            "catalog_version",
+            "selection_dishes",
+            "last_messages",
+            "dish_popularity",
+            "user_popularity",
+        )
+        return [(name,) for name in tables] + [(index.name,) for index in SCHEMA_INDEXES]
+
+    def get_selection_partitions_name(self) -> List[Tuple[str]]:
+        return [("selection_dishes",), ("selection_dishes_default",)]
+
+    def insert_dish_selections(self, rows: List[Tuple[str, str, Any]]) -> None:
+        with self._lock:
+            for username, dish_id, _ in rows:
+                self.dish_selections[int(dish_id)] += 1
+                self.user_selections[username] += 1
+
+    def insert_last_messages(self, rows: List[Tuple[str]]) -> None:
+        with self._lock:
+            self.last_messages.extend(row[0] for row in rows)
+
+    def get_top_dishes(self, limit: int) -> List[Tuple[str, int]]:
+        with self._lock:
+            top = self.dish_selections.most_common(limit)
+        return [(self.dishes[dish_id]["dish_name"], count) for dish_id, count in top]
+
+    def get_top_users(self, limit: int) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self.user_selections.most_common(limit)
+
+    def get_last_messages(self, limit: int = 10) -> List[Tuple[str]]:
+        with self._lock:
+            return [(message,) for message in reversed(self.last_messages[-limit:])]
+
+    def iter_report_rows(
+        self, report_name: str, count: int, chunk_size: int = 1000, start=None, end=None
+    ) -> Iterator[List[tuple]]:
+        # все нажатия прогона сделаны в его время, поэтому отчет за период совпадает с отчетом по всей истории
+        reports = {
+            "top_dishes": self.get_top_dishes,
+            "top_users": self.get_top_users,
+            "last_messages": self.get_last_messages,
+        }
+        rows = reports[report_name](count)
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start : start + chunk_size]
+
+    @contextmanager
+    def installed(self) -> Iterator["StandInDatabase"]:
+        """Подменяет обращения к базе данных в модулях бота на этот объект на время блока."""
+
+        import bot_app
+        import bot_keyboards
+        import db_services
+        import reports
+        import services
+        import state_store
+        import validators
+
+        modules = (db_services, services, reports, validators, bot_keyboards, bot_app)
+        replacements = {
+            "_select_all_categories_data": self.select_all_categories_data,
+            "_select_dishes_from_category_where": self.select_dishes_from_category_where,
+            "_select_categories_page": self.select_categories_page,
+            "_select_dishes_page": self.select_dishes_page,
+            "_select_dish_parameters": self.select_dish_parameters,
+            "select_catalog_version": self.select_catalog_version,
+            "_get_schema_relations_name": self.get_schema_relations_name,
+            "_get_selection_partitions_name": self.get_selection_partitions_name,
+            "add_message_in_last_messages_table": lambda message: self.insert_last_messages([(message,)]),
+            "iter_report_rows": self.iter_report_rows,
+        }
+
+        with ExitStack() as stack:
+            for name, replacement in replacements.items():
+                original = getattr(db_services, name)
+                for module in modules:
+                    if getattr(module, name, None) is original:
+                        stack.enter_context(mock.patch.object(module, name, replacement))
+            stack.enter_context(
+                mock.patch.object(db_services.selection_dishes_writer, "_flush", self.insert_dish_selections)
+            )
+            stack.enter_context(
+                mock.patch.object(db_services.last_messages_writer, "_flush", self.insert_last_messages)
+            )
+            if not isinstance(bot_app.last_message_store, state_store.MemoryLastMessageStore):
+                stack.enter_context(
+                    mock.patch.object(bot_app, "last_message_store", state_store.MemoryLastMessageStore())
+                )
+            db_services.refresh_schema_state()
+            bot_keyboards.keyboard_cache.clear()
+            try:
+                yield self
+            finally:
+                # накопленные в очередях записи должны попасть в заменитель, а не в настоящую базу данных
+                db_services.flush_write_behind_queues()
+
+
+class UpdateFactory:
+    """Создает синтетические обновления Telegram в формате JSON для сообщений и нажатий на кнопки."""
+
+    def __init__(self, users: int = 1000, admin_chat_id: int = 0):
+        self.users = users
+        self.admin_chat_id = admin_chat_id
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"Пользователь {user_id}"}
+
+    def _message(self, chat_id: int, text: str) -> Dict[str, Any]:
+        message = {
+            "message_id": next(self._message_ids),
+            "from": self._user(chat_id),
+            "chat": {"id": chat_id, "type": "private"},
+            "date": int(time.time()),
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return message
+
+    def random_chat_id(self) -> int:
+        return random.randint(1, self.users)
+
+    def message(self, text: str, chat_id: Optional[int] = None) -> Dict[str, Any]:
+        """Обновление с текстовым сообщением пользователя."""
+
+        chat_id = self.random_chat_id() if chat_id is None else chat_id
+        return {"update_id": next(self._update_ids), "message": self._message(chat_id, text)}
+
+    def callback(self, data: str, chat_id: Optional[int] = None) -> Dict[str, Any]:
+        """Обновление с нажатием кнопки с данными data под сообщением бота."""
+
+        chat_id = self.random_chat_id() if chat_id is None else chat_id
+        update_id = next(self._update_ids)
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(chat_id),
+                "message": self._message(chat_id, "Выберите действие:"),
+                "chat_instance": str(chat_id),
+                "data": data,
+            },
+        }
+
+
+def menu_browsing_scenario(factory: UpdateFactory, database: "StandInDatabase") -> Dict[str, Any]:
+    """Пользователь открывает меню, листает страницы категории и возвращается назад."""
+
+    category_id, _ = random.choice(database.categories)
+    dish_id = random.choice(database.dish_ids)
+    return random.choice(
+        (
+            factory.message("/start"),
+            factory.callback("menu"),
+            factory.callback(f"category_{category_id}"),
+            factory.callback(f"category_{database.dishes[dish_id]['category_id']}_{dish_id}"),
+            factory.callback("back_to_menu"),
+            factory.callback("back_to_start"),
+        )
+    )
+
+
+def dish_views_scenario(factory: UpdateFactory, database: "StandInDatabase") -> Dict[str, Any]:
+    """Пользователь открывает карточку блюда, что еще и записывает нажатие в статистику."""
+
+    return factory.callback(f"dish_{random.choice(database.dish_ids)}")
+
+
+def admin_reports_scenario(factory: UpdateFactory, database: "StandInDatabase") -> Dict[str, Any]:
+    """Администратор открывает админ-панель и отчеты."""
+
+    return factory.callback(
+        random.choice(
+            ("admin", "top_dishes_report", "top_users_report", "last_messages_report", "period_top_dishes_week")
+        ),
+        chat_id=factory.admin_chat_id,
+    )
+
+
+def stale_buttons_scenario(factory: UpdateFactory, database: "StandInDatabase") -> Dict[str, Any]:
+    """Пользователи нажимают кнопки из старых сообщений с неизвестным действием или некорректным id."""
+
+    return factory.callback(random.choice(("category_", "dish_latest", "old_screen", f"unknown_{random.randint(1, 99)}")))
+
+
+def text_flood_scenario(factory: UpdateFactory, database: "StandInDatabase") -> Dict[str, Any]:
+    """Пользователи присылают боту произвольный текст."""
+
+    return factory.message(f"Сообщение {random.randint(1, 10 ** 6)}")
+
+
+def mixed_scenario(factory: UpdateFactory, database: "StandInDatabase") -> Dict[str, Any]:
+    """Смесь сценариев в пропорции, близкой к рабочей нагрузке бота."""
+
+    scenario = random.choices(
+        (menu_browsing_scenario, dish_views_scenario, admin_reports_scenario, text_flood_scenario),
+        weights=(50, 35, 5, 10),
+    )[0]
+    return scenario(factory, database)
+
+
+SCENARIOS: Dict[str, Callable[[UpdateFactory, "StandInDatabase"], Dict[str, Any]]] = {
+    "menu": menu_browsing_scenario,
+    "dishes": dish_views_scenario,
+    "admin": admin_reports_scenario,
+    "text": text_flood_scenario,
+    "stale": stale_buttons_scenario,
+    "mixed": mixed_scenario,
+}
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Возвращает перцентиль percent отсортированной последовательности values методом ближайшего ранга."""
+
+    if not values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def run_scenario(
+    bot: Any,
+    scenario: str,
+    factory: UpdateFactory,
+    database: "StandInDatabase",
+    telegram_api: FakeTelegramApi,
+    updates: int = 1000,
+    concurrency: int = 4,
+    warmup: int = 50,
+) -> BenchmarkResult:
+    """
+    Прогоняет через обработчики бота updates обновлений сценария scenario в concurrency потоков.
+
+    Обновления обрабатываются синхронно в потоке, который их отправил, поэтому время обработки каждого обновления
+    включает поиск обработчика, работу с кэшами и базой данных и запросы к Bot API. Первые warmup обновлений
+    прогреваются и в статистику не попадают.
+    """
+
+    from telebot import types
+
+    make_update = SCENARIOS[scenario]
+    for _ in range(warmup):
+        bot.process_new_updates([types.Update.de_json(make_update(factory, database))])
+
+    payloads = [make_update(factory, database) for _ in range(updates)]
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    api_calls_before = sum(telegram_api.calls.values())
+
+    def process(payload: Dict[str, Any]) -> None:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            bot.process_new_updates([types.Update.de_json(payload)])
+            failed = False
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="benchmark") as executor:
+        list(executor.map(process, payloads))
+    seconds = time.perf_counter() - started
+
+    latencies.sort()
+    return BenchmarkResult(
+        scenario=scenario,
+        updates=updates,
+        errors=errors,
+        seconds=seconds,
+        updates_per_second=updates / seconds if seconds else 0.0,
+        p50=percentile(latencies, 50),
+        p95=percentile(latencies, 95),
+        p99=percentile(latencies, 99),
+        max=latencies[-1] if latencies else 0.0,
+        api_calls=sum(telegram_api.calls.values()) - api_calls_before,
+    )
+
+
+def run_benchmark(
+    scenarios: Sequence[str],
+    updates: int = 1000,
+    concurrency: int = 4,
+    warmup: int = 50,
+    database: str = "stand-in",
+    api_latency: float = 0.0,
+    categories: int = 10,
+    dishes_per_category: int = 20,
+    seed: Optional[int] = None,
+    telegram_limits: bool = False,
+) -> List[BenchmarkResult]:
+    """
+    Прогоняет сценарии scenarios через настоящие обработчики bot_app и возвращает результаты по каждому.
+
+    С database="stand-in" база данных заменяется данными в памяти процесса, с database="postgres" обработчики
+    работают с базой данных из настроек окружения, в которой уже должно быть создано меню. Ограничения частоты
+    запросов к Bot API в планировщике отправки по умолчанию отключены, чтобы мерить сами обработчики,
+    telegram_limits=True их включает.
+    """
+
+    random.seed(seed)
+
+    import bot_app
+    from config import ADMIN_CHAT_ID
+    from send_scheduler import send_scheduler
+
+    admin_chat_id = int((ADMIN_CHAT_ID or "0").split()[0])
+    factory = UpdateFactory(admin_chat_id=admin_chat_id)
+    telegram_api = FakeTelegramApi(latency=api_latency)
+    stand_in = StandInDatabase(categories, dishes_per_category)
+
+    with ExitStack() as stack:
+        stack.enter_context(telegram_api.installed())
+        stack.enter_context(mock.patch.object(bot_app.bot, "threaded", False))
+        stack.enter_context(mock.patch.object(bot_app.bot, "token", bot_app.bot.token or "0:benchmark"))
+        stack.enter_context(mock.patch.object(send_scheduler, "limits_enabled", telegram_limits))
+        if database == "stand-in":
+            stack.enter_context(stand_in.installed())
+        else:
+            import db_services
+
+            db_services.refresh_schema_state()
+            stand_in.categories = db_services.get_all_categories_data() or stand_in.categories
+            dishes = {
+                dish_id: {"category_id": category_id}
+                for category_id, _ in stand_in.categories
+                for dish_id, _ in db_services.get_dishes_from_category_where(category_id) or ()
+            }
+            stand_in.dishes = dishes or stand_in.dishes
+
+        return [
+            run_scenario(
+                bot_app.bot,
+                scenario,
+                factory,
+                stand_in,
+                telegram_api,
+                updates=updates,
+                concurrency=concurrency,
+                warmup=warmup,
+            )
+            for scenario in scenarios
+        ]
+
+
+def format_results(results: Sequence[BenchmarkResult]) -> str:
+    """Возвращает таблицу с результатами бенчмарка, время указано в миллисекундах."""
+
+    lines = [
+        f"{'scenario':<10}{'updates':>9}{'errors':>8}{'upd/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+        f"{'api':>8}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result.scenario:<10}{result.updates:>9}{result.errors:>8}{result.updates_per_second:>10.1f}"
+            f"{result.p50 * 1000:>9.2f}{result.p95 * 1000:>9.2f}{result.p99 * 1000:>9.2f}"
+            f"{result.max * 1000:>9.2f}{result.api_calls:>8}"
+        )
+    return "\n".join(lines)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Возвращает парсер аргументов командной строки бенчмарка."""
+
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный прогон обработчиков бота с поддельным Bot API."
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        metavar="scenario",
+        help=f"сценарии нагрузки из {', '.join(SCENARIOS)}, по умолчанию все",
+    )
+    parser.add_argument("--updates", type=int, default=1000, help="количество обновлений на сценарий")
+    parser.add_argument("--concurrency", type=int, default=4, help="количество потоков обработки")
+    parser.add_argument("--warmup", type=int, default=50, help="количество обновлений для прогрева")
+    parser.add_argument(
+        "--database",
+        choices=("stand-in", "postgres"),
+        default="stand-in",
+        help="заменитель базы данных в памяти или PostgreSQL из настроек окружения",
+    )
+    parser.add_argument(
+        "--api-latency", type=float, default=0.0, help="задержка ответа поддельного Bot API в миллисекундах"
+    )
+    parser.add_argument("--categories", type=int, default=10, help="количество категорий в заменителе базы")
+    parser.add_argument("--dishes", type=int, default=20, help="количество блюд в категории в заменителе базы")
+    parser.add_argument(
+        "--telegram-limits", action="store_true", help="включить ограничения частоты запросов к Bot API"
+    )
+    parser.add_argument("--seed", type=int, help="начальное значение генератора случайных чисел")
+    parser.add_argument("--json", action="store_true", help="вывести результаты в формате JSON")
+    return parser
+
+
+if __name__ == "__main__":
+    parser = get_parser()
+    arguments = parser.parse_args()
+    unknown_scenarios = set(arguments.scenarios) - set(SCENARIOS)
+    if unknown_scenarios:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown_scenarios))}")
+    benchmark_results = run_benchmark(
+        arguments.scenarios or list(SCENARIOS),
+        updates=arguments.updates,
+        concurrency=arguments.concurrency,
+        warmup=arguments.warmup,
+        database=arguments.database,
+        api_latency=arguments.api_latency / 1000,
+        categories=arguments.categories,
+        dishes_per_category=arguments.dishes,
+        seed=arguments.seed,
+        telegram_limits=arguments.telegram_limits,
+    )
+    if arguments.json:
+        json.dump([result._asdict() for result in benchmark_results], sys.stdout, indent=2)
+        print()
+    else:
+        print(format_results(benchmark_results))
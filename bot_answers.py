@@ -13,6 +13,32 @@ cb_admin_answer = TrueFalseAnswer(
     false_answer="Ваш аккаунт не имеет доступа. Обратитесь к менеджеру заведения.",
 )
 
+cb_schema_status_answer = TrueFalseAnswer(
+    answer="Схема базы данных актуальна.",
+    false_answer="Схема базы данных устарела, не хватает индексов:\n",
+)
+
+cb_schema_tables_answer = TrueFalseAnswer(
+    answer=None,
+    false_answer="Схема базы данных устарела, не хватает служебных таблиц:\n",
+)
+
+cb_schema_obsolete_indexes_answer = TrueFalseAnswer(
+    answer=None,
+    false_answer="Схема базы данных устарела, остались замененные индексы:\n",
+)
+
+cb_schema_partitions_answer = TrueFalseAnswer(
+    answer=None,
+    false_answer="История выбора блюд не разбита на секции по месяцам, перенесите ее командой "
+    "<i>python manage.py partition_selections</i>",
+)
+
+cb_upgrade_schema_answer = TrueFalseAnswer(
+    answer="Схема базы данных обновлена.",
+    false_answer="Не удалось обновить схему базы данных:\n",
+)
+
 cb_create_menu_answer = TrueFalseAnswer(
     answer="Меню успешно создано, добавьте категории и позиции блюд, чтобы увидеть меню из функционала бота.",
     false_answer=None,
@@ -59,5 +85,40 @@ add_dish_answer = TrueFalseAnswer(
 
 add_category_answer = TrueFalseAnswer(
     answer="Категория успешно создана!",
-    false_answer="Вы не передали название категории или ваше название длиннее 60 символов.",
+    false_answer="Вы не передали название категории, ваше название длиннее 60 символов или такая категория уже есть.",
+)
+
+cb_import_menu_answer = TrueFalseAnswer(
+    answer="Что-бы загрузить меню из файла отправьте боту документ в формате CSV или JSON с подписью:"
+    "\n<i>'/import_menu'</i>"
+    "\n\nCSV должен содержать заголовок с колонками <i>category,dish,price,description</i>, "
+    "JSON - список объектов с такими же ключами. Недостающие категории будут созданы.",
+    false_answer=None,
+)
+
+import_menu_answer = TrueFalseAnswer(
+    answer="Импорт меню завершен. Добавлено блюд: ",
+    false_answer="Не удалось импортировать меню: ",
+)
+
+data_export_answer = TrueFalseAnswer(
+    answer="Выгрузка готова, строк в файле: ",
+    false_answer="Не удалось выгрузить данные. Используйте команду:"
+    "\n<i>'/export menu csv'</i> или <i>'/export selections jsonl'</i>\n\n",
+)
+
+report_answer = TrueFalseAnswer(
+    answer="Отчет готов, строк в файле: ",
+    false_answer="Не удалось построить отчет. Используйте команду:"
+    "\n<i>'/report last_messages 1000'</i> или <i>'/report top_users 100 file'</i>\n\n",
+)
+
+report_truncated_answer = TrueFalseAnswer(
+    answer="Отчет не поместился в сообщения, полностью его можно получить файлом командой ",
+    false_answer=None,
+)
+
+cb_unknown_answer = TrueFalseAnswer(
+    answer="Эта кнопка больше не работает. Выберите действие:",
+    false_answer=None,
 )
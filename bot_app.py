@@ -1,4 +1,7 @@
-import re
+import functools
+import html
+import logging
+from concurrent.futures import Future
 from typing import Tuple, Optional
 
 from telebot import TeleBot, apihelper
@@ -14,6 +17,11 @@ from bot_answers import (
     cb_dishes_in_category_answer,
     cb_back_to_menu_answer,
     add_category_answer,
+    cb_import_menu_answer,
+    cb_unknown_answer,
+    data_export_answer,
+    report_answer,
+    report_truncated_answer,
 )
 from bot_keyboards import (
     get_start_keyboard,
@@ -22,191 +30,533 @@ from bot_keyboards import (
     get_dishes_keyboard,
     back_to_dishes_button,
 )
-from config import BOT_TOKEN, ADMIN_CHAT_ID
+from callback_router import CallbackRouter, PageId, parse_page_id
+from config import (
+    BOT_TOKEN,
+    BOT_NUM_THREADS,
+    BOT_MODE,
+    NAVIGATION_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_WORKERS,
+    WEBHOOK_QUEUE_SIZE,
+    METRICS_HOST,
+    METRICS_PORT,
+    REPORT_MAX_ROWS,
+    RETENTION_INTERVAL,
+)
+from data_export import export_data_to_temporary_file
 from db_services import (
-    create_table_menu_categories,
-    create_table_dishes,
+    create_menu_tables,
     get_all_categories_data,
     get_dish_parameters,
-    create_table_selection_dishes,
     add_dish_selection_in_selection_dishes_table,
-    create_table_last_messages,
     add_message_in_last_messages_table,
+    flush_write_behind_queues,
 )
+from exceptions import DataExportError, ReportError
+from instrumentation import handler_timer, telegram_request_sender
+from metrics import MetricsServer
 from services import (
     add_category_in_menu,
     add_dish_in_category,
     get_nice_categories_format,
-    get_most_popular_dishes_report,
-    get_most_popular_users_report,
-    get_last_messages_report,
+    get_schema_status_report,
+    get_dish_parameters_report,
+    upgrade_schema,
+    get_menu_import_report,
 )
-from validators import get_menu_validator
+from reports import ReportPeriod, render_report_messages, export_report_to_temporary_file, get_report_period
+from retention import retention_job
+from send_scheduler import send_scheduler, PRIORITY_REPLY, PRIORITY_REPORT, PRIORITY_DELETE
+from startup import start_up
+from state_store import last_message_store
+from validators import get_menu_validator, admin_chat_validator
+from webhook_server import run_webhook_server
+
 
+logger = logging.getLogger(__name__)
 
-bot = TeleBot(BOT_TOKEN)
-last_message_data = []
+# в режиме вебхука обновления обрабатываются в потоках WebhookServer, поэтому собственный пул потоков бота не нужен
+bot = TeleBot(BOT_TOKEN, threaded=BOT_MODE != "webhook", num_threads=BOT_NUM_THREADS)
+# запросы к Bot API отправляются через функцию, которая считает их и их ошибки для метрик
+apihelper.CUSTOM_REQUEST_SENDER = telegram_request_sender
+# все нажатия на inline-кнопки разбираются одним обработчиком по словарю действий
+callback_router = CallbackRouter()
+bot.register_callback_query_handler(callback_router.dispatch, func=None)
 
 
 def rewrite_last_message(func):
-    """Декоратор, созданный для перезаписи последнего сообщения."""
+    """
+    Декоратор, созданный для перезаписи последнего сообщения.
 
-    def wrapper(*args, **kwargs):
-        global last_message_data
+    После отправки нового сообщения запоминает его в хранилище последних сообщений отдельно для каждого чата,
+    а предыдущее сообщение этого чата удаляет через планировщик отправки с низким приоритетом, не задерживая ответ
+    пользователю.
+    """
 
-        try:
-            if last_message_data:
-                bot.delete_message(*last_message_data)
-        except apihelper.ApiTelegramException:
-            pass
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        if result is None:
+            return
 
-        last_message_data = func(*args, **kwargs)
+        chat_id, message_id = result
+        previous_message_id = last_message_store.swap(chat_id, message_id)
+        if previous_message_id and previous_message_id != message_id:
+            send_scheduler.submit(
+                chat_id, _delete_message, chat_id, previous_message_id, priority=PRIORITY_DELETE
+            )
 
     return wrapper
 
 
+def _delete_message(chat_id: int, message_id: int) -> None:
+    """
+    Удаляет сообщение бота, игнорируя ошибку, если сообщение уже удалено или слишком старое.
+
+    Ошибку 429 пробрасывает, чтобы планировщик отправки повторил удаление после паузы.
+    """
+
+    try:
+        bot.delete_message(chat_id, message_id)
+    except apihelper.ApiTelegramException as error:
+        if error.error_code == 429:
+            raise
+
+
+def send_answer(
+    update, text: str, reply_markup=None, parse_mode=None, priority: int = PRIORITY_REPLY
+) -> Tuple[int, int]:
+    """
+    Отвечает пользователю на сообщение или нажатие кнопки и возвращает id чата и id сообщения с ответом.
+
+    На нажатие кнопки в режиме NAVIGATION_MODE="edit" ответ записывается в то же сообщение, в котором была нажата
+    кнопка, а если отредактировать его нельзя - отправляется новым сообщением. На сообщения пользователя и в режиме
+    NAVIGATION_MODE="send" ответ всегда отправляется новым сообщением. Запросы к Bot API идут через планировщик
+    отправки с приоритетом priority.
+    """
+
+    message = getattr(update, "message", None) or update
+    if message is not update and NAVIGATION_MODE == "edit" and message.content_type == "text":
+        try:
+            if parse_mode is None and message.text == text:
+                send_scheduler.call(
+                    message.chat.id,
+                    bot.edit_message_reply_markup,
+                    priority=priority,
+                    chat_id=message.chat.id,
+                    message_id=message.message_id,
+                    reply_markup=reply_markup,
+                )
+            else:
+                send_scheduler.call(
+                    message.chat.id,
+                    bot.edit_message_text,
+                    priority=priority,
+                    text=text,
+                    chat_id=message.chat.id,
+                    message_id=message.message_id,
+                    parse_mode=parse_mode,
+                    reply_markup=reply_markup,
+                )
+            return message.chat.id, message.message_id
+        except apihelper.ApiTelegramException as error:
+            if "message is not modified" in str(error.description):
+                return message.chat.id, message.message_id
+
+    last_message = send_scheduler.call(
+        message.chat.id,
+        bot.send_message,
+        priority=priority,
+        chat_id=message.chat.id,
+        text=text,
+        parse_mode=parse_mode,
+        reply_markup=reply_markup,
+    )
+    return message.chat.id, last_message.id
+
+
 def admin_chat_id_validator(func):
     """
     Декоратор, который проверяет полученный chat_id на соответствие аккаунту администратора.
 
     Выполняет переданную функцию в случае, если она запущена из чата администратора, в противном случае отправляет
     сообщение об отсутствии прав у пользователя.
-    Список id админов берётся из переменной окружения. По умолчанию используется заглушка.
     """
 
-    def wrapper(message) -> Optional[Tuple[int, int]]:
-        admin_chat_id = ADMIN_CHAT_ID or "0000000000"
-        list_admin_chat_id = admin_chat_id.split()
+    @functools.wraps(func)
+    def wrapper(message, *args) -> Optional[Tuple[int, int]]:
         try:
             message_chat_id = message.message.chat.id
         except AttributeError:
             message_chat_id = message.chat.id
 
-        if str(message_chat_id) in list_admin_chat_id:
-            func(message)
-            return None
-        last_message = bot.send_message(
-            chat_id=message_chat_id,
+        if admin_chat_validator(message_chat_id):
+            return func(message, *args)
+        return send_answer(
+            message,
             text="У вашего аккаунта нет прав администратора. Обратитесь к менеджеру заведения.",
             reply_markup=get_start_keyboard(),
         )
-        return message_chat_id, last_message.id
 
     return wrapper
 
 
 @bot.message_handler(commands=["start"])
+@handler_timer
 @rewrite_last_message
 def start(message) -> Tuple[int, int]:
     """Отображает пользователю приветственное сообщение и начальное меню."""
 
-    last_message = bot.send_message(
-        chat_id=message.chat.id,
+    return send_answer(
+        message,
         text=f"Здравствуйте, {message.from_user.full_name}, выберите действие:",
         reply_markup=get_start_keyboard(),
     )
-    return message.chat.id, last_message.id
 
 
 @bot.message_handler(commands=["add_category"])
+@handler_timer
 @rewrite_last_message
 @admin_chat_id_validator
 def add_category(message) -> Tuple[int, int]:
     """Отправляет пользователю ответ о результате добавления категории в меню."""
 
     result = add_category_in_menu(message)
-    last_message = bot.send_message(
-        chat_id=message.chat.id,
+    return send_answer(
+        message,
         text=add_category_answer.answer if result else add_category_answer.false_answer,
         reply_markup=get_admin_keyboard(),
     )
-    return message.chat.id, last_message.id
 
 
 @bot.message_handler(commands=["add_dish"])
+@handler_timer
 @rewrite_last_message
 @admin_chat_id_validator
 def add_dish(message) -> Tuple[int, int]:
     """Отправляет пользователю ответ о результате добавления блюда в меню."""
 
     result = add_dish_in_category(message=message)
-    last_message = bot.send_message(
-        chat_id=message.chat.id,
+    return send_answer(
+        message,
         text=add_dish_answer.answer if result else add_dish_answer.false_answer,
         reply_markup=get_admin_keyboard(),
     )
-    return message.chat.id, last_message.id
+
+
+@bot.message_handler(
+    content_types=["document"],
+    func=lambda message: (message.caption or "").startswith("/import_menu"),
+)
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+def import_menu_from_document(message) -> Tuple[int, int]:
+    """Загружает меню из присланного документа в формате CSV или JSON и отправляет пользователю отчет об импорте."""
+
+    file_info = bot.get_file(message.document.file_id)
+    content = bot.download_file(file_info.file_path)
+
+    return send_answer(
+        message,
+        text=get_menu_import_report(content, message.document.file_name or ""),
+        parse_mode="html",
+        reply_markup=get_admin_keyboard(),
+        priority=PRIORITY_REPORT,
+    )
+
+
+@bot.message_handler(commands=["export"])
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+def export_data_command(message) -> Tuple[int, int]:
+    """
+    Выгружает данные в файл и отправляет его пользователю документом.
+
+    Команда принимает источник и формат выгрузки: '/export menu csv', '/export selections jsonl'.
+    """
+
+    arguments = message.text.split()[1:]
+    source_name = arguments[0] if arguments else "menu"
+    export_format = arguments[1] if len(arguments) > 1 else "csv"
+    return _send_data_export(message, message.chat.id, source_name, export_format)
+
+
+@callback_router.route("export", id_type=str)
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+def callback_export_data(callback, source_name: str) -> Tuple[int, int]:
+    """Выгружает меню или историю выбора блюд в CSV файл и отправляет его пользователю документом."""
+
+    return _send_data_export(callback, callback.message.chat.id, source_name, "csv")
+
+
+def _send_data_export(
+    update, chat_id: int, source_name: str, export_format: str
+) -> Tuple[int, int]:
+    """
+    Отправляет в чат chat_id документ с выгрузкой данных и отвечает пользователю количеством выгруженных строк.
+
+    Документ не запоминается как последнее сообщение бота, поэтому остается в чате при дальнейшей навигации.
+    """
+
+    try:
+        export_file = export_data_to_temporary_file(source_name, export_format)
+    except DataExportError as error:
+        return send_answer(
+            update,
+            text=data_export_answer.false_answer + html.escape(str(error)),
+            parse_mode="html",
+            reply_markup=get_admin_keyboard(),
+            priority=PRIORITY_REPORT,
+        )
+
+    _submit_document(chat_id, export_file)
+
+    return send_answer(
+        update,
+        text=f"{data_export_answer.answer}{export_file.rows}",
+        reply_markup=get_admin_keyboard(),
+        priority=PRIORITY_REPORT,
+    )
+
+
+@bot.message_handler(commands=["report"])
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+def report_command(message) -> Tuple[int, int]:
+    """
+    Отправляет пользователю отчет сообщениями или файлом.
+
+    Команда принимает название отчета, количество строк, необязательный период и необязательное слово file:
+    '/report last_messages 1000', '/report top_users 100 file', '/report top_dishes 10 week',
+    '/report top_dishes 10 2023-01-01..2023-01-31 file'.
+    """
+
+    arguments = message.text.split()[1:]
+    report_name = arguments[0] if arguments else "last_messages"
+    count = 100
+    if len(arguments) > 1:
+        # некорректное количество строк заменяется на 0, и при построении отчета пользователь получит подсказку
+        count = int(arguments[1]) if arguments[1].isdigit() else 0
+    options = arguments[2:]
+    as_file = "file" in options
+    period = next((option for option in options if option != "file"), None)
+    return _send_report(message, message.chat.id, report_name, count, as_file, period)
+
+
+def _send_report(
+    update, chat_id: int, report_name: str, count: int, as_file: bool = False, period: Optional[str] = None
+) -> Tuple[int, int]:
+    """
+    Отправляет в чат chat_id отчет report_name из count строк сообщениями или документом.
+
+    Отчет сообщениями делится на части не длиннее лимита Telegram, которые отправляются по порядку, а последняя
+    часть приходит вместе с кнопками администратора. Отчет, который не поместился в REPORT_MAX_MESSAGES сообщений,
+    обрезается с подсказкой, как получить его файлом. Строки отчета читаются из базы данных частями. period -
+    описание периода отчета для get_report_period, None - отчет по всей истории.
+    """
+
+    try:
+        report_period = get_report_period(period) if period is not None else None
+        if as_file:
+            return _send_report_file(update, chat_id, report_name, count, report_period)
+        report = render_report_messages(report_name, count, period=report_period)
+    except ReportError as error:
+        return send_answer(
+            update,
+            text=report_answer.false_answer + html.escape(str(error)),
+            parse_mode="html",
+            reply_markup=get_admin_keyboard(),
+            priority=PRIORITY_REPORT,
+        )
+
+    *messages, last_message = report.messages
+    if report.truncated:
+        messages.append(last_message)
+        command = " ".join(["/report", report_name, str(count)] + ([period] if period is not None else []) + ["file"])
+        last_message = report_truncated_answer.answer + html.escape(command)
+    if not messages:
+        return send_answer(
+            update,
+            text=last_message,
+            parse_mode="html",
+            reply_markup=get_admin_keyboard(),
+            priority=PRIORITY_REPORT,
+        )
+
+    # планировщик выполняет запросы одного чата по одному в порядке постановки в очередь, поэтому части отчета
+    # приходят по порядку перед последней частью, а обработчик ждет только отправки последней части
+    for text in messages:
+        send_scheduler.submit(
+            chat_id, bot.send_message, priority=PRIORITY_REPORT, chat_id=chat_id, text=text, parse_mode="html"
+        ).add_done_callback(_log_send_error)
+    # первые части отчета уже стоят ниже сообщения с нажатой кнопкой, поэтому последняя часть отправляется
+    # новым сообщением, а не редактирует его
+    return send_answer(
+        getattr(update, "message", None) or update,
+        text=last_message,
+        parse_mode="html",
+        reply_markup=get_admin_keyboard(),
+        priority=PRIORITY_REPORT,
+    )
+
+
+def _send_report_file(
+    update, chat_id: int, report_name: str, count: int, period: Optional[ReportPeriod] = None
+) -> Tuple[int, int]:
+    """Отправляет в чат chat_id отчет report_name текстовым файлом и отвечает пользователю количеством строк."""
+
+    report_file = export_report_to_temporary_file(report_name, count, period)
+    _submit_document(chat_id, report_file)
+
+    return send_answer(
+        update,
+        text=f"{report_answer.answer}{report_file.rows}",
+        reply_markup=get_admin_keyboard(),
+        priority=PRIORITY_REPORT,
+    )
+
+
+def _submit_document(chat_id: int, document) -> None:
+    """
+    Ставит отправку файла document в чат chat_id в очередь планировщика, не дожидаясь ее, и закрывает файл после.
+
+    document - выгрузка или отчет с полями file и file_name. Перед каждой попыткой файл перематывается в начало,
+    чтобы повтор после ответа 429 не отправил пустой документ.
+    """
+
+    def send_document():
+        document.file.seek(0)
+        return bot.send_document(chat_id, document.file, visible_file_name=document.file_name)
+
+    def close_document(future: Future) -> None:
+        document.file.close()
+        _log_send_error(future)
+
+    try:
+        future = send_scheduler.submit(chat_id, send_document, priority=PRIORITY_REPORT)
+    except Exception:
+        document.file.close()
+        raise
+    future.add_done_callback(close_document)
+
+
+def _log_send_error(future: Future) -> None:
+    """Записывает в лог ошибку запроса к Bot API, результата которого обработчик не дожидался."""
+
+    error = future.exception()
+    if error is not None:
+        logger.error("Не удалось отправить сообщение через планировщик отправки.", exc_info=error)
 
 
 @bot.message_handler(content_types=["text"])
+@handler_timer
 def handle_text_message(message) -> None:
     """Отлавливает все текстовые сообщения переданные боту и записывает их в таблицу базы данных."""
 
     add_message_in_last_messages_table(message.text)
 
 
-@bot.callback_query_handler(func=lambda callback: callback.data == "menu")
+@callback_router.route("menu")
+@handler_timer
 @rewrite_last_message
 def callback_menu(callback) -> Tuple[int, int]:
     """Выводит кнопки категорий меню или сообщение об его отсутствии."""
 
     validation_result = get_menu_validator()
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
+    return send_answer(
+        callback,
         text=cb_menu_answer.answer
         if validation_result
         else cb_menu_answer.false_answer,
         reply_markup=get_menu_keyboard() if validation_result else None,
     )
-    return callback.message.chat.id, last_message.id
 
 
-@bot.callback_query_handler(func=lambda callback: callback.data == "admin")
+@callback_router.route("admin")
+@handler_timer
 @rewrite_last_message
 @admin_chat_id_validator
 def callback_admin(callback) -> Tuple[int, int]:
     """Выводит кнопки с функционалом администратора если id чата соответствует зарегистрированному админскому id."""
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
-        text=cb_admin_answer.answer,
+    return send_answer(
+        callback,
+        text=f"{cb_admin_answer.answer}\n\n{get_schema_status_report()}",
+        parse_mode="html",
+        reply_markup=get_admin_keyboard(),
+    )
+
+
+@callback_router.route("upgrade_schema")
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+def callback_upgrade_schema(callback) -> Tuple[int, int]:
+    """Создает в базе данных недостающие индексы и сообщает пользователю о результате."""
+
+    return send_answer(
+        callback,
+        text=upgrade_schema(),
+        parse_mode="html",
         reply_markup=get_admin_keyboard(),
+        priority=PRIORITY_REPORT,
     )
-    return callback.message.chat.id, last_message.id
 
 
-@bot.callback_query_handler(func=lambda callback: callback.data == "create_menu")
+@callback_router.route("create_menu")
+@handler_timer
 @rewrite_last_message
 def callback_create_menu(callback) -> Tuple[int, int]:
     """При нажатии кнопки 'Создать меню' создает пустые таблицы для меню в бд и уведомит об этом пользователя."""
 
-    create_table_menu_categories()
-    create_table_dishes()
-    create_table_selection_dishes()
-    create_table_last_messages()
+    create_menu_tables()
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
+    return send_answer(
+        callback,
         text=cb_create_menu_answer.answer,
     )
-    return callback.message.chat.id, last_message.id
 
 
-@bot.callback_query_handler(func=lambda callback: callback.data == "add_category")
+@callback_router.route("add_category")
+@handler_timer
 @rewrite_last_message
 def callback_add_category(callback) -> Tuple[int, int]:
     """Сообщает пользователю в ответном сообщении действия, которые нужно сделать, чтобы добавить новую категорию."""
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
+    return send_answer(
+        callback,
         text=cb_add_category_answer.answer,
         parse_mode="html",
         reply_markup=get_admin_keyboard(),
     )
-    return callback.message.chat.id, last_message.id
 
 
-@bot.callback_query_handler(func=lambda callback: callback.data == "add_dish")
+@callback_router.route("import_menu")
+@handler_timer
+@rewrite_last_message
+def callback_import_menu(callback) -> Tuple[int, int]:
+    """Сообщает пользователю в ответном сообщении, как загрузить меню из файла."""
+
+    return send_answer(
+        callback,
+        text=cb_import_menu_answer.answer,
+        parse_mode="html",
+        reply_markup=get_admin_keyboard(),
+    )
+
+
+@callback_router.route("add_dish")
+@handler_timer
 @rewrite_last_message
 def callback_add_dish(callback) -> Tuple[int, int]:
     """
@@ -218,128 +568,184 @@ def callback_add_dish(callback) -> Tuple[int, int]:
     categories_data = get_all_categories_data()
     categories_text = get_nice_categories_format(categories_data)
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
+    return send_answer(
+        callback,
         text=cb_add_dish_answer.answer + f"<i>{categories_text}</i>",
         parse_mode="html",
         reply_markup=get_admin_keyboard(),
     )
-    return callback.message.chat.id, last_message.id
 
 
-@bot.callback_query_handler(func=lambda callback: callback.data == "back_to_start")
+@callback_router.route("back_to_start")
+@handler_timer
 @rewrite_last_message
 def callback_back_to_start(callback) -> Tuple[int, int]:
     """Отправляет пользователю кнопки стартового меню."""
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
+    return send_answer(
+        callback,
         text=cb_back_to_start_answer.answer,
         reply_markup=get_start_keyboard(),
     )
-    return callback.message.chat.id, last_message.id
 
 
-@bot.callback_query_handler(func=lambda callback: callback.data == "back_to_menu")
+@callback_router.route("back_to_menu")
+@handler_timer
 @rewrite_last_message
 def callback_back_to_menu(callback) -> Tuple[int, int]:
     """Отправляет пользователю кнопки с категориями меню."""
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
+    return send_answer(
+        callback,
         text=cb_back_to_menu_answer.answer,
         reply_markup=get_menu_keyboard(),
     )
-    return callback.message.chat.id, last_message.id
 
 
-@bot.callback_query_handler(func=lambda callback: re.match(r"category_", callback.data))
+@callback_router.route("categories", id_type=int)
+@handler_timer
 @rewrite_last_message
-def callback_dishes_in_category(callback) -> Tuple[int, int]:
-    """Получает id категории из коллбека, и отображает все блюда этой категории."""
+def callback_categories_page(callback, after: int) -> Tuple[int, int]:
+    """Отправляет пользователю страницу кнопок с категориями меню после категории after."""
 
-    category_id = callback.data.replace("category_", "")
+    return send_answer(
+        callback,
+        text=cb_menu_answer.answer,
+        reply_markup=get_menu_keyboard(after),
+    )
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
+
+@callback_router.route("category", id_type=parse_page_id)
+@handler_timer
+@rewrite_last_message
+def callback_dishes_in_category(callback, page: PageId) -> Tuple[int, int]:
+    """Отображает страницу блюд категории из нажатой кнопки."""
+
+    return send_answer(
+        callback,
         text=cb_dishes_in_category_answer.answer,
-        reply_markup=get_dishes_keyboard(category_id),
+        reply_markup=get_dishes_keyboard(page.id, page.after),
     )
-    return callback.message.chat.id, last_message.id
 
 
-@bot.callback_query_handler(func=lambda callback: re.match(r"dish_", callback.data))
+@callback_router.route("dish", id_type=parse_page_id)
+@handler_timer
 @rewrite_last_message
-def callback_parameters_from_dish(callback) -> Tuple[int, int]:
+def callback_parameters_from_dish(callback, page: PageId) -> Tuple[int, int]:
     """
-    Отображает пользователю полные данные о блюде, получая его id из коллбека.
+    Отображает пользователю полные данные о блюде из нажатой кнопки.
 
-    Записывает данные о нажатии в таблицу для статистики.
+    Записывает данные о нажатии в таблицу для статистики. Кнопка "Назад" ведет на страницу категории, с которой
+    было выбрано блюдо. На кнопку блюда, которого уже нет в меню, отвечает так же, как на неизвестную кнопку.
     """
 
-    dish_id = callback.data.replace("dish_", "")
+    dish_parameters = get_dish_parameters(page.id)
+    if dish_parameters is None:
+        return send_answer(
+            callback,
+            text=cb_unknown_answer.answer,
+            reply_markup=get_start_keyboard(),
+        )
 
+    # нажатие записывается только после того, как блюдо нашлось в меню
     add_dish_selection_in_selection_dishes_table(
-        user_name=f"{callback.from_user.full_name}", dish_id=dish_id
+        user_name=f"{callback.from_user.full_name}", dish_id=page.id
     )
 
-    dish_parameters = get_dish_parameters(dish_id)
-
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
-        text=f"Подробности о товаре <b>{dish_parameters['dish_name']}</b>:\n\n"
-        f"<b>Цена:</b> {dish_parameters['price']}р.\n\n"
-        f"<b>Описание:</b> {dish_parameters['description']}\n\n"
-        f"{'Активен' if dish_parameters['is_active'] else 'Нет в продаже'}",
+    return send_answer(
+        callback,
+        text=get_dish_parameters_report(dish_parameters),
         parse_mode="html",
-        reply_markup=back_to_dishes_button(dish_parameters["category_id"]),
+        reply_markup=back_to_dishes_button(dish_parameters["category_id"], page.after),
     )
-    return callback.message.chat.id, last_message.id
 
 
-@bot.callback_query_handler(func=lambda callback: callback.data == "top_dishes_report")
+@callback_router.route("top_dishes_report")
+@handler_timer
 @rewrite_last_message
 def callback_top_dishes(callback) -> Tuple[int, int]:
     """Отправляет пользователю информацию о топе самых популярных блюд."""
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
-        text=get_most_popular_dishes_report(count=3),
-        parse_mode="html",
-        reply_markup=get_admin_keyboard(),
-    )
-    return callback.message.chat.id, last_message.id
+    return _send_report(callback, callback.message.chat.id, "top_dishes", 3)
 
 
-@bot.callback_query_handler(func=lambda callback: callback.data == "top_users_report")
+@callback_router.route("top_users_report")
+@handler_timer
 @rewrite_last_message
 def callback_top_users(callback) -> Tuple[int, int]:
-    """Отправляет пользователю информацию о топе самых популярных блюд."""
+    """Отправляет пользователю информацию о топе самых активных пользователей."""
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
-        text=get_most_popular_users_report(count=3),
-        parse_mode="html",
-        reply_markup=get_admin_keyboard(),
-    )
-    return callback.message.chat.id, last_message.id
+    return _send_report(callback, callback.message.chat.id, "top_users", 3)
 
 
-@bot.callback_query_handler(
-    func=lambda callback: callback.data == "last_messages_report"
-)
+@callback_router.route("last_messages_report")
+@handler_timer
 @rewrite_last_message
 def callback_last_messages(callback) -> Tuple[int, int]:
     """Отправляет пользователю информацию о 100 последних сообщениях полученных ботом от пользователей."""
 
-    last_message = bot.send_message(
-        chat_id=callback.message.chat.id,
-        text=get_last_messages_report(count=100),
-        parse_mode="html",
-        reply_markup=get_admin_keyboard(),
+    return _send_report(callback, callback.message.chat.id, "last_messages", 100)
+
+
+@callback_router.route("report", id_type=str)
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+def callback_report_file(callback, report_name: str) -> Tuple[int, int]:
+    """Отправляет пользователю отчет report_name с максимальным количеством строк файлом."""
+
+    return _send_report(callback, callback.message.chat.id, report_name, REPORT_MAX_ROWS, as_file=True)
+
+
+@callback_router.route("period", id_type=str)
+@handler_timer
+@rewrite_last_message
+@admin_chat_id_validator
+def callback_report_period(callback, report_period: str) -> Tuple[int, int]:
+    """Отправляет пользователю топ 10 из отчета за период, id кнопки имеет вид <отчет>_<период>: top_dishes_week."""
+
+    report_name, _, period = report_period.rpartition("_")
+    return _send_report(callback, callback.message.chat.id, report_name, 10, period=period)
+
+
+@callback_router.unknown
+@handler_timer
+@rewrite_last_message
+def callback_unknown(callback) -> Tuple[int, int]:
+    """Отвечает на нажатие кнопки, которую не удалось разобрать, например оставшейся от старой версии бота."""
+
+    return send_answer(
+        callback,
+        text=cb_unknown_answer.answer,
+        reply_markup=get_start_keyboard(),
     )
-    return callback.message.chat.id, last_message.id
 
 
 if __name__ == "__main__":
-    bot.polling(non_stop=True, interval=0)
+    start_up()
+    metrics_server = MetricsServer(host=METRICS_HOST, port=METRICS_PORT) if METRICS_PORT else None
+    if metrics_server is not None:
+        metrics_server.start()
+    if RETENTION_INTERVAL and retention_job.policies:
+        retention_job.start()
+    try:
+        if BOT_MODE == "webhook":
+            run_webhook_server(
+                bot,
+                url=WEBHOOK_URL,
+                host=WEBHOOK_HOST,
+                port=WEBHOOK_PORT,
+                path=WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET_TOKEN,
+                workers=WEBHOOK_WORKERS,
+                queue_size=WEBHOOK_QUEUE_SIZE,
+            )
+        else:
+            bot.remove_webhook()
+            bot.polling(non_stop=True, interval=0)
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        retention_job.close()
+        send_scheduler.close()
+        flush_write_behind_queues()
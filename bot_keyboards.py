@@ -1,51 +1,120 @@
 from telebot import types
 
+from caches import KeyboardCache
+from callback_router import make_callback_data, make_page_callback_data
+from config import KEYBOARD_CACHE_SIZE
 from db_services import (
-    get_all_categories_data,
-    get_all_tables_name_from_db,
-    get_dishes_from_category_where,
+    catalog_cache,
+    schema_state,
+    get_categories_page,
+    is_table_in_db,
+    get_missing_schema_indexes,
+    get_missing_schema_tables,
+    get_obsolete_schema_indexes,
+    get_dishes_page,
 )
 
 
-def get_start_keyboard():
+keyboard_cache = KeyboardCache(maxsize=KEYBOARD_CACHE_SIZE)
+
+
+def get_start_keyboard() -> str:
     """Возвращает кнопки выпадающие при старте бота."""
 
+    return keyboard_cache.get(("start",), None, _build_start_keyboard)
+
+
+def get_menu_keyboard(after: int = 0) -> str:
+    """Возвращает страницу кнопок с названиями категорий после категории after, если таковые имеются."""
+
+    return keyboard_cache.get(
+        ("menu", after),
+        get_keyboards_data_version(),
+        lambda: build_menu_keyboard(get_categories_page(after)),
+    )
+
+
+def get_admin_keyboard() -> str:
+    """Возвращает кнопки с функциями администратора."""
+
+    return keyboard_cache.get(("admin",), schema_state.version, _build_admin_keyboard)
+
+
+def get_dishes_keyboard(category_id, after: int = 0) -> str:
+    """Возвращает страницу кнопок с позициями из конкретной категории меню после блюда after."""
+
+    return keyboard_cache.get(
+        ("dishes", str(category_id), after),
+        get_keyboards_data_version(),
+        lambda: build_dishes_keyboard(category_id, get_dishes_page(category_id, after), after),
+    )
+
+
+def back_to_dishes_button(category_id: int, after: int = 0) -> str:
+    """Возвращает кнопку для перехода к странице after блюд соответствующей категории меню."""
+
+    return keyboard_cache.get(
+        ("back_to_dishes", str(category_id), after),
+        None,
+        lambda: _build_back_to_dishes_button(category_id, after),
+    )
+
+
+def get_keyboards_data_version(check_version: bool = True):
+    """
+    Возвращает версию данных каталога и схемы, от которых зависят клавиатуры меню.
+
+    Готовая клавиатура читается без обращения к кэшу каталога, поэтому перед чтением версии кэш каталога сверяет
+    ее с базой данных. check_version=False пропускает сверку, если ее уже выполнил вызывающий код, например
+    асинхронный бот при загрузке страницы меню.
+    """
+
+    if check_version:
+        catalog_cache.check_version()
+    return catalog_cache.version, schema_state.version
+
+
+def _build_start_keyboard() -> str:
+    """Строит кнопки выпадающие при старте бота."""
+
     keyboard = types.InlineKeyboardMarkup()
     keyboard.add(types.InlineKeyboardButton(text="Меню", callback_data="menu"))
     keyboard.add(
         types.InlineKeyboardButton(text="Панель администратора", callback_data="admin")
     )
-    return keyboard
+    return keyboard.to_json()
 
 
-def get_menu_keyboard():
-    """Возвращает кнопки с названиями категорий, если таковые имеются."""
+def build_menu_keyboard(categories_page) -> str:
+    """Строит кнопки с названиями категорий из страницы categories_page и кнопки перехода между страницами."""
 
-    categories_data = get_all_categories_data()
     keyboard = types.InlineKeyboardMarkup()
     keyboard.add(
         types.InlineKeyboardButton(text="Назад", callback_data="back_to_start")
     )
-    if categories_data:
-        for category_id, category_name in categories_data:
-            keyboard.add(
-                types.InlineKeyboardButton(
-                    text=category_name, callback_data="category_" + str(category_id)
-                )
+    for category_id, category_name in categories_page.items:
+        keyboard.add(
+            types.InlineKeyboardButton(
+                text=category_name, callback_data=make_callback_data("category", category_id)
             )
-    return keyboard
+        )
+    _add_page_buttons(
+        keyboard,
+        categories_page,
+        lambda cursor: make_callback_data("categories", cursor) if cursor else "menu",
+    )
+    return keyboard.to_json()
 
 
-def get_admin_keyboard():
-    """Возвращает кнопки с функциями администратора."""
+def _build_admin_keyboard() -> str:
+    """Строит кнопки с функциями администратора."""
 
     keyboard = types.InlineKeyboardMarkup()
-    all_tables_in_db = get_all_tables_name_from_db()
 
     keyboard.add(
         types.InlineKeyboardButton(text="Назад", callback_data="back_to_start")
     )
-    if ("menu_categories",) not in all_tables_in_db:
+    if not is_table_in_db("menu_categories"):
         keyboard.add(
             types.InlineKeyboardButton(text="Создать меню", callback_data="create_menu")
         )
@@ -60,52 +129,112 @@ def get_admin_keyboard():
                 text="Добавить блюдо в категорию", callback_data="add_dish"
             )
         )
+        keyboard.add(
+            types.InlineKeyboardButton(
+                text="Загрузить меню из файла", callback_data="import_menu"
+            )
+        )
+        keyboard.add(
+            types.InlineKeyboardButton(text="Выгрузить меню", callback_data=make_callback_data("export", "menu")),
+            types.InlineKeyboardButton(
+                text="Выгрузить историю выбора", callback_data=make_callback_data("export", "selections")
+            ),
+        )
         keyboard.add(
             types.InlineKeyboardButton(
                 text="Топ 3 самых популярных блюда", callback_data="top_dishes_report"
             )
         )
+        keyboard.add(
+            types.InlineKeyboardButton(
+                text="Блюда за сегодня", callback_data=make_callback_data("period", "top_dishes_today")
+            ),
+            types.InlineKeyboardButton(
+                text="Блюда за 7 дней", callback_data=make_callback_data("period", "top_dishes_week")
+            ),
+        )
         keyboard.add(
             types.InlineKeyboardButton(
                 text="Топ 3 самых активных пользователя",
                 callback_data="top_users_report",
             )
         )
+        keyboard.add(
+            types.InlineKeyboardButton(
+                text="Пользователи за сегодня", callback_data=make_callback_data("period", "top_users_today")
+            ),
+            types.InlineKeyboardButton(
+                text="Пользователи за 7 дней", callback_data=make_callback_data("period", "top_users_week")
+            ),
+        )
         keyboard.add(
             types.InlineKeyboardButton(
                 text="Последние полученные сообщения",
                 callback_data="last_messages_report",
-            )
+            ),
+            types.InlineKeyboardButton(
+                text="Файлом", callback_data=make_callback_data("report", "last_messages")
+            ),
         )
+        if get_missing_schema_tables() or get_missing_schema_indexes() or get_obsolete_schema_indexes():
+            keyboard.add(
+                types.InlineKeyboardButton(
+                    text="Обновить схему базы данных",
+                    callback_data="upgrade_schema",
+                )
+            )
+
+    return keyboard.to_json()
 
-    return keyboard
 
+def build_dishes_keyboard(category_id, dishes_page, after: int = 0) -> str:
+    """
+    Строит кнопки соответствующие позициям из страницы after блюд категории category_id.
 
-def get_dishes_keyboard(category_id):
-    """Возвращает кнопки соответствующие позициям из конкретной категории меню."""
+    Кнопки блюд запоминают курсор страницы, чтобы кнопка "Назад" из карточки блюда вернула на эту же страницу.
+    """
 
     keyboard = types.InlineKeyboardMarkup()
-    all_dishes_from_category = get_dishes_from_category_where(category_id)
 
     keyboard.add(types.InlineKeyboardButton(text="Назад", callback_data="back_to_menu"))
 
-    if all_dishes_from_category:
-        for dish_id, dish_name in all_dishes_from_category:
-            keyboard.add(
-                types.InlineKeyboardButton(
-                    text=dish_name, callback_data="dish_" + str(dish_id)
-                )
+    for dish_id, dish_name in dishes_page.items:
+        keyboard.add(
+            types.InlineKeyboardButton(
+                text=dish_name, callback_data=make_page_callback_data("dish", dish_id, after)
             )
-    return keyboard
+        )
+    _add_page_buttons(
+        keyboard,
+        dishes_page,
+        lambda cursor: make_page_callback_data("category", category_id, cursor),
+    )
+    return keyboard.to_json()
 
 
-def back_to_dishes_button(category_id: int):
-    """Возвращает кнопку для перехода блюдам соответствующей категории меню."""
+def _build_back_to_dishes_button(category_id, after: int = 0) -> str:
+    """Строит кнопку для перехода к странице after блюд соответствующей категории меню."""
 
     keyboard = types.InlineKeyboardMarkup()
     keyboard.add(
         types.InlineKeyboardButton(
-            text="Назад", callback_data=f"category_{category_id}"
+            text="Назад", callback_data=make_page_callback_data("category", category_id, after)
         )
     )
-    return keyboard
+    return keyboard.to_json()
+
+
+def _add_page_buttons(keyboard, page, make_page_callback) -> None:
+    """Добавляет в keyboard кнопки перехода на предыдущую и следующую страницы page, если они есть."""
+
+    buttons = []
+    if page.previous_cursor is not None:
+        buttons.append(
+            types.InlineKeyboardButton(text="« Предыдущие", callback_data=make_page_callback(page.previous_cursor))
+        )
+    if page.next_cursor is not None:
+        buttons.append(
+            types.InlineKeyboardButton(text="Следующие »", callback_data=make_page_callback(page.next_cursor))
+        )
+    if buttons:
+        keyboard.row(*buttons)
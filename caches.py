@@ -0,0 +1,349 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_ALL_CATEGORIES = "all"
+
+
+class MenuCatalogCache:
+    """
+    Потокобезопасный кэш каталога меню: категории, блюда по категориям, страницы этих списков и параметры блюд.
+
+    Данные загружаются из базы при первом обращении через переданную функцию loader и хранятся до инвалидации.
+    У каждого метода чтения есть асинхронный вариант, который принимает корутинную функцию loader.
+    При каждой инвалидации увеличивается version, по которой зависимые кэши понимают, что каталог изменился.
+
+    Чтобы замечать изменения меню, сделанные другими процессами, кэш не чаще раза в check_interval секунд сверяет
+    версию каталога в базе данных через version_loader (или async_version_loader в асинхронных методах) и полностью
+    очищается, если она изменилась. Независимо от версии кэш очищается через ttl секунд после заполнения,
+    ttl=0 - без ограничения.
+    """
+
+    def __init__(
+        self,
+        version_loader: Optional[Callable[[], Optional[int]]] = None,
+        async_version_loader: Optional[Callable[[], Awaitable[Optional[int]]]] = None,
+        check_interval: float = 5.0,
+        ttl: float = 0,
+    ):
+        self.version_loader = version_loader
+        self.async_version_loader = async_version_loader
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._categories: Dict[str, Any] = {}
+        self._dishes_by_category: Dict[str, Any] = {}
+        self._dishes: Dict[str, Any] = {}
+        self._category_pages: Dict[Tuple[int, int], Any] = {}
+        self._dish_pages: Dict[Tuple[str, int, int], Any] = {}
+        self._db_version: Optional[int] = None
+        self._next_check = 0.0
+        self._expires_at = time.monotonic() + ttl if ttl else None
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_categories(self, loader: Callable[[], List[Any]]) -> List[Any]:
+        """Возвращает список категорий меню, загружая его через loader при отсутствии в кэше."""
+
+        return self._get(self._categories, _ALL_CATEGORIES, loader)
+
+    def get_dishes(self, category_id, loader: Callable[[], Any]) -> Any:
+        """Возвращает блюда категории category_id, загружая их через loader при отсутствии в кэше."""
+
+        return self._get(self._dishes_by_category, str(category_id), loader)
+
+    def get_dish(self, dish_id, loader: Callable[[], Any]) -> Any:
+        """Возвращает параметры блюда dish_id, загружая их через loader при отсутствии в кэше."""
+
+        return self._get(self._dishes, str(dish_id), loader)
+
+    def get_categories_page(self, after: int, page_size: int, loader: Callable[[], Any]) -> Any:
+        """Возвращает страницу категорий после after, загружая ее через loader при отсутствии в кэше."""
+
+        return self._get(self._category_pages, (after, page_size), loader)
+
+    def get_dishes_page(self, category_id, after: int, page_size: int, loader: Callable[[], Any]) -> Any:
+        """Возвращает страницу блюд категории category_id после after, загружая ее через loader при отсутствии в кэше."""
+
+        return self._get(self._dish_pages, (str(category_id), after, page_size), loader)
+
+    async def get_categories_async(self, loader: Callable[[], Awaitable[List[Any]]]) -> List[Any]:
+        """Асинхронный вариант get_categories."""
+
+        return await self._get_async(self._categories, _ALL_CATEGORIES, loader)
+
+    async def get_dishes_async(self, category_id, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Асинхронный вариант get_dishes."""
+
+        return await self._get_async(self._dishes_by_category, str(category_id), loader)
+
+    async def get_dish_async(self, dish_id, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Асинхронный вариант get_dish."""
+
+        return await self._get_async(self._dishes, str(dish_id), loader)
+
+    async def get_categories_page_async(
+        self, after: int, page_size: int, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Асинхронный вариант get_categories_page."""
+
+        return await self._get_async(self._category_pages, (after, page_size), loader)
+
+    async def get_dishes_page_async(
+        self, category_id, after: int, page_size: int, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Асинхронный вариант get_dishes_page."""
+
+        return await self._get_async(self._dish_pages, (str(category_id), after, page_size), loader)
+
+    def invalidate_categories(self) -> None:
+        """Сбрасывает закэшированный список категорий и его страницы."""
+
+        with self._lock:
+            self._categories.clear()
+            self._category_pages.clear()
+            self.version += 1
+
+    def invalidate_category(self, category_id) -> None:
+        """Сбрасывает закэшированный список блюд категории category_id и его страницы."""
+
+        category_id = str(category_id)
+        with self._lock:
+            self._dishes_by_category.pop(category_id, None)
+            for key in [key for key in self._dish_pages if key[0] == category_id]:
+                del self._dish_pages[key]
+            self.version += 1
+
+    def invalidate(self) -> None:
+        """Полностью очищает кэш каталога."""
+
+        with self._lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        """Очищает все записи кэша и увеличивает version. Вызывается под блокировкой."""
+
+        self._categories.clear()
+        self._dishes_by_category.clear()
+        self._dishes.clear()
+        self._category_pages.clear()
+        self._dish_pages.clear()
+        self._expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self.version += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счетчики попаданий и промахов кэша и количество закэшированных записей."""
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "version": self.version,
+                "categories": len(self._categories.get(_ALL_CATEGORIES) or []),
+                "dish_lists": len(self._dishes_by_category),
+                "dishes": len(self._dishes),
+                "pages": len(self._category_pages) + len(self._dish_pages),
+            }
+
+    def _get(self, store: Dict[Hashable, Any], key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Возвращает значение key из store или загружает его через loader.
+
+        Загрузка идет без блокировки, а результат сохраняется, только если каталог не был инвалидирован за это время.
+        """
+
+        self.check_version()
+        value, version = self._lookup(store, key)
+        if value is _MISSING:
+            value = loader()
+            self._store(store, key, value, version)
+        return value
+
+    async def _get_async(
+        self, store: Dict[Hashable, Any], key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Асинхронный вариант _get."""
+
+        await self.check_version_async()
+        value, version = self._lookup(store, key)
+        if value is _MISSING:
+            value = await loader()
+            self._store(store, key, value, version)
+        return value
+
+    def check_version(self) -> None:
+        """
+        Очищает кэш, если истек ttl или изменилась версия каталога в базе данных.
+
+        Версия сверяется через version_loader не чаще раза в check_interval секунд. Вызывается при каждом чтении
+        кэша, а также кэшами, которые строятся из каталога и читаются без обращения к нему, например клавиатурами.
+        """
+
+        if self._claim_version_check() and self.version_loader is not None:
+            self._apply_db_version(self._load_db_version(self.version_loader))
+
+    async def check_version_async(self) -> None:
+        """Асинхронный вариант check_version, сверяет версию через async_version_loader."""
+
+        if self._claim_version_check() and self.async_version_loader is not None:
+            try:
+                db_version = await self.async_version_loader()
+            except Exception:
+                logger.warning("Не удалось проверить версию каталога меню в базе данных.", exc_info=True)
+                db_version = None
+            self._apply_db_version(db_version)
+
+    def _claim_version_check(self) -> bool:
+        """
+        Очищает кэш, если истек ttl, и проверяет, пора ли сверить версию каталога в базе данных.
+
+        Возвращает True только одному из потоков за check_interval секунд, остальные продолжают читать кэш.
+        """
+
+        now = time.monotonic()
+        if now < self._next_check and (self._expires_at is None or now < self._expires_at):
+            return False
+        with self._lock:
+            if self._expires_at is not None and now >= self._expires_at:
+                self._clear()
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.check_interval
+            return True
+
+    @staticmethod
+    def _load_db_version(version_loader: Callable[[], Optional[int]]) -> Optional[int]:
+        """Загружает версию каталога через version_loader, при ошибке базы данных возвращает None."""
+
+        try:
+            return version_loader()
+        except Exception:
+            logger.warning("Не удалось проверить версию каталога меню в базе данных.", exc_info=True)
+            return None
+
+    def _apply_db_version(self, db_version: Optional[int]) -> None:
+        """Очищает кэш, если версия каталога в базе данных отличается от версии при прошлой проверке."""
+
+        if db_version is None:
+            return
+        with self._lock:
+            if self._db_version is not None and db_version != self._db_version:
+                self._clear()
+            self._db_version = db_version
+
+    def _lookup(self, store: Dict[Hashable, Any], key: Hashable) -> Tuple[Any, int]:
+        """Ищет key в store и учитывает попадание или промах. Возвращает значение или _MISSING и текущую версию."""
+
+        with self._lock:
+            if key in store:
+                self.hits += 1
+                return store[key], self.version
+            self.misses += 1
+            return _MISSING, self.version
+
+    def _store(self, store: Dict[Hashable, Any], key: Hashable, value: Any, version: int) -> None:
+        """Сохраняет загруженное значение, если с момента промаха каталог не был инвалидирован."""
+
+        with self._lock:
+            if version == self.version:
+                store[key] = value
+
+
+class SchemaStateCache:
+    """
+    Потокобезопасный кэш состояния схемы базы данных: набор названий существующих таблиц и рабочих индексов.
+
+    Заполняется при первом обращении или явным вызовом refresh и не обращается к системным каталогам до следующего
+    обновления. С max_age больше 0 кэш перечитывается при обращении, если с последнего обновления прошло больше
+    max_age секунд, чтобы замечать изменения схемы, сделанные другими процессами. Каждое обновление увеличивает
+    version.
+    """
+
+    def __init__(self, max_age: float = 0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._relations: Optional[frozenset] = None
+        self._refreshed_at = 0.0
+        self.version = 0
+
+    def refresh(self, loader: Callable[[], List[Any]]) -> None:
+        """Перечитывает набор таблиц и индексов через loader, который возвращает кортежи с их названиями."""
+
+        relations = frozenset(row[0] for row in loader())
+        with self._lock:
+            self._relations = relations
+            self._refreshed_at = time.monotonic()
+            self.version += 1
+
+    def has_relation(self, relation_name: str, loader: Callable[[], List[Any]]) -> bool:
+        """
+        Проверяет, есть ли в базе данных таблица или индекс relation_name.
+
+        При пустом или устаревшем кэше сначала заполняет его через loader.
+        """
+
+        if self.is_stale():
+            self.refresh(loader)
+        return relation_name in self._relations
+
+    def is_stale(self) -> bool:
+        """Проверяет, нужно ли перечитать кэш: он еще не заполнен или с последнего обновления прошло max_age секунд."""
+
+        return self._relations is None or bool(
+            self.max_age and time.monotonic() - self._refreshed_at > self.max_age
+        )
+
+
+class KeyboardCache:
+    """
+    Потокобезопасный LRU-кэш готовых клавиатур в виде сериализованного JSON reply_markup.
+
+    Каждая запись хранится вместе с версией данных, из которых она построена. Если версия изменилась, клавиатура
+    строится заново. Количество записей ограничено maxsize, лишние вытесняются по давности использования.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: Hashable, builder: Callable[[], str]) -> str:
+        """Возвращает клавиатуру по ключу key для версии данных version, при промахе строит ее через builder."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        markup = builder()
+
+        with self._lock:
+            self._entries[key] = (version, markup)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return markup
+
+    def clear(self) -> None:
+        """Очищает кэш клавиатур."""
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счетчики попаданий и промахов кэша и количество закэшированных клавиатур."""
+
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,121 @@
+import logging
+from collections import namedtuple
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# разделитель действия и id в callback_data кнопок: category_5, dish_12
+SEPARATOR = "_"
+
+# разобранное callback_data кнопки: название действия и id в типе, указанном при регистрации действия
+CallbackData = namedtuple("CallbackData", "action id")
+
+# id кнопки, которая ведет на страницу списка: id объекта, например категории, и курсор страницы, 0 - первая страница
+PageId = namedtuple("PageId", "id after")
+
+# зарегистрированное действие: обработчик и функция, приводящая строку id к нужному типу, или None для действий без id
+CallbackRoute = namedtuple("CallbackRoute", "handler id_type")
+
+
+def make_callback_data(action: str, callback_id: Any = None) -> str:
+    """Собирает callback_data кнопки из названия действия и id, которое разберет CallbackRouter."""
+
+    if callback_id is None:
+        return action
+    return f"{action}{SEPARATOR}{callback_id}"
+
+
+def make_page_callback_data(action: str, object_id: int, after: int = 0) -> str:
+    """Собирает callback_data кнопки с id объекта и курсором страницы, которое разберет parse_page_id."""
+
+    return make_callback_data(action, f"{object_id}{SEPARATOR}{after}" if after else object_id)
+
+
+def parse_page_id(raw_id: str) -> PageId:
+    """
+    Разбирает id кнопки вида <id> или <id>_<курсор страницы> в PageId.
+
+    Кнопки без курсора, в том числе из сообщений, отправленных до появления страниц, ведут на первую страницу.
+    """
+
+    object_id, separator, after = raw_id.partition(SEPARATOR)
+    return PageId(int(object_id), int(after) if separator else 0)
+
+
+class CallbackRouter:
+    """
+    Маршрутизатор нажатий на inline-кнопки по словарю действий.
+
+    Регистрируется в боте одним обработчиком и сам разбирает callback_data на действие и id, поэтому время выбора
+    обработчика не зависит от количества экранов. Действие без id ищется по callback_data целиком, действие с id -
+    по части до первого разделителя, а остаток приводится к типу id_type. Нажатия с неизвестным действием или
+    некорректным id передаются обработчику unknown_handler.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, CallbackRoute] = {}
+        self.unknown_handler: Optional[Callable] = None
+
+    def route(self, action: str, id_type: Optional[Callable[[str], Any]] = None) -> Callable:
+        """
+        Декоратор, который регистрирует обработчик нажатий на кнопки действия action.
+
+        Если задан id_type, обработчик вызывается с двумя аргументами: нажатием и id, приведенным к типу id_type.
+        """
+
+        if SEPARATOR in action and id_type is not None:
+            raise ValueError(f"Название действия с id не может содержать разделитель {SEPARATOR!r}: {action}")
+
+        def decorator(handler: Callable) -> Callable:
+            if action in self._routes:
+                raise ValueError(f"Действие {action} уже зарегистрировано.")
+            self._routes[action] = CallbackRoute(handler, id_type)
+            return handler
+
+        return decorator
+
+    def unknown(self, handler: Callable) -> Callable:
+        """Декоратор, который регистрирует обработчик нажатий на кнопки, которые не удалось разобрать."""
+
+        self.unknown_handler = handler
+        return handler
+
+    def resolve(self, data: Optional[str]) -> Tuple[Optional[CallbackRoute], Optional[CallbackData]]:
+        """
+        Возвращает зарегистрированное действие для callback_data и разобранные данные кнопки.
+
+        Если callback_data не подходит ни к одному действию или его id не приводится к нужному типу,
+        возвращает (None, None).
+        """
+
+        if not data:
+            return None, None
+
+        route = self._routes.get(data)
+        if route is not None and route.id_type is None:
+            return route, CallbackData(data, None)
+
+        action, separator, raw_id = data.partition(SEPARATOR)
+        if not separator:
+            return None, None
+        route = self._routes.get(action)
+        if route is None or route.id_type is None:
+            return None, None
+        try:
+            return route, CallbackData(action, route.id_type(raw_id))
+        except (TypeError, ValueError):
+            return None, None
+
+    def dispatch(self, callback) -> Any:
+        """Вызывает обработчик действия нажатия callback и возвращает его результат."""
+
+        route, callback_data = self.resolve(callback.data)
+        if route is None:
+            logger.info("Неизвестное нажатие на кнопку: %r", callback.data)
+            if self.unknown_handler is None:
+                return None
+            return self.unknown_handler(callback)
+        if route.id_type is None:
+            return route.handler(callback)
+        return route.handler(callback, callback_data.id)
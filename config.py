@@ -16,3 +16,123 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
+
+# параметры пула соединений с базой данных: минимальный и максимальный размер пула
+# и время ожидания свободного соединения в секундах
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+# время в секундах, за которое должно открыться соединение с базой данных
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", 5))
+
+# сколько секунд при старте бота ждать готовности базы данных, прежде чем запуститься без нее,
+# и количество потоков, в которых параллельно заполняются кэши каталога и клавиатур
+STARTUP_DB_WAIT = float(os.getenv("STARTUP_DB_WAIT", 30))
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", 4))
+
+# количество потоков, в которых telebot обрабатывает входящие обновления
+BOT_NUM_THREADS = int(os.getenv("BOT_NUM_THREADS", 4))
+
+# максимальное количество готовых клавиатур, которые бот хранит в памяти
+KEYBOARD_CACHE_SIZE = int(os.getenv("KEYBOARD_CACHE_SIZE", 1024))
+
+# как часто в секундах кэш каталога меню сверяет версию каталога в базе данных, чтобы замечать изменения меню,
+# сделанные другими процессами бота и служебными командами, и через сколько секунд кэш каталога очищается
+# в любом случае (0 - без ограничения)
+CATALOG_VERSION_CHECK_INTERVAL = float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", 5))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", 300))
+
+# количество кнопок категорий или блюд на одной странице клавиатуры меню
+MENU_PAGE_SIZE = int(os.getenv("MENU_PAGE_SIZE", 8))
+
+# параметры фоновой записи нажатий на блюда: размер пачки, интервал сброса в секундах, максимальная глубина очереди
+# и поведение при ее переполнении ("block" - ждать освобождения места, "drop" - отбрасывать запись)
+SELECTIONS_BATCH_SIZE = int(os.getenv("SELECTIONS_BATCH_SIZE", 500))
+SELECTIONS_FLUSH_INTERVAL = float(os.getenv("SELECTIONS_FLUSH_INTERVAL", 1))
+SELECTIONS_QUEUE_SIZE = int(os.getenv("SELECTIONS_QUEUE_SIZE", 10000))
+SELECTIONS_QUEUE_OVERFLOW = os.getenv("SELECTIONS_QUEUE_OVERFLOW", "block")
+
+# на сколько месяцев вперед создавать секции таблицы selection_dishes, разбитой по месяцам, и как часто в секундах
+# перечитывать список секций из базы данных, чтобы замечать секции, созданные другими процессами
+SELECTIONS_PARTITIONS_AHEAD = int(os.getenv("SELECTIONS_PARTITIONS_AHEAD", 1))
+SELECTIONS_PARTITIONS_CHECK_INTERVAL = float(os.getenv("SELECTIONS_PARTITIONS_CHECK_INTERVAL", 300))
+
+# сколько раз фоновые очереди записи повторяют запись пачки после ошибки базы данных и пауза перед первым повтором
+# в секундах, которая удваивается после каждой попытки
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", 5))
+WRITE_BEHIND_RETRY_DELAY = float(os.getenv("WRITE_BEHIND_RETRY_DELAY", 0.5))
+
+# буферизованная запись сообщений пользователей в таблицу last_messages пачками через COPY ("1" - включена),
+# размер пачки, интервал сброса в секундах, максимальная глубина очереди и поведение при ее переполнении
+LAST_MESSAGES_BUFFERED = os.getenv("LAST_MESSAGES_BUFFERED", "0") == "1"
+LAST_MESSAGES_BATCH_SIZE = int(os.getenv("LAST_MESSAGES_BATCH_SIZE", 1000))
+LAST_MESSAGES_FLUSH_INTERVAL = float(os.getenv("LAST_MESSAGES_FLUSH_INTERVAL", 1))
+LAST_MESSAGES_QUEUE_SIZE = int(os.getenv("LAST_MESSAGES_QUEUE_SIZE", 50000))
+LAST_MESSAGES_QUEUE_OVERFLOW = os.getenv("LAST_MESSAGES_QUEUE_OVERFLOW", "block")
+
+# способ получения обновлений от Telegram: "polling" - опрос серверов Telegram, "webhook" - встроенный HTTP-сервер
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+# параметры вебхука: публичный адрес, по которому Telegram будет отправлять обновления, адрес и порт,
+# на которых слушает встроенный сервер, путь запроса, секретный токен, количество потоков обработки обновлений
+# и максимальное количество обновлений, ожидающих обработки
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", BOT_NUM_THREADS))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 100))
+
+# хранилище id последнего сообщения бота в каждом чате: "memory" - в памяти процесса, "postgres" - в базе данных,
+# чтобы его переживали перезапуски и разделяли несколько процессов; максимальное количество чатов в памяти
+# и время в секундах, после которого сообщение уже не удаляется (Telegram позволяет удалять сообщения младше 48 часов)
+LAST_MESSAGE_STORE = os.getenv("LAST_MESSAGE_STORE", "memory")
+LAST_MESSAGE_STORE_SIZE = int(os.getenv("LAST_MESSAGE_STORE_SIZE", 100000))
+LAST_MESSAGE_TTL = float(os.getenv("LAST_MESSAGE_TTL", 172800))
+
+# режим навигации по кнопкам: "edit" - редактировать сообщение, в котором нажата кнопка, "send" - отправлять новое
+# сообщение и удалять предыдущее
+NAVIGATION_MODE = os.getenv("NAVIGATION_MODE", "edit")
+
+# количество строк, которое серверный курсор отдает за один раз при выгрузке меню и истории выбора блюд
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 5000))
+
+# отчеты администратора: максимальное количество строк отчета, количество строк, которое читается из базы данных
+# за раз, и максимальное количество сообщений, которыми отчет отправляется в чат, - больший отчет можно получить файлом
+REPORT_MAX_ROWS = int(os.getenv("REPORT_MAX_ROWS", 10000))
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", 1000))
+REPORT_MAX_MESSAGES = int(os.getenv("REPORT_MAX_MESSAGES", 5))
+
+# фоновая очистка старых данных: интервал между запусками в секундах (0 - очистка по расписанию выключена),
+# количество строк, удаляемых одной транзакцией, пауза между пачками в секундах и каталог сжатых архивов удаленных строк
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", 0))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 1000))
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", 0.1))
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "archive")
+
+# правила хранения: сколько последних сообщений пользователей хранить в last_messages, сколько дней и сколько последних
+# нажатий на блюда хранить в selection_dishes (0 - без ограничения)
+RETENTION_LAST_MESSAGES_MAX_ROWS = int(os.getenv("RETENTION_LAST_MESSAGES_MAX_ROWS", 0))
+RETENTION_SELECTIONS_MAX_AGE_DAYS = int(os.getenv("RETENTION_SELECTIONS_MAX_AGE_DAYS", 0))
+RETENTION_SELECTIONS_MAX_ROWS = int(os.getenv("RETENTION_SELECTIONS_MAX_ROWS", 0))
+
+# порог в миллисекундах, начиная с которого запросы к базе данных и обработчики обновлений пишутся в лог как медленные,
+# и максимальное количество разных запросов, по которым собирается статистика времени выполнения
+SLOW_QUERY_THRESHOLD = float(os.getenv("SLOW_QUERY_THRESHOLD", 100))
+SLOW_HANDLER_THRESHOLD = float(os.getenv("SLOW_HANDLER_THRESHOLD", 1000))
+INSTRUMENTATION_MAX_STATEMENTS = int(os.getenv("INSTRUMENTATION_MAX_STATEMENTS", 500))
+
+# адрес и порт HTTP-сервера, который отдает метрики бота в текстовом формате Prometheus по пути /metrics,
+# METRICS_PORT=0 отключает сервер
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+
+# ограничения исходящих запросов к Bot API: запросов в секунду всего и в один чат, сколько запросов чат может
+# отправить подряд, количество потоков отправки и количество повторов запроса после ответа 429
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", 30))
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", 1))
+SEND_CHAT_BURST = float(os.getenv("SEND_CHAT_BURST", 3))
+SEND_WORKERS = int(os.getenv("SEND_WORKERS", 8))
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", 3))
@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+import tempfile
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, List, Sequence, TextIO, Tuple
+
+from db_services import EXPORT_SOURCES, iter_export_rows
+from exceptions import DataExportError
+
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+ExportFile = namedtuple("ExportFile", "file file_name rows")
+
+
+def export_data(source_name: str, file: TextIO, export_format: str = "csv") -> int:
+    """
+    Записывает данные источника source_name в текстовый файл file в формате CSV или JSON Lines.
+
+    Строки читаются из базы данных частями и сразу записываются в файл, поэтому объем занятой памяти не зависит
+    от размера таблицы. Возвращает количество записанных строк.
+    """
+
+    if source_name not in EXPORT_SOURCES:
+        raise DataExportError(
+            f"Неизвестный источник выгрузки '{source_name}', доступны: {', '.join(EXPORT_SOURCES)}."
+        )
+    if export_format not in EXPORT_FORMATS:
+        raise DataExportError(
+            f"Неизвестный формат выгрузки '{export_format}', доступны: {', '.join(EXPORT_FORMATS)}."
+        )
+
+    columns = EXPORT_SOURCES[source_name].columns
+    chunks = iter_export_rows(source_name)
+    if export_format == "csv":
+        return write_csv_chunks(file, columns, chunks)
+    return write_jsonl_chunks(file, columns, chunks)
+
+
+def export_data_to_temporary_file(source_name: str, export_format: str = "csv") -> ExportFile:
+    """
+    Выгружает данные источника source_name во временный файл на диске и возвращает его вместе с именем и количеством строк.
+
+    Файл открыт в двоичном режиме и перемотан в начало, чтобы его можно было сразу отправить документом в Telegram.
+    Закрывать файл должен вызывающий код, после закрытия файл удаляется.
+    """
+
+    file = tempfile.TemporaryFile()
+    try:
+        text_file = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        rows = export_data(source_name, text_file, export_format)
+        text_file.flush()
+        text_file.detach()
+    except BaseException:
+        file.close()
+        raise
+
+    file.seek(0)
+    return ExportFile(file, get_export_file_name(source_name, export_format), rows)
+
+
+def get_export_file_name(source_name: str, export_format: str) -> str:
+    """Возвращает имя файла выгрузки вида 'menu_2023-01-31.csv'."""
+
+    return f"{source_name}_{date.today().isoformat()}.{export_format}"
+
+
+def write_csv_chunks(
+    file: TextIO, columns: Sequence[str], chunks: Iterable[List[Tuple[Any, ...]]]
+) -> int:
+    """Записывает в file заголовок из columns и строки из chunks в формате CSV, возвращает количество строк."""
+
+    writer = csv.writer(file)
+    writer.writerow(columns)
+    rows = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        rows += len(chunk)
+    return rows
+
+
+def write_jsonl_chunks(
+    file: TextIO, columns: Sequence[str], chunks: Iterable[List[Tuple[Any, ...]]]
+) -> int:
+    """Записывает в file строки из chunks по одному JSON объекту с ключами из columns на строку, возвращает их количество."""
+
+    rows = 0
+    for chunk in chunks:
+        for row in chunk:
+            file.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_value))
+            file.write("\n")
+        rows += len(chunk)
+    return rows
+
+
+def _json_value(value: Any) -> Any:
+    """Преобразует значения из базы данных, которые не поддерживает json, в поддерживаемые."""
+
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Значение типа {type(value).__name__} нельзя записать в JSON.")
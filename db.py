@@ -1,23 +1,443 @@
-from typing import List, Tuple
+import io
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple, Callable, Dict, Any, Optional, Iterator, Sequence
 
 import psycopg2
-from psycopg2 import sql, errors
+from psycopg2 import sql, errors, extensions, extras
 
-from exceptions import CantTableError
+from exceptions import CantTableError, PoolTimeoutError
+
+
+class PostgresConnectionPool:
+    """
+    Потокобезопасный пул соединений с базой данных PostgresSQL ограниченного размера.
+
+    Держит не меньше min_size и не больше max_size открытых соединений. Если все соединения заняты, поток ждет
+    освобождения соединения не дольше timeout секунд, после чего получает PoolTimeoutError.
+    С lazy=True соединения не открываются при создании пула: они открываются при первом запросе соединения,
+    а до min_size пул дополняется вызовом fill.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        lazy: bool = False,
+    ):
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError("Размеры пула должны удовлетворять условию 0 <= min_size <= max_size, max_size >= 1.")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._connect = connect
+        self._idle: List[Any] = []
+        self._size = 0
+        self._condition = threading.Condition()
+
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+        if not lazy:
+            self.fill()
+
+    def fill(self) -> int:
+        """Открывает соединения, которых не хватает до min_size, и возвращает количество открытых соединений."""
+
+        opened = 0
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return opened
+                self._size += 1
+
+            try:
+                connection = self._connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+
+            with self._condition:
+                self._idle.append(connection)
+                self._condition.notify()
+            opened += 1
+
+    def getconn(self, timeout: Optional[float] = None) -> Any:
+        """Выдает свободное соединение из пула, при необходимости открывая новое или ожидая освобождения."""
+
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        with self._condition:
+            while not self._idle and self._size >= self.max_size:
+                waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Не удалось получить соединение из пула за {timeout} сек."
+                    )
+                self._condition.wait(remaining)
+
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                self._size += 1
+            self._record_checkout(waited, time.monotonic() - started)
+
+        if connection is None:
+            try:
+                connection = self._connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+        return connection
+
+    def putconn(self, connection: Any, discard: bool = False) -> None:
+        """
+        Возвращает соединение в пул.
+
+        Незавершенная транзакция откатывается. Закрытые и сломанные соединения, а также соединения с discard=True
+        закрываются и убираются из пула.
+        """
+
+        if not discard and connection.closed:
+            discard = True
+        if not discard and connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._condition:
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+        if discard and not connection.closed:
+            connection.close()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Контекстный менеджер, который выдает соединение из пула и гарантированно возвращает его обратно."""
+
+        connection = self.getconn(timeout)
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    def closeall(self) -> None:
+        """Закрывает все свободные соединения пула."""
+
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection in idle:
+            if not connection.closed:
+                connection.close()
+
+    def stats(self) -> Dict[str, float]:
+        """Возвращает словарь с текущим состоянием пула и метриками ожидания соединений."""
+
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_time_total": self._wait_time_total,
+                "wait_time_max": self._wait_time_max,
+            }
+
+    def _record_checkout(self, waited: bool, wait_time: float) -> None:
+        """Обновляет метрики выдачи соединений. Вызывается под блокировкой пула."""
+
+        self._checkouts += 1
+        if waited:
+            self._waits += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+
+
+# счетчик для уникальных имен серверных курсоров
+_cursor_names = itertools.count(1)
+
+
+class TimedCursor(extensions.cursor):
+    """
+    Курсор psycopg2, который передает время выполнения каждого запроса в функции query_hooks своего соединения.
+
+    Функция вызывается с текстом выполненного запроса, длительностью в секундах и количеством строк.
+    """
+
+    def execute(self, query, vars=None):
+        hooks = self.connection.query_hooks
+        if not hooks:
+            return super().execute(query, vars)
+
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _call_query_hooks(hooks, self.query or query, time.perf_counter() - started, self.rowcount)
+
+    def copy_expert(self, sql, file, size=8192):
+        hooks = self.connection.query_hooks
+        if not hooks:
+            return super().copy_expert(sql, file, size)
+
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            statement = sql.as_string(self) if isinstance(sql, psycopg2.sql.Composable) else sql
+            _call_query_hooks(hooks, statement, time.perf_counter() - started, self.rowcount)
+
+
+def _call_query_hooks(hooks: Sequence[Callable[[Any, float, int], None]], statement, duration, rowcount) -> None:
+    """Вызывает функции замера запросов, не позволяя их ошибкам прервать сам запрос."""
+
+    for hook in hooks:
+        try:
+            hook(statement, duration, rowcount)
+        except Exception:
+            pass
+
+
+class PooledConnection(extensions.connection):
+    """
+    Соединение psycopg2, которое помнит, какие подготовленные запросы уже созданы в его сессии.
+
+    Курсоры соединения замеряют время выполнения запросов и передают его в функции query_hooks.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        self.query_hooks = []
+        self.cursor_factory = TimedCursor
 
 
 class PostgresClient:
-    """Класс для работы с базой данных PostgresSQL."""
+    """
+    Класс для работы с базой данных PostgresSQL.
+
+    Соединения берутся из пула PostgresConnectionPool, каждый вызов работает со своим курсором и своей транзакцией,
+    поэтому клиент можно использовать из нескольких потоков одновременно. Первое соединение открывается при первом
+    запросе, а не при создании клиента, поэтому создание клиента не обращается к сети.
+    """
 
-    def __init__(self, dbname, user, password, host):
+    def __init__(
+        self,
+        dbname,
+        user,
+        password,
+        host,
+        port=None,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        connect_timeout: Optional[int] = None,
+    ):
         self.dbname = dbname
         self.user = user
         self.password = password
         self.host = host
-        self.db_connect = psycopg2.connect(
-            dbname=self.dbname, user=self.user, password=self.password, host=self.host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self._prepared_statements: Dict[str, Tuple[Sequence[str], str]] = {}
+        self.query_hooks: List[Callable[[Any, float, int], None]] = []
+        self.pool = PostgresConnectionPool(
+            connect=self._connect,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            lazy=True,
         )
-        self.cursor = self.db_connect.cursor()
+
+    def _connect(self):
+        """Открывает новое соединение с базой данных."""
+
+        connection = psycopg2.connect(
+            dbname=self.dbname,
+            user=self.user,
+            password=self.password,
+            host=self.host,
+            port=self.port,
+            connect_timeout=self.connect_timeout,
+            connection_factory=PooledConnection,
+        )
+        connection.query_hooks = self.query_hooks
+        return connection
+
+    def add_query_hook(self, hook: Callable[[Any, float, int], None]) -> None:
+        """
+        Добавляет функцию, которая вызывается после каждого запроса к базе данных.
+
+        Функция получает текст выполненного запроса, время выполнения в секундах и количество строк. Список функций
+        общий для всех соединений пула, в том числе уже открытых.
+        """
+
+        self.query_hooks.append(hook)
+
+    def is_ready(self) -> bool:
+        """Проверяет, что база данных принимает запросы, выполняя на соединении из пула простой запрос."""
+
+        try:
+            self.fetch_one("SELECT 1")
+        except (psycopg2.Error, PoolTimeoutError):
+            return False
+        return True
+
+    @contextmanager
+    def cursor(self) -> Iterator[Any]:
+        """
+        Выдает курсор на соединении из пула.
+
+        При успешном выходе из блока транзакция фиксируется, при исключении - откатывается, так что ошибка одного
+        запроса не оставляет соединение в прерванной транзакции.
+        """
+
+        with self.pool.connection() as connection:
+            try:
+                with connection.cursor() as cursor:
+                    yield cursor
+                connection.commit()
+            except Exception:
+                if not connection.closed:
+                    connection.rollback()
+                raise
+
+    @contextmanager
+    def autocommit_cursor(self) -> Iterator[Any]:
+        """
+        Выдает курсор на соединении из пула в режиме autocommit.
+
+        Нужен для команд, которые нельзя выполнять внутри транзакции, например CREATE INDEX CONCURRENTLY.
+        """
+
+        with self.pool.connection() as connection:
+            connection.autocommit = True
+            try:
+                with connection.cursor() as cursor:
+                    yield cursor
+            finally:
+                if not connection.closed:
+                    connection.autocommit = False
+
+    def execute(self, query, params=None) -> None:
+        """Выполняет запрос query с параметрами params и фиксирует транзакцию."""
+
+        with self.cursor() as cursor:
+            cursor.execute(query, params)
+
+    def fetch_all(self, query, params=None) -> List[Tuple[Any, ...]]:
+        """Выполняет запрос query с параметрами params и возвращает все полученные строки."""
+
+        with self.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def fetch_one(self, query, params=None) -> Optional[Tuple[Any, ...]]:
+        """Выполняет запрос query с параметрами params и возвращает первую строку или None."""
+
+        with self.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchone()
+
+    def iter_chunks(
+        self, query, params=None, chunk_size: int = 2000
+    ) -> Iterator[List[Tuple[Any, ...]]]:
+        """
+        Выполняет запрос query с параметрами params на именованном серверном курсоре и выдает строки частями.
+
+        Сервер отдает не больше chunk_size строк за раз, поэтому объем занятой памяти не зависит от размера выборки.
+        Соединение занято до тех пор, пока генератор не будет исчерпан или закрыт.
+        """
+
+        with self.pool.connection() as connection:
+            try:
+                with connection.cursor(name=f"stream_{next(_cursor_names)}") as cursor:
+                    cursor.itersize = chunk_size
+                    cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield rows
+                connection.commit()
+            except BaseException:
+                if not connection.closed:
+                    connection.rollback()
+                raise
+
+    def register_prepared_statement(
+        self, name: str, query: str, param_types: Sequence[str] = ()
+    ) -> None:
+        """
+        Регистрирует именованный параметризованный запрос, который будет подготовлен на сервере.
+
+        Параметры в query обозначаются как $1, $2 и тп, их типы передаются в param_types: ("integer", "text").
+        Запрос подготавливается командой PREPARE один раз на каждом соединении пула при первом выполнении.
+        """
+
+        self._prepared_statements[name] = (tuple(param_types), query)
+
+    def fetch_all_prepared(self, name: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        """Выполняет подготовленный запрос name с параметрами params и возвращает все полученные строки."""
+
+        with self.cursor() as cursor:
+            self._execute_prepared(cursor, name, params)
+            return cursor.fetchall()
+
+    def fetch_one_prepared(self, name: str, params: Sequence[Any] = ()) -> Optional[Tuple[Any, ...]]:
+        """Выполняет подготовленный запрос name с параметрами params и возвращает первую строку или None."""
+
+        with self.cursor() as cursor:
+            self._execute_prepared(cursor, name, params)
+            return cursor.fetchone()
+
+    def _execute_prepared(self, cursor: Any, name: str, params: Sequence[Any]) -> None:
+        """Подготавливает запрос name на соединении курсора, если это еще не сделано, и выполняет его через EXECUTE."""
+
+        connection = cursor.connection
+        if name not in connection.prepared_statements:
+            param_types, query = self._prepared_statements[name]
+            prepare = sql.SQL("PREPARE {} {}AS {}").format(
+                sql.Identifier(name),
+                sql.SQL("({}) ".format(", ".join(param_types)) if param_types else ""),
+                sql.SQL(query),
+            )
+            cursor.execute(prepare)
+            connection.prepared_statements.add(name)
+
+        execute = sql.SQL("EXECUTE {}{}").format(
+            sql.Identifier(name),
+            sql.SQL(" ({})").format(sql.SQL(", ").join(sql.Placeholder() * len(params)))
+            if params
+            else sql.SQL(""),
+        )
+        cursor.execute(execute, tuple(params))
 
     def select_all_tables_name_from_db(self) -> List[Tuple[str, ...]]:
         """
@@ -26,14 +446,47 @@ class PostgresClient:
         Или пустой список, если таблиц нет.
         """
 
-        self.cursor.execute(
+        return self.fetch_all(
             """
                             SELECT table_name FROM information_schema.tables \
                             WHERE table_schema NOT IN ('information_schema','pg_catalog');
                         """
         )
 
-        return self.cursor.fetchall()
+    def select_all_indexes_name_from_db(self) -> List[Tuple[str, bool]]:
+        """
+        Выводит список кортежей с названиями всех пользовательских индексов базы данных и признаком их готовности.
+
+        Признак готовности равен False для индексов, построение которых через CONCURRENTLY было прервано.
+        """
+
+        return self.fetch_all(
+            """
+            SELECT index_class.relname, pg_index.indisvalid
+              FROM pg_index
+              JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+              JOIN pg_namespace ON pg_namespace.oid = index_class.relnamespace
+             WHERE pg_namespace.nspname NOT IN ('information_schema', 'pg_catalog', 'pg_toast')
+            """
+        )
+
+    def select_table_size(self, table_name: str) -> int:
+        """Возвращает размер таблицы table_name в байтах вместе с индексами и всеми ее секциями."""
+
+        row = self.fetch_one(
+            "SELECT coalesce(sum(pg_total_relation_size(relid)), 0) FROM pg_partition_tree(%s)", (table_name,)
+        )
+        return int(row[0])
+
+    def vacuum_table(self, table_name: str, analyze: bool = True) -> None:
+        """
+        Выполняет VACUUM таблицы table_name, чтобы место удаленных строк снова использовалось для новых строк.
+
+        Команда выполняется вне транзакции и не блокирует чтение и запись в таблицу.
+        """
+
+        with self.autocommit_cursor() as cursor:
+            cursor.execute("VACUUM {}{}".format("(ANALYZE) " if analyze else "", table_name))
 
     def select_columns_from_table(
         self, table_name: str, *args: str
@@ -43,30 +496,112 @@ class PostgresClient:
         query = sql.SQL("SELECT {} FROM {}").format(
             sql.SQL(",").join(map(sql.Identifier, args)), sql.Identifier(table_name)
         )
-        self.cursor.execute(query)
-
-        return self.cursor.fetchall()
+        return self.fetch_all(query)
 
     def select_all_from_table(self, table_name: str) -> List[Tuple[str, ...]]:
         """Возвращает все значения из переданной таблицы table_name."""
         try:
-            self.cursor.execute("SELECT * FROM {}".format(table_name))
+            return self.fetch_all("SELECT * FROM {}".format(table_name))
         except errors.SyntaxError:
             raise CantTableError("Вы ввели несуществующее название таблицы.")
 
-        return self.cursor.fetchall()
-
-    def create_table(self, table_name: str, values_pattern: str) -> None:
+    def create_table(self, table_name: str, values_pattern: str, partition_by: Optional[str] = None) -> None:
         """
         Создаёт новую таблицу table_name с переданными полями и параметрами полей из values_pattern.
 
         Поля и параметры values_pattern передаются по шаблону: "test TEXT, test1 VARCHAR(20), test2 INTEGER".
+        С partition_by, например "RANGE (created_at)", создается таблица, разбитая на секции.
+        """
+
+        self.execute(
+            "CREATE TABLE IF NOT EXISTS {}({}){}".format(
+                table_name, values_pattern, f" PARTITION BY {partition_by}" if partition_by else ""
+            )
+        )
+
+    def create_range_partition(self, partition_name: str, table_name: str, start: str, end: str) -> None:
         """
+        Создаёт секцию partition_name таблицы table_name для значений от start включительно до end, если ее еще нет.
 
-        self.cursor.execute(
-            "CREATE TABLE IF NOT EXISTS {}({})".format(table_name, values_pattern)
+        Границы start и end передаются строками в формате значений ключа секционирования: "2023-01-01 00:00+03".
+        """
+
+        query = sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM ({}) TO ({})").format(
+            sql.Identifier(partition_name), sql.Identifier(table_name), sql.Literal(start), sql.Literal(end)
         )
-        self.db_connect.commit()
+        self.execute(query)
+
+    def is_partitioned_table(self, table_name: str) -> bool:
+        """Проверяет, что таблица table_name существует и разбита на секции."""
+
+        query = """
+            SELECT 1
+              FROM pg_partitioned_table
+              JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid
+             WHERE pg_class.relname = %s
+            """
+        return self.fetch_one(query, (table_name,)) is not None
+
+    def select_partitions_name_from_db(self, table_name: str) -> List[Tuple[str]]:
+        """
+        Выводит список кортежей с названиями секций таблицы table_name.
+
+        Или пустой список, если таблица не разбита на секции или секций еще нет.
+        """
+
+        return self.fetch_all(
+            """
+            SELECT child.relname
+              FROM pg_inherits
+              JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+              JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+             WHERE parent.relname = %s
+            """,
+            (table_name,),
+        )
+
+    def create_index(
+        self,
+        index_name: str,
+        table_name: str,
+        columns_pattern: str,
+        unique: bool = False,
+        concurrently: bool = False,
+        method: Optional[str] = None,
+    ) -> None:
+        """
+        Создаёт индекс index_name на таблице table_name по колонкам из columns_pattern, если его еще нет.
+
+        Колонки columns_pattern передаются по шаблону: "test, test1 DESC".
+        С concurrently=True индекс строится без блокировки записи в таблицу, вне транзакции.
+        method задает тип индекса, например "brin", по умолчанию создается btree.
+        """
+
+        query = "CREATE {}INDEX {}IF NOT EXISTS {} ON {}{} ({})".format(
+            "UNIQUE " if unique else "",
+            "CONCURRENTLY " if concurrently else "",
+            index_name,
+            table_name,
+            f" USING {method}" if method else "",
+            columns_pattern,
+        )
+        if not concurrently:
+            self.execute(query)
+            return
+        with self.autocommit_cursor() as cursor:
+            cursor.execute(query)
+
+    def drop_index(self, index_name: str, concurrently: bool = False) -> None:
+        """Удаляет индекс index_name из базы данных, если он существует."""
+
+        query = "DROP INDEX {}IF EXISTS {}".format(
+            "CONCURRENTLY " if concurrently else "", index_name
+        )
+        if not concurrently:
+            self.execute(query)
+            return
+        with self.autocommit_cursor() as cursor:
+            cursor.execute(query)
 
     def insert_in_table(self, table_name: str, **kwargs: str) -> None:
         """
@@ -80,8 +615,35 @@ class PostgresClient:
             sql.SQL(", ").join(map(sql.Identifier, kwargs.keys())),
             sql.SQL(", ").join(map(sql.Literal, kwargs.values())),
         )
-        self.cursor.execute(insert)
-        self.db_connect.commit()
+        self.execute(insert)
+
+    def insert_many_in_table(
+        self, table_name: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]
+    ) -> None:
+        """
+        Добавляет строки rows в таблицу table_name одним многострочным INSERT в одной транзакции.
+
+        Значения в каждой строке должны идти в порядке колонок columns.
+        """
+
+        insert = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(map(sql.Identifier, columns)),
+        )
+        with self.cursor() as cursor:
+            extras.execute_values(cursor, insert, rows, page_size=len(rows) or 1)
+
+    def copy_in_table(
+        self, table_name: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]
+    ) -> None:
+        """
+        Загружает строки rows в таблицу table_name командой COPY в одной транзакции.
+
+        Значения в каждой строке должны идти в порядке колонок columns, None записывается как NULL.
+        """
+
+        with self.cursor() as cursor:
+            copy_rows(cursor, table_name, columns, rows)
 
     def delete_table(self, table_name: str) -> None:
         """Удаляет таблицу table_name из базы данных."""
@@ -91,8 +653,7 @@ class PostgresClient:
                 """.format(
             table_name
         )
-        self.cursor.execute(query)
-        self.db_connect.commit()
+        self.execute(query)
 
     def update_table_where(
         self,
@@ -117,8 +678,7 @@ class PostgresClient:
             sql.Literal(set_column_value),
             sql.SQL(where_pattern),
         )
-        self.cursor.execute(update)
-        self.db_connect.commit()
+        self.execute(update)
 
     def delete_value_in_table(self, table_name: str, where_pattern: str) -> None:
         """
@@ -135,5 +695,36 @@ class PostgresClient:
         """.format(
             table_name, where_pattern
         )
-        self.cursor.execute(query)
-        self.db_connect.commit()
+        self.execute(query)
+
+
+def copy_rows(
+    cursor: Any, table_name: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]
+) -> None:
+    """Загружает строки rows в таблицу table_name командой COPY в транзакции переданного курсора."""
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(map(_copy_text_value, row)))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    copy = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(table_name),
+        sql.SQL(", ").join(map(sql.Identifier, columns)),
+    )
+    cursor.copy_expert(copy, buffer)
+
+
+def _copy_text_value(value: Any) -> str:
+    """Преобразует значение в поле текстового формата COPY, экранируя служебные символы."""
+
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
@@ -1,11 +1,44 @@
+import re
+from collections import Counter, namedtuple
 from datetime import datetime
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Callable, Iterable, Iterator
 
 import pytz
 
-from config import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST
-from db import PostgresClient, errors
-from exceptions import InvalidSQLType
+from config import (
+    DB_NAME,
+    DB_USER,
+    DB_PASSWORD,
+    DB_HOST,
+    DB_PORT,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_CONNECT_TIMEOUT,
+    CATALOG_VERSION_CHECK_INTERVAL,
+    CATALOG_CACHE_TTL,
+    SELECTIONS_BATCH_SIZE,
+    SELECTIONS_FLUSH_INTERVAL,
+    SELECTIONS_QUEUE_SIZE,
+    SELECTIONS_QUEUE_OVERFLOW,
+    SELECTIONS_PARTITIONS_AHEAD,
+    SELECTIONS_PARTITIONS_CHECK_INTERVAL,
+    WRITE_BEHIND_MAX_RETRIES,
+    WRITE_BEHIND_RETRY_DELAY,
+    LAST_MESSAGES_BUFFERED,
+    LAST_MESSAGES_BATCH_SIZE,
+    LAST_MESSAGES_FLUSH_INTERVAL,
+    LAST_MESSAGES_QUEUE_SIZE,
+    LAST_MESSAGES_QUEUE_OVERFLOW,
+    EXPORT_CHUNK_SIZE,
+    MENU_PAGE_SIZE,
+    REPORT_CHUNK_SIZE,
+)
+from caches import MenuCatalogCache, SchemaStateCache
+from db import PostgresClient, errors, extras, copy_rows
+from exceptions import InvalidSQLType, DuplicateCategoryError, PoolTimeoutError
+from instrumentation import query_timer
+from write_behind import WriteBehindQueue
 
 
 postgres_client = PostgresClient(
@@ -13,7 +46,205 @@ postgres_client = PostgresClient(
     user=DB_USER,
     password=DB_PASSWORD,
     host=DB_HOST,
+    port=DB_PORT,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    connect_timeout=DB_CONNECT_TIMEOUT,
+)
+postgres_client.add_query_hook(query_timer)
+
+postgres_client.register_prepared_statement(
+    "select_category_id_where_category_name",
+    "SELECT category_id FROM menu_categories WHERE name_category = $1",
+    ("varchar",),
+)
+postgres_client.register_prepared_statement(
+    "select_dishes_from_category_where",
+    "SELECT dish_id, name_dish FROM dishes WHERE category_id = $1",
+    ("integer",),
+)
+postgres_client.register_prepared_statement(
+    "select_categories_page",
+    "SELECT category_id, name_category FROM menu_categories WHERE category_id > $1 ORDER BY category_id LIMIT $2",
+    ("integer", "integer"),
+)
+postgres_client.register_prepared_statement(
+    "select_categories_previous_cursor",
+    "SELECT category_id FROM menu_categories WHERE category_id <= $1 ORDER BY category_id DESC OFFSET $2 LIMIT 1",
+    ("integer", "integer"),
+)
+postgres_client.register_prepared_statement(
+    "select_dishes_page",
+    "SELECT dish_id, name_dish FROM dishes WHERE category_id = $1 AND dish_id > $2 ORDER BY dish_id LIMIT $3",
+    ("integer", "integer", "integer"),
+)
+postgres_client.register_prepared_statement(
+    "select_dishes_previous_cursor",
+    "SELECT dish_id FROM dishes WHERE category_id = $1 AND dish_id <= $2 ORDER BY dish_id DESC OFFSET $3 LIMIT 1",
+    ("integer", "integer", "integer"),
+)
+postgres_client.register_prepared_statement(
+    "select_dish_parameters",
+    "SELECT * FROM dishes WHERE dish_id = $1",
+    ("integer",),
+)
+
+catalog_cache = MenuCatalogCache(
+    version_loader=lambda: select_catalog_version(),
+    check_interval=CATALOG_VERSION_CHECK_INTERVAL,
+    ttl=CATALOG_CACHE_TTL,
 )
+schema_state = SchemaStateCache()
+# названия секций таблицы selection_dishes вместе с названием самой таблицы, если она разбита на секции
+selection_partitions = SchemaStateCache(max_age=SELECTIONS_PARTITIONS_CHECK_INTERVAL)
+
+SELECTIONS_TIMEZONE = pytz.timezone("Europe/Minsk")
+
+# колонки таблицы selection_dishes; первичный ключ включает datetime, потому что таблица разбита на секции по нему
+SELECTION_DISHES_COLUMNS = """selection_dishes_id SERIAL,
+                      username VARCHAR(255) NOT NULL,
+                       dish_id INTEGER NOT NULL,
+                       datetime timestamp with time zone NOT NULL,
+                   PRIMARY KEY (selection_dishes_id, datetime),
+                   FOREIGN KEY (dish_id) REFERENCES dishes (dish_id) ON DELETE CASCADE"""
+
+# таблицы каталога меню, любое изменение которых увеличивает версию каталога в таблице catalog_version
+CATALOG_TABLES = ("menu_categories", "dishes")
+
+# служебные таблицы, которых нет в базах данных, созданных ранними версиями бота, и таблицы, без которых
+# они не создаются
+UPGRADE_TABLES = {
+    "catalog_version": CATALOG_TABLES,
+    "dish_popularity": ("dishes", "selection_dishes"),
+    "user_popularity": ("dishes", "selection_dishes"),
+}
+
+# индекс схемы, method - тип индекса, например "brin", None - btree
+SchemaIndex = namedtuple("SchemaIndex", "name table columns unique method", defaults=(None,))
+ExportSource = namedtuple("ExportSource", "columns query")
+ReportQuery = namedtuple("ReportQuery", "query rollup_table fallback_query window_query")
+# таблица, из которой фоновая очистка удаляет старые строки: колонки архива удаленных строк, первичный ключ, колонка
+# порядка добавления строк и колонка времени добавления, None - строки удаляются только сверх максимального количества
+RetentionTable = namedtuple("RetentionTable", "columns key id_column time_column")
+# страница списка категорий или блюд: строки (id, название) и курсоры соседних страниц, None - страницы нет
+MenuPage = namedtuple("MenuPage", "items previous_cursor next_cursor")
+
+# вторичные индексы, которые нужны запросам бота, в порядке создания таблиц
+SCHEMA_INDEXES = (
+    SchemaIndex("menu_categories_name_category_key", "menu_categories", "name_category", True),
+    SchemaIndex("dishes_category_id_dish_id_idx", "dishes", "category_id, dish_id", False),
+    SchemaIndex("selection_dishes_dish_id_idx", "selection_dishes", "dish_id", False),
+    SchemaIndex("selection_dishes_username_idx", "selection_dishes", "username", False),
+    SchemaIndex("selection_dishes_datetime_brin_idx", "selection_dishes", "datetime", False, "brin"),
+    SchemaIndex("dish_popularity_selections_count_idx", "dish_popularity", "selections_count DESC", False),
+    SchemaIndex("user_popularity_selections_count_idx", "user_popularity", "selections_count DESC", False),
+)
+
+# индексы, которые заменены индексами из SCHEMA_INDEXES: название старого индекса и название заменившего его
+OBSOLETE_SCHEMA_INDEXES = {
+    "dishes_category_id_idx": "dishes_category_id_dish_id_idx",
+}
+
+# источники выгрузки данных: колонки и запрос, строки которого идут в порядке колонок
+EXPORT_SOURCES = {
+    "menu": ExportSource(
+        ("category_id", "category", "dish_id", "dish", "price", "description"),
+        """
+        SELECT category_id, name_category, dish_id, name_dish, price, description
+          FROM menu_categories LEFT JOIN dishes USING(category_id)
+      ORDER BY category_id, dish_id
+        """,
+    ),
+    "selections": ExportSource(
+        ("selection_dishes_id", "username", "dish_id", "dish", "datetime"),
+        """
+        SELECT selection_dishes_id, username, dish_id, name_dish, datetime
+          FROM selection_dishes LEFT JOIN dishes USING(dish_id)
+      ORDER BY selection_dishes_id
+        """,
+    ),
+}
+
+# таблицы, для которых можно задать правила хранения
+RETENTION_TABLES = {
+    "last_messages": RetentionTable(
+        ("last_message_id", "text_message"), "last_message_id", "last_message_id", None
+    ),
+    "selection_dishes": RetentionTable(
+        ("selection_dishes_id", "username", "dish_id", "datetime"),
+        "selection_dishes_id, datetime",
+        "selection_dishes_id",
+        "datetime",
+    ),
+}
+
+# название секции selection_dishes за месяц: selection_dishes_y2023m01
+SELECTION_PARTITION_NAME = re.compile(r"selection_dishes_y(\d{4})m(\d{2})")
+
+# секция selection_dishes по умолчанию, в которую попадают нажатия, если секции их месяца еще нет
+SELECTION_DEFAULT_PARTITION = "selection_dishes_default"
+
+# запросы строк отчетов администратора с параметром - количеством строк. Если таблица счетчиков rollup_table
+# еще не создана, отчет строится запросом fallback_query по всей истории нажатий. Отчет за период строится запросом
+# window_query с параметрами - началом и концом периода и количеством строк, None - отчет не строится за период
+REPORT_QUERIES = {
+    "top_dishes": ReportQuery(
+        """
+        SELECT name_dish, selections_count
+          FROM dish_popularity JOIN dishes USING(dish_id)
+      ORDER BY selections_count DESC
+         LIMIT %s
+        """,
+        "dish_popularity",
+        """
+        SELECT name_dish, count(name_dish)
+          FROM selection_dishes JOIN dishes USING(dish_id)
+      GROUP BY name_dish
+      ORDER BY count DESC
+         LIMIT %s
+        """,
+        """
+        SELECT name_dish, selections_count
+          FROM (
+                SELECT dish_id, count(*) AS selections_count
+                  FROM selection_dishes
+                 WHERE datetime >= %s AND datetime < %s
+              GROUP BY dish_id
+               ) AS window_counts
+          JOIN dishes USING(dish_id)
+      ORDER BY selections_count DESC
+         LIMIT %s
+        """,
+    ),
+    "top_users": ReportQuery(
+        """
+        SELECT username, selections_count
+          FROM user_popularity
+      ORDER BY selections_count DESC
+         LIMIT %s
+        """,
+        "user_popularity",
+        """
+        SELECT username, count(username)
+          FROM selection_dishes JOIN dishes USING(dish_id)
+      GROUP BY username
+      ORDER BY count DESC
+         LIMIT %s
+        """,
+        """
+        SELECT username, count(*) AS selections_count
+          FROM selection_dishes
+         WHERE datetime >= %s AND datetime < %s
+      GROUP BY username
+      ORDER BY selections_count DESC
+         LIMIT %s
+        """,
+    ),
+    "last_messages": ReportQuery(
+        "SELECT text_message FROM last_messages ORDER BY last_message_id DESC LIMIT %s", None, None, None
+    ),
+}
 
 
 def create_table_menu_categories() -> None:
@@ -23,6 +254,7 @@ def create_table_menu_categories() -> None:
         "menu_categories",
         "category_id SERIAL PRIMARY KEY, name_category VARCHAR(60) NOT NULL",
     )
+    _create_table_indexes("menu_categories")
 
 
 def create_table_dishes() -> None:
@@ -42,19 +274,30 @@ def create_table_dishes() -> None:
           in_stock BOOLEAN NOT NULL DEFAULT TRUE,
        FOREIGN KEY (category_id) REFERENCES menu_categories (category_id) ON DELETE CASCADE""",
     )
+    _create_table_indexes("dishes")
 
 
 def create_table_selection_dishes() -> None:
-    """Создает таблицу selection_dishes, в которой будут храниться данные о нажатии на определенное блюдо из меню."""
+    """
+    Создает таблицу selection_dishes, в которой будут храниться данные о нажатии на определенное блюдо из меню.
 
-    postgres_client.create_table(
-        "selection_dishes",
-        """selection_dishes_id SERIAL PRIMARY KEY,
-                      username VARCHAR(255) NOT NULL,
-                       dish_id INTEGER NOT NULL,
-                       datetime timestamp with time zone NOT NULL,
-                   FOREIGN KEY (dish_id) REFERENCES dishes (dish_id) ON DELETE CASCADE""",
+    Таблица разбита на секции по месяцам по колонке datetime. Секции текущего и следующих месяцев создаются сразу,
+    остальные - при записи нажатий. Секция по умолчанию принимает нажатия, для месяца которых секции еще нет.
+    """
+
+    postgres_client.create_table("selection_dishes", SELECTION_DISHES_COLUMNS, partition_by="RANGE (datetime)")
+    _create_table_indexes("selection_dishes")
+    create_selection_default_partition()
+    ensure_selection_partitions([datetime.now(SELECTIONS_TIMEZONE)])
+
+
+def create_selection_default_partition() -> None:
+    """Создает секцию по умолчанию таблицы selection_dishes, если ее еще нет, и обновляет кэш секций."""
+
+    postgres_client.execute(
+        f"CREATE TABLE IF NOT EXISTS {SELECTION_DEFAULT_PARTITION} PARTITION OF selection_dishes DEFAULT"
     )
+    selection_partitions.refresh(_get_selection_partitions_name)
 
 
 def create_table_last_messages() -> None:
@@ -69,18 +312,508 @@ def create_table_last_messages() -> None:
     )
 
 
+def create_menu_tables() -> None:
+    """Создает все таблицы меню и статистики, если их еще нет, и обновляет кэш состояния схемы."""
+
+    create_table_menu_categories()
+    create_table_dishes()
+    create_table_catalog_version()
+    create_table_selection_dishes()
+    create_table_last_messages()
+    create_table_dish_popularity()
+    create_table_user_popularity()
+    refresh_schema_state()
+
+
+def create_table_catalog_version() -> None:
+    """
+    Создает таблицу catalog_version с номером версии каталога меню и триггеры, которые увеличивают его.
+
+    Номер увеличивается при любом изменении таблиц CATALOG_TABLES, в том числе из другого процесса бота, служебных
+    команд manage.py или вручную, и по нему кэш каталога каждого процесса узнает, что меню изменилось.
+    """
+
+    with postgres_client.cursor() as cursor:
+        cursor.execute("CREATE TABLE IF NOT EXISTS catalog_version (version BIGINT NOT NULL)")
+        cursor.execute(
+            "INSERT INTO catalog_version (version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM catalog_version)"
+        )
+        cursor.execute(
+            """
+            CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+            BEGIN
+                UPDATE catalog_version SET version = version + 1;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """
+        )
+        for table_name in CATALOG_TABLES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table_name}_catalog_version ON {table_name}")
+            cursor.execute(
+                f"""
+                CREATE TRIGGER {table_name}_catalog_version
+                 AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table_name}
+                   FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()
+                """
+            )
+
+
+def select_catalog_version() -> Optional[int]:
+    """Возвращает номер версии каталога меню из таблицы catalog_version или None, если таблица еще не создана."""
+
+    try:
+        row = postgres_client.fetch_one("SELECT version FROM catalog_version")
+    except errors.UndefinedTable:
+        return None
+    return row[0] if row else None
+
+
+def get_missing_schema_tables() -> List[str]:
+    """
+    Возвращает названия таблиц из UPGRADE_TABLES, которых нет в базе данных, хотя нужные им таблицы уже созданы.
+
+    Для selection_dishes, разбитой на секции, проверяется и секция по умолчанию.
+    """
+
+    missing_tables = [
+        table_name
+        for table_name, required_tables in UPGRADE_TABLES.items()
+        if all(map(is_table_in_db, required_tables)) and not is_table_in_db(table_name)
+    ]
+    if is_partitioned_table("selection_dishes") and not selection_partitions.has_relation(
+        SELECTION_DEFAULT_PARTITION, _get_selection_partitions_name
+    ):
+        missing_tables.append(SELECTION_DEFAULT_PARTITION)
+    return missing_tables
+
+
+def ensure_schema_objects() -> None:
+    """
+    Создает на существующей базе данных служебные таблицы из UPGRADE_TABLES вместе с их триггерами.
+
+    Таблицы счетчиков популярности сразу заполняются по истории нажатий. Вызов можно повторять: уже созданные таблицы
+    не изменяются.
+    """
+
+    create_table = {
+        "catalog_version": create_table_catalog_version,
+        "dish_popularity": rebuild_popularity_rollups,
+        "user_popularity": rebuild_popularity_rollups,
+        SELECTION_DEFAULT_PARTITION: create_selection_default_partition,
+    }
+    for create in dict.fromkeys(create_table[table_name] for table_name in get_missing_schema_tables()):
+        create()
+    refresh_schema_state()
+
+
+def create_table_dish_popularity() -> None:
+    """
+    Создает таблицу dish_popularity со счетчиком нажатий на каждое блюдо.
+
+    Счетчики обновляются вместе с записью нажатий в selection_dishes и используются в отчете о популярных блюдах.
+    """
+
+    postgres_client.create_table(
+        "dish_popularity",
+        """dish_id INTEGER PRIMARY KEY,
+              selections_count BIGINT NOT NULL DEFAULT 0,
+          FOREIGN KEY (dish_id) REFERENCES dishes (dish_id) ON DELETE CASCADE""",
+    )
+    _create_table_indexes("dish_popularity")
+
+
+def create_table_user_popularity() -> None:
+    """
+    Создает таблицу user_popularity со счетчиком нажатий на блюда каждого пользователя.
+
+    Счетчики обновляются вместе с записью нажатий в selection_dishes и используются в отчете об активных пользователях.
+    """
+
+    postgres_client.create_table(
+        "user_popularity",
+        """username VARCHAR(255) PRIMARY KEY,
+           selections_count BIGINT NOT NULL DEFAULT 0""",
+    )
+    _create_table_indexes("user_popularity")
+
+
+def rebuild_popularity_rollups() -> None:
+    """
+    Пересчитывает таблицы dish_popularity и user_popularity по всей истории нажатий из selection_dishes.
+
+    Создает таблицы, если их нет. Пересчет идет в одной транзакции под блокировкой selection_dishes в режиме SHARE:
+    она дожидается завершения уже начатых записей нажатий и не дает начать новые до конца пересчета. Поэтому
+    пачка, записанная без счетчиков, пока таблиц еще не было, попадает в пересчет, а параллельная запись нажатий
+    не теряется и не учитывается дважды.
+    """
+
+    create_table_dish_popularity()
+    create_table_user_popularity()
+
+    with postgres_client.cursor() as cursor:
+        cursor.execute("LOCK TABLE selection_dishes IN SHARE MODE")
+        cursor.execute("TRUNCATE dish_popularity, user_popularity")
+        cursor.execute(
+            """
+            INSERT INTO dish_popularity (dish_id, selections_count)
+                 SELECT dish_id, count(*) FROM selection_dishes GROUP BY dish_id
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO user_popularity (username, selections_count)
+                 SELECT username, count(*) FROM selection_dishes GROUP BY username
+            """
+        )
+    refresh_schema_state()
+
+
+def partition_selection_dishes() -> int:
+    """
+    Переносит историю нажатий из таблицы selection_dishes без секций в таблицу, разбитую на секции по месяцам.
+
+    Перенос идет в одной транзакции: старая таблица переименовывается, для всех месяцев ее истории создаются секции,
+    строки копируются, а индексы строятся уже по заполненным секциям. Запись нажатий на время переноса
+    блокируется. Возвращает количество перенесенных строк, 0 - если таблица уже разбита на секции или не создана.
+    """
+
+    if not is_table_in_db("selection_dishes") or postgres_client.is_partitioned_table("selection_dishes"):
+        return 0
+
+    with postgres_client.cursor() as cursor:
+        cursor.execute("LOCK TABLE selection_dishes IN EXCLUSIVE MODE")
+        cursor.execute("ALTER TABLE selection_dishes RENAME TO selection_dishes_unpartitioned")
+        cursor.execute(
+            "ALTER TABLE selection_dishes_unpartitioned "
+            "RENAME CONSTRAINT selection_dishes_pkey TO selection_dishes_unpartitioned_pkey"
+        )
+        cursor.execute(
+            "CREATE TABLE selection_dishes ({}) PARTITION BY RANGE (datetime)".format(SELECTION_DISHES_COLUMNS)
+        )
+
+        cursor.execute("SELECT min(datetime), max(datetime) FROM selection_dishes_unpartitioned")
+        first, last = cursor.fetchone()
+        now = datetime.now(SELECTIONS_TIMEZONE)
+        for month in _iter_months(min(first or now, now), max(last or now, now), SELECTIONS_PARTITIONS_AHEAD):
+            start, end = get_selection_partition_bounds(month)
+            cursor.execute(
+                "CREATE TABLE {} PARTITION OF selection_dishes FOR VALUES FROM (%s) TO (%s)".format(
+                    get_selection_partition_name(month)
+                ),
+                (start.isoformat(), end.isoformat()),
+            )
+        cursor.execute(f"CREATE TABLE {SELECTION_DEFAULT_PARTITION} PARTITION OF selection_dishes DEFAULT")
+
+        cursor.execute(
+            """
+            INSERT INTO selection_dishes (selection_dishes_id, username, dish_id, datetime)
+                 SELECT selection_dishes_id, username, dish_id, datetime FROM selection_dishes_unpartitioned
+            """
+        )
+        rows = cursor.rowcount
+        cursor.execute(
+            """
+            SELECT setval(
+                pg_get_serial_sequence('selection_dishes', 'selection_dishes_id'),
+                (SELECT coalesce(max(selection_dishes_id), 0) + 1 FROM selection_dishes),
+                false
+            )
+            """
+        )
+        # индексы старой таблицы удаляются вместе с ней, поэтому их названия освобождаются для новых индексов
+        cursor.execute("DROP TABLE selection_dishes_unpartitioned")
+        for index in SCHEMA_INDEXES:
+            if index.table == "selection_dishes":
+                cursor.execute(
+                    "CREATE {}INDEX {} ON {}{} ({})".format(
+                        "UNIQUE " if index.unique else "",
+                        index.name,
+                        index.table,
+                        f" USING {index.method}" if index.method else "",
+                        index.columns,
+                    )
+                )
+
+    refresh_schema_state()
+    return rows
+
+
+def ensure_selection_partitions(
+    moments: Iterable[datetime], months_ahead: int = SELECTIONS_PARTITIONS_AHEAD
+) -> List[str]:
+    """
+    Создает недостающие секции selection_dishes для месяцев моментов moments и months_ahead следующих месяцев.
+
+    Наличие секций проверяется по кэшу selection_partitions, поэтому на уже созданных секциях вызов не обращается
+    к базе данных, кроме периодического обновления кэша. Если таблица не разбита на секции, ничего не делает.
+    Нажатия этих месяцев, уже попавшие в секцию по умолчанию, переносятся в новые секции. Возвращает названия
+    созданных секций.
+    """
+
+    moments = list(moments)
+    if not moments or not is_partitioned_table("selection_dishes"):
+        return []
+
+    created = []
+    for month in _iter_months(min(moments), max(moments), months_ahead):
+        partition_name = get_selection_partition_name(month)
+        if selection_partitions.has_relation(partition_name, _get_selection_partitions_name):
+            continue
+        start, end = get_selection_partition_bounds(month)
+        try:
+            postgres_client.create_range_partition(
+                partition_name, "selection_dishes", start.isoformat(), end.isoformat()
+            )
+        except errors.CheckViolation:
+            # в секции по умолчанию уже есть нажатия этого месяца, и PostgreSQL не создает секцию поверх них
+            _create_selection_partition_from_default(partition_name, start, end)
+        created.append(partition_name)
+
+    if created:
+        selection_partitions.refresh(_get_selection_partitions_name)
+    return created
+
+
+def _create_selection_partition_from_default(partition_name: str, start: datetime, end: datetime) -> None:
+    """
+    Создает секцию partition_name для нажатий от start до end и переносит в нее нажатия из секции по умолчанию.
+
+    Перенос идет одной транзакцией. На время переноса запись в секцию по умолчанию блокируется, поэтому в ней
+    не остается нажатий этого месяца, а секцию не может одновременно создать другой процесс.
+    """
+
+    bounds = (start.isoformat(), end.isoformat())
+    with postgres_client.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {SELECTION_DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute("SELECT to_regclass(%s)", (partition_name,))
+        if cursor.fetchone()[0] is not None:
+            return
+        cursor.execute(f"CREATE TABLE {partition_name} (LIKE selection_dishes INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {SELECTION_DEFAULT_PARTITION} WHERE datetime >= %s AND datetime < %s RETURNING *
+            )
+            INSERT INTO {partition_name} SELECT * FROM moved
+            """,
+            bounds,
+        )
+        cursor.execute(
+            f"ALTER TABLE selection_dishes ATTACH PARTITION {partition_name} FOR VALUES FROM (%s) TO (%s)", bounds
+        )
+
+
+def get_selection_partition_name(month: Tuple[int, int]) -> str:
+    """Возвращает название секции selection_dishes для месяца month, переданного кортежем (год, месяц)."""
+
+    year, month_number = month
+    return f"selection_dishes_y{year}m{month_number:02}"
+
+
+def get_expired_selection_partitions(before: datetime) -> List[str]:
+    """Возвращает по порядку названия месячных секций selection_dishes, все нажатия которых сделаны раньше before."""
+
+    expired = []
+    for (partition_name,) in _get_selection_partitions_name():
+        match = SELECTION_PARTITION_NAME.fullmatch(partition_name)
+        if match is None:
+            continue
+        month = (int(match.group(1)), int(match.group(2)))
+        if get_selection_partition_bounds(month)[1] <= before:
+            expired.append(partition_name)
+    return sorted(expired)
+
+
+def iter_partition_rows(partition_name: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[Tuple[Any, ...]]]:
+    """Выдает частями по chunk_size строки секции selection_dishes в порядке колонок RETENTION_TABLES."""
+
+    query = "SELECT {} FROM {} ORDER BY selection_dishes_id".format(
+        ", ".join(RETENTION_TABLES["selection_dishes"].columns), partition_name
+    )
+    return postgres_client.iter_chunks(query, chunk_size=chunk_size)
+
+
+def drop_selection_partition(partition_name: str) -> None:
+    """
+    Удаляет секцию selection_dishes вместе с ее строками и обновляет кэш секций.
+
+    В той же транзакции уменьшает счетчики dish_popularity и user_popularity на нажатия из секции, чтобы они
+    совпадали с оставшейся историей нажатий.
+    """
+
+    with postgres_client.cursor() as cursor:
+        cursor.execute("SELECT dish_id, count(*) FROM {} GROUP BY dish_id".format(partition_name))
+        dish_counts = Counter(dict(cursor.fetchall()))
+        cursor.execute("SELECT username, count(*) FROM {} GROUP BY username".format(partition_name))
+        user_counts = Counter(dict(cursor.fetchall()))
+        cursor.execute("DROP TABLE IF EXISTS {} CASCADE".format(partition_name))
+        _decrement_popularity_rollups(cursor, dish_counts, user_counts)
+    selection_partitions.refresh(_get_selection_partitions_name)
+
+
+def get_selection_partition_bounds(month: Tuple[int, int]) -> Tuple[datetime, datetime]:
+    """Возвращает начало месяца month и начало следующего месяца в часовом поясе SELECTIONS_TIMEZONE."""
+
+    year, month_number = month
+    next_year, next_month_number = _add_months(month, 1)
+    return (
+        SELECTIONS_TIMEZONE.localize(datetime(year, month_number, 1)),
+        SELECTIONS_TIMEZONE.localize(datetime(next_year, next_month_number, 1)),
+    )
+
+
+def _iter_months(first: datetime, last: datetime, months_ahead: int = 0) -> Iterator[Tuple[int, int]]:
+    """Выдает кортежи (год, месяц) от месяца first до месяца last и еще months_ahead месяцев после него."""
+
+    first, last = first.astimezone(SELECTIONS_TIMEZONE), last.astimezone(SELECTIONS_TIMEZONE)
+    month = (first.year, first.month)
+    stop = _add_months((last.year, last.month), months_ahead)
+    while month <= stop:
+        yield month
+        month = _add_months(month, 1)
+
+
+def _add_months(month: Tuple[int, int], months: int) -> Tuple[int, int]:
+    year, month_number = month
+    year, month_index = divmod(year * 12 + month_number - 1 + months, 12)
+    return year, month_index + 1
+
+
+def _get_selection_partitions_name() -> List[Tuple[str]]:
+    """Возвращает названия таблицы selection_dishes и ее секций для кэша или пустой список, если секций нет."""
+
+    if not postgres_client.is_partitioned_table("selection_dishes"):
+        return []
+    return [("selection_dishes",)] + postgres_client.select_partitions_name_from_db("selection_dishes")
+
+
 def get_all_tables_name_from_db() -> List[Tuple[str]]:
     """Возвращает список всех таблиц из базы данных в виде картежей с названиями."""
 
     return postgres_client.select_all_tables_name_from_db()
 
 
+def is_table_in_db(table_name: str) -> bool:
+    """Проверяет по кэшу состояния схемы, существует ли в базе данных таблица table_name."""
+
+    return schema_state.has_relation(table_name, _get_schema_relations_name)
+
+
+def is_index_in_db(index_name: str) -> bool:
+    """Проверяет по кэшу состояния схемы, существует ли в базе данных готовый к работе индекс index_name."""
+
+    return schema_state.has_relation(index_name, _get_schema_relations_name)
+
+
+def is_partitioned_table(table_name: str) -> bool:
+    """Проверяет по кэшу секций, разбита ли таблица table_name на секции. На секции разбита только selection_dishes."""
+
+    return table_name == "selection_dishes" and selection_partitions.has_relation(
+        table_name, _get_selection_partitions_name
+    )
+
+
+def _get_schema_relations_name() -> List[Tuple[str]]:
+    """Возвращает названия всех таблиц и готовых к работе индексов базы данных для кэша состояния схемы."""
+
+    indexes = postgres_client.select_all_indexes_name_from_db()
+    return get_all_tables_name_from_db() + [
+        (index_name,) for index_name, is_valid in indexes if is_valid
+    ]
+
+
+def get_missing_schema_indexes() -> List[SchemaIndex]:
+    """Возвращает индексы из SCHEMA_INDEXES, которых нет в базе данных, хотя их таблица уже создана."""
+
+    return [
+        index
+        for index in SCHEMA_INDEXES
+        if is_table_in_db(index.table) and not is_index_in_db(index.name)
+    ]
+
+
+def get_obsolete_schema_indexes() -> List[str]:
+    """Возвращает названия индексов из OBSOLETE_SCHEMA_INDEXES, которые еще остались в базе данных."""
+
+    return [index_name for index_name in OBSOLETE_SCHEMA_INDEXES if is_index_in_db(index_name)]
+
+
+def ensure_schema_indexes() -> List[str]:
+    """
+    Создает недостающие индексы из SCHEMA_INDEXES на существующей базе данных и удаляет устаревшие.
+
+    Индексы строятся через CREATE INDEX CONCURRENTLY, чтобы не блокировать запись в рабочие таблицы, кроме индексов
+    таблиц, разбитых на секции, для которых CONCURRENTLY не поддерживается. Недостроенный
+    индекс от прерванной попытки сначала удаляется. Устаревший индекс из OBSOLETE_SCHEMA_INDEXES удаляется, только
+    когда заменивший его индекс уже построен. Возвращает список описаний ошибок для индексов, которые создать
+    или удалить не удалось, например уникальный индекс при наличии дубликатов.
+    """
+
+    failures = []
+    for index in get_missing_schema_indexes():
+        # индекс таблицы, разбитой на секции, нельзя построить через CONCURRENTLY
+        concurrently = not is_partitioned_table(index.table)
+        try:
+            postgres_client.drop_index(index.name, concurrently=concurrently)
+            postgres_client.create_index(
+                index.name, index.table, index.columns, index.unique, concurrently=concurrently, method=index.method
+            )
+        except errors.UniqueViolation:
+            postgres_client.drop_index(index.name, concurrently=concurrently)
+            failures.append(f"{index.name}: в таблице {index.table} есть повторяющиеся значения")
+        except errors.Error as error:
+            failures.append(f"{index.name}: {error.pgerror or error}")
+
+    refresh_schema_state()
+    obsolete_indexes = [
+        index_name
+        for index_name in get_obsolete_schema_indexes()
+        if is_index_in_db(OBSOLETE_SCHEMA_INDEXES[index_name])
+    ]
+    for index_name in obsolete_indexes:
+        try:
+            postgres_client.drop_index(index_name, concurrently=True)
+        except errors.Error as error:
+            failures.append(f"{index_name}: {error.pgerror or error}")
+    if obsolete_indexes:
+        refresh_schema_state()
+    return failures
+
+
+def _create_table_indexes(table_name: str) -> None:
+    """Создает индексы из SCHEMA_INDEXES для только что созданной таблицы table_name."""
+
+    for index in SCHEMA_INDEXES:
+        if index.table == table_name:
+            postgres_client.create_index(index.name, index.table, index.columns, index.unique, method=index.method)
+
+
+def refresh_schema_state() -> None:
+    """
+    Перечитывает из базы данных список существующих таблиц и сбрасывает кэш каталога.
+
+    Вызывается при старте бота и после изменения схемы, например после создания меню.
+    """
+
+    schema_state.refresh(_get_schema_relations_name)
+    selection_partitions.refresh(_get_selection_partitions_name)
+    catalog_cache.invalidate()
+
+
 def get_all_categories_data() -> List[Tuple[str, ...]]:
     """
     Возвращает кортежи с id и названием категории из таблицы menu_categories.
 
-    Вернет пустой список, если не найдет таблицу или категории.
+    Вернет пустой список, если не найдет таблицу или категории. Данные читаются из кэша каталога.
     """
+
+    return catalog_cache.get_categories(_select_all_categories_data)
+
+
+def _select_all_categories_data() -> List[Tuple[str, ...]]:
+    """Загружает из базы данных все категории из таблицы menu_categories."""
+
     try:
         return postgres_client.select_all_from_table("menu_categories")
     except errors.UndefinedTable:
@@ -90,22 +823,22 @@ def get_all_categories_data() -> List[Tuple[str, ...]]:
 def insert_category_in_table_menu_categories(category_name: str) -> None:
     """Добавляет переданную строку с названием категории в таблицу category_name."""
 
-    postgres_client.insert_in_table(
-        table_name="menu_categories", name_category=category_name
-    )
+    try:
+        postgres_client.insert_in_table(
+            table_name="menu_categories", name_category=category_name
+        )
+    except errors.UniqueViolation:
+        raise DuplicateCategoryError("Категория с таким названием уже существует.")
+    catalog_cache.invalidate_categories()
 
 
 def get_category_id_where_category_name(category_name: str) -> Optional[int]:
     """Возвращает id категории, название которой совпадает с названием переданным в category_name."""
 
-    query = (
-        f"SELECT category_id FROM menu_categories WHERE name_category='{category_name}'"
+    result = postgres_client.fetch_all_prepared(
+        "select_category_id_where_category_name", (category_name,)
     )
 
-    postgres_client.cursor.execute(query)
-
-    result = postgres_client.cursor.fetchall()
-
     return result[0][0] if result else None
 
 
@@ -125,23 +858,166 @@ def insert_dish_in_dishes_table(
         raise InvalidSQLType(
             "Передан неверный тип данных. Вероятно в цену передано не число."
         )
+    catalog_cache.invalidate_category(category_id)
+
+
+def import_dishes_in_dishes_table(
+    dishes: List[Tuple[str, str, str, Optional[str]]],
+    create_missing_categories: bool = True,
+) -> List[str]:
+    """
+    Загружает блюда в таблицу dishes одной транзакцией через COPY.
+
+    Каждое блюдо передается кортежем (название категории, название блюда, цена, описание). Все категории ищутся
+    одним запросом, недостающие создаются одним запросом, если create_missing_categories=True, а категории, которые
+    в это время создал другой запрос, перечитываются. Иначе блюда из неизвестных категорий пропускаются.
+    Возвращает список названий неизвестных категорий.
+    """
+
+    category_names = sorted({category_name for category_name, *_ in dishes})
+
+    with postgres_client.cursor() as cursor:
+        cursor.execute(
+            "SELECT name_category, category_id FROM menu_categories WHERE name_category = ANY(%s)",
+            (category_names,),
+        )
+        category_ids = dict(cursor.fetchall())
+        missing_categories = [name for name in category_names if name not in category_ids]
+
+        if missing_categories and create_missing_categories:
+            category_ids.update(
+                extras.execute_values(
+                    cursor,
+                    "INSERT INTO menu_categories (name_category) VALUES %s "
+                    "ON CONFLICT DO NOTHING RETURNING name_category, category_id",
+                    [(name,) for name in missing_categories],
+                    fetch=True,
+                )
+            )
+            # категории, которые одновременно добавил другой импорт или /add_category, перечитываются
+            added_concurrently = [name for name in missing_categories if name not in category_ids]
+            if added_concurrently:
+                cursor.execute(
+                    "SELECT name_category, category_id FROM menu_categories WHERE name_category = ANY(%s)",
+                    (added_concurrently,),
+                )
+                category_ids.update(cursor.fetchall())
+            missing_categories = []
+
+        copy_rows(
+            cursor,
+            "dishes",
+            ("name_dish", "category_id", "price", "description"),
+            [
+                (dish_name, category_ids[category_name], price, description)
+                for category_name, dish_name, price, description in dishes
+                if category_name in category_ids
+            ],
+        )
+
+    catalog_cache.invalidate()
+    return missing_categories
 
 
 def get_dishes_from_category_where(category_id: str) -> Optional[Tuple[int, str]]:
     """Возвращает кортеж с данными из таблицы dishes, где поле category_id соответствует переданному id."""
 
-    query = f"SELECT dish_id, name_dish FROM dishes WHERE category_id={category_id}"
-    postgres_client.cursor.execute(query)
-    result = postgres_client.cursor.fetchall()
+    return catalog_cache.get_dishes(
+        category_id, lambda: _select_dishes_from_category_where(category_id)
+    )
+
+
+def _select_dishes_from_category_where(category_id: str) -> Optional[Tuple[int, str]]:
+    """Загружает из базы данных блюда категории category_id."""
+
+    result = postgres_client.fetch_all_prepared(
+        "select_dishes_from_category_where", (category_id,)
+    )
     return result if result else None
 
 
-def get_dish_parameters(dish_id: str) -> Dict[str, Any]:
-    """Возвращает словарь с информацией о конкретном товаре, id которого совпадает с переданным dish_id."""
+def get_categories_page(after: int = 0, page_size: int = MENU_PAGE_SIZE) -> MenuPage:
+    """
+    Возвращает страницу из page_size категорий с id больше after.
+
+    Страницы читаются из кэша каталога, а при промахе загружаются запросом по ключу, стоимость которого не зависит
+    от номера страницы и размера меню.
+    """
+
+    return catalog_cache.get_categories_page(
+        after, page_size, lambda: _select_categories_page(after, page_size)
+    )
+
+
+def _select_categories_page(after: int, page_size: int) -> MenuPage:
+    """Загружает из базы данных страницу категорий после категории after."""
+
+    try:
+        rows = postgres_client.fetch_all_prepared("select_categories_page", (after, page_size + 1))
+        previous_cursor = None
+        if after:
+            previous_row = postgres_client.fetch_one_prepared(
+                "select_categories_previous_cursor", (after, page_size)
+            )
+            previous_cursor = previous_row[0] if previous_row else 0
+    except errors.UndefinedTable:
+        return MenuPage([], None, None)
+    return make_menu_page(rows, page_size, previous_cursor)
+
+
+def get_dishes_page(category_id: int, after: int = 0, page_size: int = MENU_PAGE_SIZE) -> MenuPage:
+    """
+    Возвращает страницу из page_size блюд категории category_id с id больше after.
+
+    Страницы читаются из кэша каталога, а при промахе загружаются запросом по ключу (category_id, dish_id).
+    """
+
+    return catalog_cache.get_dishes_page(
+        category_id, after, page_size, lambda: _select_dishes_page(category_id, after, page_size)
+    )
+
+
+def _select_dishes_page(category_id: int, after: int, page_size: int) -> MenuPage:
+    """Загружает из базы данных страницу блюд категории category_id после блюда after."""
+
+    rows = postgres_client.fetch_all_prepared("select_dishes_page", (category_id, after, page_size + 1))
+    previous_cursor = None
+    if after:
+        previous_row = postgres_client.fetch_one_prepared(
+            "select_dishes_previous_cursor", (category_id, after, page_size)
+        )
+        previous_cursor = previous_row[0] if previous_row else 0
+    return make_menu_page(rows, page_size, previous_cursor)
+
+
+def make_menu_page(rows: List[Tuple[int, str]], page_size: int, previous_cursor: Optional[int]) -> MenuPage:
+    """
+    Собирает страницу из rows, загруженных с запасом в одну строку.
+
+    Лишняя строка означает, что есть следующая страница, курсор которой - id последней строки этой страницы.
+    """
+
+    items = [tuple(row) for row in rows[:page_size]]
+    next_cursor = items[-1][0] if len(rows) > page_size else None
+    return MenuPage(items, previous_cursor, next_cursor)
+
+
+def get_dish_parameters(dish_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает словарь с информацией о конкретном товаре, id которого совпадает с переданным dish_id.
+
+    Вернет None, если блюда нет в меню, например если его удалили после отправки кнопки пользователю.
+    """
+
+    return catalog_cache.get_dish(dish_id, lambda: _select_dish_parameters(dish_id))
+
+
+def _select_dish_parameters(dish_id: str) -> Optional[Dict[str, Any]]:
+    """Загружает из базы данных параметры блюда dish_id. Вернет None, если блюда нет в меню."""
 
-    query = f"SELECT * FROM dishes WHERE dish_id={dish_id}"
-    postgres_client.cursor.execute(query)
-    cursor_data = postgres_client.cursor.fetchone()
+    cursor_data = postgres_client.fetch_one_prepared("select_dish_parameters", (dish_id,))
+    if cursor_data is None:
+        return None
 
     return {
         "id": cursor_data[0],
@@ -153,19 +1029,157 @@ def get_dish_parameters(dish_id: str) -> Dict[str, Any]:
     }
 
 
-def add_dish_selection_in_selection_dishes_table(user_name: str, dish_id: str):
-    """Добавляет данные о пользователе и блюде, которое выбрал пользователь в таблицу selection_dishes."""
+def add_dish_selection_in_selection_dishes_table(user_name: str, dish_id: str, block: bool = True):
+    """
+    Добавляет данные о пользователе и блюде, которое выбрал пользователь в таблицу selection_dishes.
+
+    Запись ставится в очередь selection_dishes_writer и попадает в базу фоновым потоком вместе с другими нажатиями.
+    С block=False при переполненной очереди запись отбрасывается сразу и учитывается в статистике очереди.
+    """
 
-    postgres_client.insert_in_table(
-        table_name="selection_dishes",
-        username=user_name,
-        dish_id=dish_id,
-        datetime=str(datetime.now(pytz.timezone("Europe/Minsk"))),
+    selection_dishes_writer.put((user_name, dish_id, datetime.now(SELECTIONS_TIMEZONE)), block=block)
+
+
+def _insert_dish_selections(rows: List[Tuple[str, str, datetime]]) -> None:
+    """
+    Записывает пачку нажатий на блюда в таблицу selection_dishes одним запросом.
+
+    В той же транзакции увеличивает счетчики в dish_popularity и user_popularity. Наличие таблиц счетчиков проверяет
+    сама база данных, а не кэш состояния схемы, поэтому счетчики обновляются сразу после того, как таблицы создал
+    другой процесс. Если таблиц еще нет, записываются только нажатия. Секции selection_dishes для месяцев нажатий
+    создаются заранее, если их еще нет. Если секции месяца нажатий все же не нашлось, например таблицу разбил
+    на секции другой процесс, кэш секций перечитывается из базы данных и запись повторяется.
+    """
+
+    moments = [selected_at for _, _, selected_at in rows]
+    ensure_selection_partitions(moments)
+    try:
+        _write_dish_selections(rows)
+    except errors.CheckViolation:
+        selection_partitions.refresh(_get_selection_partitions_name)
+        ensure_selection_partitions(moments)
+        _write_dish_selections(rows)
+
+
+def _write_dish_selections(rows: List[Tuple[str, str, datetime]]) -> None:
+    """Записывает нажатия rows в selection_dishes и увеличивает счетчики популярности одной транзакцией."""
+
+    with postgres_client.cursor() as cursor:
+        extras.execute_values(
+            cursor,
+            "INSERT INTO selection_dishes (username, dish_id, datetime) VALUES %s",
+            rows,
+            page_size=len(rows),
+        )
+        cursor.execute("SAVEPOINT popularity_rollups")
+        try:
+            _increment_popularity_rollups(cursor, rows)
+        except errors.UndefinedTable:
+            cursor.execute("ROLLBACK TO SAVEPOINT popularity_rollups")
+
+
+def _increment_popularity_rollups(cursor: Any, rows: List[Tuple[str, str, datetime]]) -> None:
+    """Увеличивает счетчики dish_popularity и user_popularity на нажатия rows в транзакции курсора cursor."""
+
+    dish_counts = Counter(int(dish_id) for _, dish_id, _ in rows)
+    user_counts = Counter(username for username, _, _ in rows)
+
+    # счетчики обновляются в отсортированном порядке, чтобы параллельные транзакции не блокировали друг друга
+    extras.execute_values(
+        cursor,
+        """
+        INSERT INTO dish_popularity (dish_id, selections_count) VALUES %s
+        ON CONFLICT (dish_id)
+        DO UPDATE SET selections_count = dish_popularity.selections_count + EXCLUDED.selections_count
+        """,
+        sorted(dish_counts.items()),
+        page_size=len(dish_counts),
     )
+    extras.execute_values(
+        cursor,
+        """
+        INSERT INTO user_popularity (username, selections_count) VALUES %s
+        ON CONFLICT (username)
+        DO UPDATE SET selections_count = user_popularity.selections_count + EXCLUDED.selections_count
+        """,
+        sorted(user_counts.items()),
+        page_size=len(user_counts),
+    )
+
+
+def _decrement_popularity_rollups(cursor: Any, dish_counts: Counter, user_counts: Counter) -> None:
+    """
+    Уменьшает счетчики dish_popularity и user_popularity на удаленные нажатия в транзакции курсора cursor.
+
+    Счетчики, дошедшие до нуля, удаляются, как если бы их пересчитали по оставшейся истории. Если таблиц счетчиков
+    еще нет, ничего не меняется: их заполнит пересчет по оставшейся истории.
+    """
+
+    cursor.execute("SAVEPOINT popularity_rollups")
+    try:
+        # счетчики обновляются в том же порядке, что и при записи нажатий, чтобы транзакции не блокировали друг друга
+        for table, key, counts in (
+            ("dish_popularity", "dish_id", sorted((int(dish_id), count) for dish_id, count in dish_counts.items())),
+            ("user_popularity", "username", sorted(user_counts.items())),
+        ):
+            if not counts:
+                continue
+            extras.execute_values(
+                cursor,
+                """
+                UPDATE {table} SET selections_count = {table}.selections_count - removed.selections_count
+                  FROM (VALUES %s) AS removed ({key}, selections_count)
+                 WHERE {table}.{key} = removed.{key}
+                """.format(table=table, key=key),
+                counts,
+                page_size=len(counts),
+            )
+            cursor.execute(
+                "DELETE FROM {table} WHERE {key} = ANY(%s) AND selections_count <= 0".format(table=table, key=key),
+                ([item for item, _ in counts],),
+            )
+    except errors.UndefinedTable:
+        cursor.execute("ROLLBACK TO SAVEPOINT popularity_rollups")
+
+
+# ошибки, после которых фоновые очереди повторяют запись пачки: потеря соединения, перезапуск базы данных,
+# исчерпанный пул соединений
+WRITE_BEHIND_RETRY_ERRORS = (errors.OperationalError, errors.InterfaceError, PoolTimeoutError)
+# ошибки в данных отдельных записей: пачка делится, и отбрасываются только ошибочные записи
+WRITE_BEHIND_SPLIT_ERRORS = (errors.IntegrityError, errors.DataError)
+
+selection_dishes_writer = WriteBehindQueue(
+    flush=_insert_dish_selections,
+    batch_size=SELECTIONS_BATCH_SIZE,
+    flush_interval=SELECTIONS_FLUSH_INTERVAL,
+    max_queue_size=SELECTIONS_QUEUE_SIZE,
+    overflow=SELECTIONS_QUEUE_OVERFLOW,
+    max_retries=WRITE_BEHIND_MAX_RETRIES,
+    retry_delay=WRITE_BEHIND_RETRY_DELAY,
+    retry_errors=WRITE_BEHIND_RETRY_ERRORS,
+    split_errors=WRITE_BEHIND_SPLIT_ERRORS,
+    name="selection_dishes-writer",
+)
+
+
+def flush_write_behind_queues() -> None:
+    """Останавливает фоновые очереди записи и сбрасывает накопленные в них данные в базу."""
+
+    selection_dishes_writer.close()
+    last_messages_writer.close()
 
 
 def add_message_in_last_messages_table(message: str) -> None:
-    """Добавляет строку message в таблицу last_messages."""
+    """
+    Добавляет строку message в таблицу last_messages.
+
+    При включенной настройке LAST_MESSAGES_BUFFERED сообщение ставится в очередь last_messages_writer и попадает в
+    базу фоновым потоком пачкой через COPY.
+    """
+
+    if LAST_MESSAGES_BUFFERED:
+        last_messages_writer.put((message,))
+        return
 
     postgres_client.insert_in_table(
         table_name="last_messages",
@@ -173,49 +1187,137 @@ def add_message_in_last_messages_table(message: str) -> None:
     )
 
 
-def get_last_messages(limit: int = 10) -> List[Tuple[str]]:
-    """Получает n-ное количество последних сообщений из таблицы last_messages."""
+def _copy_last_messages(rows: List[Tuple[str]]) -> None:
+    """Загружает пачку сообщений в таблицу last_messages через COPY."""
+
+    postgres_client.copy_in_table("last_messages", ("text_message",), rows)
 
-    query = f"SELECT text_message FROM last_messages ORDER BY last_message_id DESC LIMIT ({limit})"
-    postgres_client.cursor.execute(query)
-    return postgres_client.cursor.fetchall()
+
+last_messages_writer = WriteBehindQueue(
+    flush=_copy_last_messages,
+    batch_size=LAST_MESSAGES_BATCH_SIZE,
+    flush_interval=LAST_MESSAGES_FLUSH_INTERVAL,
+    max_queue_size=LAST_MESSAGES_QUEUE_SIZE,
+    overflow=LAST_MESSAGES_QUEUE_OVERFLOW,
+    max_retries=WRITE_BEHIND_MAX_RETRIES,
+    retry_delay=WRITE_BEHIND_RETRY_DELAY,
+    retry_errors=WRITE_BEHIND_RETRY_ERRORS,
+    split_errors=WRITE_BEHIND_SPLIT_ERRORS,
+    name="last_messages-writer",
+)
 
 
-def get_top_dishes_from_selection_dishes_table(limit: int) -> List[Tuple[str, int]]:
+def get_retention_max_id(table_name: str, keep_rows: int) -> Optional[int]:
     """
-    Получает n-ное количество названий блюд и количество раз, когда это блюдо было выбрано.
+    Возвращает наибольший id строк таблицы table_name, которые не входят в keep_rows самых новых строк.
 
-    Данные берутся из выборки количества всех выбранных пользователями блюд.
+    Если строк в таблице не больше keep_rows, возвращает None.
     """
 
-    query = f"""
-        SELECT name_dish, count(name_dish) 
-          FROM selection_dishes JOIN dishes USING(dish_id)
-      GROUP BY name_dish
-      ORDER BY count DESC
-         LIMIT {limit}
-        """
-    postgres_client.cursor.execute(query)
-    return postgres_client.cursor.fetchall()
+    table = RETENTION_TABLES[table_name]
+    row = postgres_client.fetch_one(
+        "SELECT {0} FROM {1} ORDER BY {0} DESC OFFSET %s LIMIT 1".format(table.id_column, table_name), (keep_rows,)
+    )
+    return row[0] if row else None
 
 
-def get_top_users_from_selection_dishes_table(limit: int) -> List[Tuple[str, int]]:
+def delete_retention_batch(
+    table_name: str,
+    batch_size: int,
+    archive: Callable[[List[Tuple[Any, ...]]], None],
+    before: Optional[datetime] = None,
+    max_id: Optional[int] = None,
+) -> int:
     """
-    Получает n-ное количество ников пользователей и количество блюд, которые они выбирали.
+    Удаляет одной транзакцией не больше batch_size самых старых строк таблицы table_name и возвращает их количество.
 
-    Данные берутся из выборки количества всех выбранных пользователями блюд.
+    Удаляются строки, добавленные раньше before или с id не больше max_id. Удаленные строки передаются в archive
+    до фиксации транзакции, поэтому если архив не удалось записать, строки остаются в таблице. Счетчики
+    dish_popularity и user_popularity уменьшаются на удаленные нажатия в той же транзакции.
     """
 
-    query = f"""
-        SELECT username, count(username) 
-          FROM selection_dishes JOIN dishes USING(dish_id)
-      GROUP BY username
-      ORDER BY count DESC
-         LIMIT {limit}
-        """
-    postgres_client.cursor.execute(query)
-    return postgres_client.cursor.fetchall()
+    table = RETENTION_TABLES[table_name]
+    conditions, params = [], []
+    if before is not None:
+        conditions.append(f"{table.time_column} < %s")
+        params.append(before)
+    if max_id is not None:
+        conditions.append(f"{table.id_column} <= %s")
+        params.append(max_id)
+    if not conditions:
+        raise ValueError("Не задано условие удаления строк.")
+
+    query = """
+        DELETE FROM {table}
+         WHERE ({key}) IN (
+                SELECT {key} FROM {table} WHERE {conditions} ORDER BY {id_column} LIMIT %s
+               )
+     RETURNING {columns}
+        """.format(
+        table=table_name,
+        key=table.key,
+        conditions=" AND ".join(conditions),
+        id_column=table.id_column,
+        columns=", ".join(table.columns),
+    )
+    with postgres_client.cursor() as cursor:
+        cursor.execute(query, (*params, batch_size))
+        rows = cursor.fetchall()
+        if rows:
+            archive(rows)
+        if rows and table_name == "selection_dishes":
+            _decrement_popularity_rollups(
+                cursor,
+                Counter(dish_id for _, _, dish_id, _ in rows),
+                Counter(username for _, username, _, _ in rows),
+            )
+    return len(rows)
+
+
+def get_table_size(table_name: str) -> int:
+    """Возвращает размер таблицы table_name в байтах вместе с индексами и секциями или 0, если таблицы нет."""
+
+    if not is_table_in_db(table_name):
+        return 0
+    return postgres_client.select_table_size(table_name)
+
+
+def vacuum_table(table_name: str) -> None:
+    """Выполняет VACUUM ANALYZE таблицы table_name после удаления строк."""
+
+    postgres_client.vacuum_table(table_name)
 
 
-if __name__ == "__main__":
-    print(get_top_dishes_from_selection_dishes_table(3))
+def iter_export_rows(
+    source_name: str, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Выдает частями по chunk_size строк данные источника выгрузки source_name из EXPORT_SOURCES.
+
+    Строки читаются серверным курсором, поэтому выгрузка не загружает всю таблицу в память.
+    """
+
+    return postgres_client.iter_chunks(EXPORT_SOURCES[source_name].query, chunk_size=chunk_size)
+
+
+def iter_report_rows(
+    report_name: str,
+    count: int,
+    chunk_size: int = REPORT_CHUNK_SIZE,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Выдает частями по chunk_size не больше count строк отчета report_name из REPORT_QUERIES.
+
+    Строки читаются серверным курсором, поэтому большой отчет не загружается в память целиком. Если заданы start
+    и end, отчет строится по нажатиям от start включительно до end, и запрос читает только секции этого периода.
+    """
+
+    report_query = REPORT_QUERIES[report_name]
+    if start is not None and end is not None:
+        return postgres_client.iter_chunks(report_query.window_query, (start, end, count), chunk_size=chunk_size)
+    query = report_query.query
+    if report_query.rollup_table and not is_table_in_db(report_query.rollup_table):
+        query = report_query.fallback_query
+    return postgres_client.iter_chunks(query, (count,), chunk_size=chunk_size)
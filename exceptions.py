@@ -4,3 +4,27 @@ class CantTableError(ValueError):
 
 class InvalidSQLType(TypeError):
     pass
+
+
+class PoolTimeoutError(TimeoutError):
+    pass
+
+
+class DuplicateCategoryError(ValueError):
+    pass
+
+
+class MenuImportError(ValueError):
+    pass
+
+
+class DataExportError(ValueError):
+    pass
+
+
+class ReportError(ValueError):
+    pass
+
+
+class RetentionError(ValueError):
+    pass
@@ -0,0 +1,317 @@
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+from telebot import apihelper
+
+from config import SLOW_QUERY_THRESHOLD, SLOW_HANDLER_THRESHOLD, INSTRUMENTATION_MAX_STATEMENTS
+
+
+logger = logging.getLogger(__name__)
+
+# границы корзин гистограмм времени выполнения в секундах
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# название, под которым учитываются запросы сверх INSTRUMENTATION_MAX_STATEMENTS разных запросов
+OTHER_STATEMENTS = "other"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$\"])-?\d+(?:\.\d+)?(?![\w\"])")
+_VALUES_LIST = re.compile(r"\((?:\s*\?\s*,)*\s*\?\s*\)(?:\s*,\s*\((?:\s*\?\s*,)*\s*\?\s*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Histogram:
+    """
+    Потокобезопасная гистограмма длительностей с фиксированными границами корзин.
+
+    Хранит количество наблюдений в каждой корзине, их сумму и максимум, поэтому занимает постоянный объем памяти
+    независимо от количества наблюдений.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Учитывает одно наблюдение value."""
+
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            if value > self._max:
+                self._max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Возвращает копию состояния гистограммы.
+
+        В buckets для каждой границы указано количество наблюдений, не превышающих ее, как в формате Prometheus,
+        последняя граница - бесконечность. Перцентили p50, p95 и p99 оцениваются по верхней границе корзины.
+        """
+
+        with self._lock:
+            counts = list(self._counts)
+            count, total, maximum = self._count, self._sum, self._max
+
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+
+        return {
+            "count": count,
+            "sum": total,
+            "max": maximum,
+            "p50": self._quantile(cumulative, count, maximum, 0.50),
+            "p95": self._quantile(cumulative, count, maximum, 0.95),
+            "p99": self._quantile(cumulative, count, maximum, 0.99),
+            "buckets": list(zip(self.buckets + (float("inf"),), cumulative)),
+        }
+
+    def _quantile(self, cumulative, count: int, maximum: float, quantile: float) -> float:
+        """Оценивает квантиль quantile как верхнюю границу первой корзины, в которую он попадает."""
+
+        if not count:
+            return 0.0
+        for bound, bucket_count in zip(self.buckets, cumulative):
+            if bucket_count >= quantile * count:
+                return min(bound, maximum)
+        return maximum
+
+
+class TimingRegistry:
+    """
+    Набор гистограмм длительностей с дополнительными счетчиками, сгруппированных по имени.
+
+    Количество разных имен ограничено max_names, все наблюдения сверх этого учитываются под именем overflow_name.
+    """
+
+    def __init__(self, max_names: int = 500, overflow_name: str = OTHER_STATEMENTS):
+        self.max_names = max_names
+        self.overflow_name = overflow_name
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def observe(self, name: str, duration: float, **counters: int) -> None:
+        """Учитывает длительность duration под именем name и прибавляет значения counters к его счетчикам."""
+
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                if name not in self._histograms and len(self._histograms) >= self.max_names:
+                    name = self.overflow_name
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    histogram = self._histograms[name] = Histogram()
+                    self._counters[name] = {}
+        histogram.observe(duration)
+
+        if counters:
+            with self._lock:
+                totals = self._counters[name]
+                for counter, value in counters.items():
+                    totals[counter] = totals.get(counter, 0) + value
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает состояние гистограмм и счетчиков по каждому имени."""
+
+        with self._lock:
+            items = [(name, histogram, dict(self._counters[name])) for name, histogram in self._histograms.items()]
+        return {name: {**histogram.snapshot(), **counters} for name, histogram, counters in items}
+
+    def reset(self) -> None:
+        """Удаляет все накопленные наблюдения."""
+
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def normalize_statement(statement: Any, max_length: int = 200) -> str:
+    """
+    Приводит текст запроса к виду, общему для всех его выполнений с разными параметрами.
+
+    Строковые и числовые литералы заменяются на ?, списки значений многострочного INSERT сворачиваются в один,
+    пробельные символы схлопываются, а результат обрезается до max_length символов.
+    """
+
+    if isinstance(statement, bytes):
+        statement = statement.decode("utf-8", "replace")
+    statement = _STRING_LITERAL.sub("?", str(statement))
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _VALUES_LIST.sub(lambda match: match.group(0).split(")", 1)[0] + "), ...", statement)
+    return statement[:max_length]
+
+
+class QueryTimer:
+    """
+    Собирает время выполнения и количество строк запросов к базе данных по нормализованному тексту запроса.
+
+    Подключается к PostgresClient через add_query_hook. Запросы дольше slow_threshold секунд пишутся в лог.
+    """
+
+    def __init__(self, slow_threshold: float = 0.1, max_statements: int = 500):
+        self.slow_threshold = slow_threshold
+        self.registry = TimingRegistry(max_names=max_statements)
+
+    def __call__(self, statement: Any, duration: float, rowcount: int) -> None:
+        normalized = normalize_statement(statement)
+        self.registry.observe(normalized, duration, calls=1, rows=max(rowcount, 0))
+        if duration >= self.slow_threshold:
+            logger.warning(
+                "Медленный запрос: %.1f мс, строк %s: %s", duration * 1000, rowcount, normalized
+            )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает статистику по каждому нормализованному запросу."""
+
+        return self.registry.snapshot()
+
+
+class HandlerTimer:
+    """
+    Собирает время выполнения обработчиков обновлений бота по имени обработчика.
+
+    Обработчики, работавшие дольше slow_threshold секунд, пишутся в лог. Исключения обработчиков учитываются
+    в счетчике errors и пробрасываются дальше.
+    """
+
+    def __init__(self, slow_threshold: float = 1.0):
+        self.slow_threshold = slow_threshold
+        self.registry = TimingRegistry()
+
+    def __call__(self, func: Callable) -> Callable:
+        """Декоратор, который замеряет время выполнения обычного или асинхронного обработчика."""
+
+        name = func.__name__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                failed = True
+                try:
+                    result = await func(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    self.observe(name, time.perf_counter() - started, failed)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self.observe(name, time.perf_counter() - started, failed)
+
+        return wrapper
+
+    def observe(self, name: str, duration: float, failed: bool = False) -> None:
+        """Учитывает одно выполнение обработчика name длительностью duration секунд."""
+
+        self.registry.observe(name, duration, calls=1, errors=int(failed))
+        if duration >= self.slow_threshold:
+            logger.warning("Медленный обработчик %s: %.1f мс", name, duration * 1000)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает статистику по каждому обработчику."""
+
+        return self.registry.snapshot()
+
+
+class TelegramApiStats:
+    """Потокобезопасные счетчики запросов к Bot API, их ошибок по коду ответа и повторных попыток по методу."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[str, int] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._retries: Dict[str, int] = {}
+
+    def record_request(self, method: str) -> None:
+        """Учитывает запрос к методу method."""
+
+        with self._lock:
+            self._requests[method] = self._requests.get(method, 0) + 1
+
+    def record_error(self, method: str, error_code: Any) -> None:
+        """Учитывает ошибку запроса к методу method с кодом error_code, например 429 или network."""
+
+        key = (method, str(error_code))
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def record_retry(self, method: str) -> None:
+        """Учитывает повторную попытку запроса к методу method."""
+
+        with self._lock:
+            self._retries[method] = self._retries.get(method, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[Any, int]]:
+        """Возвращает копии счетчиков запросов, ошибок и повторных попыток."""
+
+        with self._lock:
+            return {
+                "requests": dict(self._requests),
+                "errors": dict(self._errors),
+                "retries": dict(self._retries),
+            }
+
+
+def telegram_request_sender(method: str, url: str, **kwargs: Any) -> Any:
+    """
+    Отправляет HTTP-запрос к Bot API так же, как telebot, и учитывает его в telegram_api_stats.
+
+    Подключается через apihelper.CUSTOM_REQUEST_SENDER. Bot API возвращает ошибки с HTTP-статусом, равным коду
+    ошибки, поэтому тело ответа для подсчета ошибок не разбирается.
+    """
+
+    api_method = url.rsplit("/", 1)[-1]
+    telegram_api_stats.record_request(api_method)
+    try:
+        response = apihelper._get_req_session().request(method, url, **kwargs)
+    except Exception:
+        telegram_api_stats.record_error(api_method, "network")
+        raise
+    if response.status_code != 200:
+        telegram_api_stats.record_error(api_method, response.status_code)
+    return response
+
+
+query_timer = QueryTimer(
+    slow_threshold=SLOW_QUERY_THRESHOLD / 1000, max_statements=INSTRUMENTATION_MAX_STATEMENTS
+)
+handler_timer = HandlerTimer(slow_threshold=SLOW_HANDLER_THRESHOLD / 1000)
+telegram_api_stats = TelegramApiStats()
+
+
+def get_instrumentation_snapshot() -> Dict[str, Any]:
+    """Возвращает статистику времени выполнения запросов к базе данных и обработчиков бота и счетчики запросов к Bot API."""
+
+    return {
+        "queries": query_timer.snapshot(),
+        "handlers": handler_timer.snapshot(),
+        "telegram_api": telegram_api_stats.snapshot(),
+    }
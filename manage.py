@@ -0,0 +1,116 @@
+import argparse
+import sys
+
+from data_export import EXPORT_FORMATS, export_data
+from db_services import EXPORT_SOURCES, partition_selection_dishes, rebuild_popularity_rollups
+from menu_import import import_menu as import_menu_document
+from retention import apply_retention, format_retention_report, get_retention_policies
+from services import upgrade_schema as upgrade_schema_report
+
+
+def rebuild_rollups(args: argparse.Namespace) -> None:
+    """Пересчитывает счетчики популярности блюд и пользователей по всей истории нажатий."""
+
+    rebuild_popularity_rollups()
+    print("Счетчики популярности блюд и пользователей пересчитаны.")
+
+
+def partition_selections(args: argparse.Namespace) -> None:
+    """Переносит историю нажатий selection_dishes в таблицу, разбитую на секции по месяцам."""
+
+    rows = partition_selection_dishes()
+    print(f"История выбора блюд разбита на секции по месяцам, перенесено строк: {rows}")
+
+
+def retention(args: argparse.Namespace) -> None:
+    """Один раз удаляет старые строки по правилам хранения из настроек и выводит отчет об освобожденном месте."""
+
+    results = [apply_retention(policy) for policy in get_retention_policies()]
+    print(format_retention_report(results))
+
+
+def upgrade_schema(args: argparse.Namespace) -> None:
+    """Создает недостающие служебные таблицы и индексы на существующей базе данных без блокировки записи в таблицы."""
+
+    print(upgrade_schema_report())
+
+
+def import_menu(args: argparse.Namespace) -> None:
+    """Импортирует блюда из файла в формате CSV или JSON и выводит отчет об ошибках по строкам."""
+
+    with open(args.path, "rb") as file:
+        result = import_menu_document(
+            file.read(), args.path, create_missing_categories=not args.no_create_categories
+        )
+
+    print(f"Добавлено блюд: {result.imported}")
+    for error in result.errors:
+        print(f"Строка {error.row}: {error.message}")
+
+
+def export(args: argparse.Namespace) -> None:
+    """Выгружает меню или историю выбора блюд в файл или в стандартный вывод в формате CSV или JSON Lines."""
+
+    if args.output is None:
+        rows = export_data(args.source, sys.stdout, args.format)
+    else:
+        with open(args.output, "w", encoding="utf-8", newline="") as file:
+            rows = export_data(args.source, file, args.format)
+    print(f"Выгружено строк: {rows}", file=sys.stderr)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Возвращает парсер аргументов командной строки для служебных команд бота."""
+
+    parser = argparse.ArgumentParser(description="Служебные команды бота.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_rollups_parser = subparsers.add_parser(
+        "rebuild_rollups",
+        help="пересчитать таблицы dish_popularity и user_popularity по истории selection_dishes",
+    )
+    rebuild_rollups_parser.set_defaults(handler=rebuild_rollups)
+
+    partition_selections_parser = subparsers.add_parser(
+        "partition_selections",
+        help="разбить таблицу selection_dishes на секции по месяцам, запись нажатий на время переноса блокируется",
+    )
+    partition_selections_parser.set_defaults(handler=partition_selections)
+
+    retention_parser = subparsers.add_parser(
+        "retention",
+        help="удалить старые строки last_messages и selection_dishes по правилам хранения, сохранив их в архив",
+    )
+    retention_parser.set_defaults(handler=retention)
+
+    upgrade_schema_parser = subparsers.add_parser(
+        "upgrade_schema",
+        help="создать недостающие служебные таблицы и индексы через CREATE INDEX CONCURRENTLY",
+    )
+    upgrade_schema_parser.set_defaults(handler=upgrade_schema)
+
+    import_menu_parser = subparsers.add_parser(
+        "import_menu", help="загрузить блюда из файла в формате CSV или JSON"
+    )
+    import_menu_parser.add_argument("path", help="путь к файлу с расширением .csv или .json")
+    import_menu_parser.add_argument(
+        "--no-create-categories",
+        action="store_true",
+        help="не создавать недостающие категории, а пропускать их блюда",
+    )
+    import_menu_parser.set_defaults(handler=import_menu)
+
+    export_parser = subparsers.add_parser(
+        "export", help="выгрузить меню или историю выбора блюд в CSV или JSON Lines"
+    )
+    export_parser.add_argument("source", choices=tuple(EXPORT_SOURCES), help="что выгрузить")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="формат файла")
+    export_parser.add_argument("--output", "-o", help="путь к файлу, по умолчанию стандартный вывод")
+    export_parser.set_defaults(handler=export)
+
+    return parser
+
+
+if __name__ == "__main__":
+    arguments = get_parser().parse_args()
+    arguments.handler(arguments)
@@ -0,0 +1,138 @@
+import csv
+import io
+import json
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+from db_services import import_dishes_in_dishes_table
+from exceptions import MenuImportError
+from validators import price_validator
+
+
+MENU_IMPORT_FIELDS = ("category", "dish", "price", "description")
+
+ImportRowError = namedtuple("ImportRowError", "row message")
+ImportResult = namedtuple("ImportResult", "imported errors")
+
+
+def import_menu(
+    content: bytes, file_name: str, create_missing_categories: bool = True
+) -> ImportResult:
+    """
+    Импортирует блюда из документа в формате CSV или JSON и возвращает количество добавленных блюд и ошибки по строкам.
+
+    CSV должен содержать заголовок с колонками category, dish, price, description. JSON - список объектов с теми же
+    ключами. Колонка description необязательна. Строки с ошибками пропускаются, остальные загружаются одной
+    транзакцией.
+    """
+
+    records = parse_menu_document(content, file_name)
+    dishes, row_numbers, errors = validate_menu_records(records)
+
+    if dishes:
+        missing_categories = set(
+            import_dishes_in_dishes_table(dishes, create_missing_categories)
+        )
+        for dish, row in zip(dishes, row_numbers):
+            if dish[0] in missing_categories:
+                errors.append(ImportRowError(row, f"категория '{dish[0]}' не найдена"))
+        imported = sum(dish[0] not in missing_categories for dish in dishes)
+    else:
+        imported = 0
+
+    return ImportResult(imported, sorted(errors))
+
+
+def parse_menu_document(content: bytes, file_name: str) -> List[Dict[str, str]]:
+    """Разбирает документ в формате CSV или JSON, определяя формат по расширению file_name, в список словарей."""
+
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise MenuImportError("Файл должен быть в кодировке UTF-8.")
+
+    if file_name.lower().endswith(".json"):
+        try:
+            records = json.loads(text)
+        except ValueError:
+            raise MenuImportError("Файл не является корректным JSON.")
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise MenuImportError("JSON должен содержать список объектов с данными блюд.")
+        return records
+
+    if file_name.lower().endswith(".csv"):
+        reader = csv.DictReader(io.StringIO(text))
+        missing_fields = set(MENU_IMPORT_FIELDS[:3]) - set(reader.fieldnames or ())
+        if missing_fields:
+            raise MenuImportError(
+                f"В CSV не хватает колонок: {', '.join(sorted(missing_fields))}."
+            )
+        return list(reader)
+
+    raise MenuImportError("Поддерживаются только файлы с расширением .csv или .json.")
+
+
+def validate_menu_records(
+    records: List[Dict[str, str]]
+) -> Tuple[List[Tuple[str, str, str, Optional[str]]], List[int], List[ImportRowError]]:
+    """
+    Проверяет записи о блюдах по тем же правилам, что и команда /add_dish, и ограничениям полей таблиц.
+
+    Возвращает список корректных блюд, номера их строк в документе и ошибки по остальным строкам.
+    """
+
+    dishes, row_numbers, errors = [], [], []
+
+    for row, record in enumerate(records, 1):
+        category = _get_field(record, "category")
+        dish = _get_field(record, "dish")
+        price = _get_field(record, "price")
+        description = _get_field(record, "description") or None
+
+        error = _menu_record_error(category, dish, price, description)
+        if error:
+            errors.append(ImportRowError(row, error))
+            continue
+
+        dishes.append((category, dish, price, description))
+        row_numbers.append(row)
+
+    return dishes, row_numbers, errors
+
+
+def _get_field(record: Dict[str, Any], field_name: str) -> str:
+    """
+    Возвращает значение поля field_name записи в виде строки без пробелов по краям.
+
+    Отсутствующее поле и null из JSON дают пустую строку, а число 0 из JSON остается строкой "0".
+    """
+
+    value = record.get(field_name)
+    return "" if value is None else str(value).strip()
+
+
+def _menu_record_error(
+    category: str, dish: str, price: str, description: Optional[str]
+) -> Optional[str]:
+    """Возвращает описание первой найденной ошибки в данных блюда или None, если данные корректны."""
+
+    if not category or len(category) > 60:
+        return "название категории пустое или длиннее 60 символов"
+    if not dish or len(dish) > 60:
+        return "название блюда пустое или длиннее 60 символов"
+    if not price_validator(price):
+        return f"цена '{price}' не является числом"
+    if not _price_fits_column(price):
+        return f"цена '{price}' должна быть от 0 до 999.99"
+    if description and len(description) > 255:
+        return "описание длиннее 255 символов"
+
+
+def _price_fits_column(price: str) -> bool:
+    """Проверяет, помещается ли цена в колонку price NUMERIC(5, 2) таблицы dishes."""
+
+    try:
+        return Decimal("0") <= Decimal(price).quantize(Decimal("0.01")) < Decimal("1000")
+    except InvalidOperation:
+        return False
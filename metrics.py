@@ -0,0 +1,360 @@
+import logging
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List
+
+from bot_keyboards import keyboard_cache
+from db_services import catalog_cache, last_messages_writer, postgres_client, selection_dishes_writer
+from instrumentation import handler_timer, query_timer, telegram_api_stats
+from retention import retention_job
+from send_scheduler import send_scheduler
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# метрика в формате Prometheus: имя, тип, описание и значения в виде кортежей (суффикс имени, метки, значение)
+Metric = namedtuple("Metric", "name type help samples")
+
+
+def collect_handler_metrics() -> List[Metric]:
+    """Собирает количество вызовов, ошибок и гистограммы времени выполнения обработчиков бота."""
+
+    snapshot = handler_timer.snapshot()
+    calls = Metric("bot_handler_calls_total", "counter", "Количество обновлений, обработанных обработчиком.", [])
+    errors = Metric("bot_handler_errors_total", "counter", "Количество исключений в обработчике.", [])
+    duration = Metric(
+        "bot_handler_duration_seconds", "histogram", "Время выполнения обработчика в секундах.", []
+    )
+    for handler, stats in sorted(snapshot.items()):
+        labels = {"handler": handler}
+        calls.samples.append(("", labels, stats.get("calls", 0)))
+        errors.samples.append(("", labels, stats.get("errors", 0)))
+        duration.samples.extend(_histogram_samples(labels, stats))
+    return [calls, errors, duration]
+
+
+def collect_query_metrics() -> List[Metric]:
+    """Собирает количество, время выполнения и количество строк запросов к базе данных по тексту запроса."""
+
+    snapshot = query_timer.snapshot()
+    calls = Metric("bot_db_queries_total", "counter", "Количество выполненных запросов к базе данных.", [])
+    rows = Metric("bot_db_query_rows_total", "counter", "Количество строк, затронутых запросами.", [])
+    seconds = Metric(
+        "bot_db_query_seconds_total", "counter", "Суммарное время выполнения запросов в секундах.", []
+    )
+    for statement, stats in sorted(snapshot.items()):
+        labels = {"statement": statement}
+        calls.samples.append(("", labels, stats.get("calls", 0)))
+        rows.samples.append(("", labels, stats.get("rows", 0)))
+        seconds.samples.append(("", labels, stats["sum"]))
+    return [calls, rows, seconds]
+
+
+def collect_pool_metrics() -> List[Metric]:
+    """Собирает состояние пула соединений с базой данных."""
+
+    stats = postgres_client.pool.stats()
+    return [
+        Metric(
+            "bot_db_pool_connections",
+            "gauge",
+            "Количество открытых соединений пула по состоянию.",
+            [("", {"state": "idle"}, stats["idle"]), ("", {"state": "in_use"}, stats["in_use"])],
+        ),
+        Metric("bot_db_pool_max_connections", "gauge", "Максимальный размер пула.", [("", {}, stats["max_size"])]),
+        Metric(
+            "bot_db_pool_checkouts_total", "counter", "Количество выдач соединений из пула.", [("", {}, stats["checkouts"])]
+        ),
+        Metric(
+            "bot_db_pool_waits_total",
+            "counter",
+            "Количество выдач соединений, которым пришлось ждать освобождения соединения.",
+            [("", {}, stats["waits"])],
+        ),
+        Metric(
+            "bot_db_pool_timeouts_total",
+            "counter",
+            "Количество запросов соединения, не дождавшихся свободного соединения.",
+            [("", {}, stats["timeouts"])],
+        ),
+        Metric(
+            "bot_db_pool_wait_seconds_total",
+            "counter",
+            "Суммарное время ожидания свободного соединения в секундах.",
+            [("", {}, stats["wait_time_total"])],
+        ),
+    ]
+
+
+def collect_cache_metrics() -> List[Metric]:
+    """Собирает попадания, промахи и долю попаданий кэша каталога и кэша клавиатур."""
+
+    hits = Metric("bot_cache_hits_total", "counter", "Количество попаданий в кэш.", [])
+    misses = Metric("bot_cache_misses_total", "counter", "Количество промахов кэша.", [])
+    ratio = Metric("bot_cache_hit_ratio", "gauge", "Доля попаданий в кэш за время работы процесса.", [])
+    for cache, stats in (("catalog", catalog_cache.stats()), ("keyboards", keyboard_cache.stats())):
+        labels = {"cache": cache}
+        lookups = stats["hits"] + stats["misses"]
+        hits.samples.append(("", labels, stats["hits"]))
+        misses.samples.append(("", labels, stats["misses"]))
+        ratio.samples.append(("", labels, stats["hits"] / lookups if lookups else 0.0))
+    return [hits, misses, ratio]
+
+
+def collect_write_behind_metrics() -> List[Metric]:
+    """Собирает глубину и счетчики очередей фоновой записи в базу данных."""
+
+    depth = Metric("bot_write_behind_queue_depth", "gauge", "Количество записей в очереди.", [])
+    max_depth = Metric("bot_write_behind_queue_max_depth", "gauge", "Максимальная глубина очереди.", [])
+    counters = {
+        counter: Metric(f"bot_write_behind_{counter}_total", "counter", description, [])
+        for counter, description in (
+            ("enqueued", "Количество записей, принятых в очередь."),
+            ("written", "Количество записей, записанных в базу данных."),
+            ("dropped", "Количество записей, отброшенных из-за переполнения очереди."),
+            ("failed", "Количество записей, которые не удалось записать в базу данных."),
+            ("retries", "Количество повторных попыток записи пачек после ошибок базы данных."),
+        )
+    }
+    for writer in (selection_dishes_writer, last_messages_writer):
+        stats = writer.stats()
+        labels = {"queue": writer.name}
+        depth.samples.append(("", labels, stats["depth"]))
+        max_depth.samples.append(("", labels, stats["max_depth"]))
+        for counter, metric in counters.items():
+            metric.samples.append(("", labels, stats[counter]))
+    return [depth, max_depth, *counters.values()]
+
+
+def collect_telegram_api_metrics() -> List[Metric]:
+    """Собирает количество запросов к Bot API, их ошибок и повторных попыток."""
+
+    snapshot = telegram_api_stats.snapshot()
+    return [
+        Metric(
+            "bot_telegram_api_requests_total",
+            "counter",
+            "Количество запросов к Bot API.",
+            [("", {"method": method}, value) for method, value in sorted(snapshot["requests"].items())],
+        ),
+        Metric(
+            "bot_telegram_api_errors_total",
+            "counter",
+            "Количество ошибок запросов к Bot API по коду ошибки.",
+            [
+                ("", {"method": method, "error_code": error_code}, value)
+                for (method, error_code), value in sorted(snapshot["errors"].items())
+            ],
+        ),
+        Metric(
+            "bot_telegram_api_retries_total",
+            "counter",
+            "Количество повторных попыток запросов к Bot API.",
+            [("", {"method": method}, value) for method, value in sorted(snapshot["retries"].items())],
+        ),
+    ]
+
+
+def collect_send_scheduler_metrics() -> List[Metric]:
+    """Собирает глубину очередей и счетчики планировщика исходящих запросов к Bot API."""
+
+    stats = send_scheduler.stats()
+    metrics = [
+        Metric(
+            "bot_send_queue_depth",
+            "gauge",
+            "Количество запросов к Bot API в очереди планировщика по состоянию.",
+            [
+                ("", {"state": "queued"}, stats["queued"]),
+                ("", {"state": "delayed"}, stats["delayed"]),
+                ("", {"state": "in_flight"}, stats["in_flight"]),
+            ],
+        ),
+        Metric(
+            "bot_send_queue_seconds_total",
+            "counter",
+            "Суммарное время ожидания запросов в очереди планировщика до первой попытки в секундах.",
+            [("", {}, stats["queue_time_total"])],
+        ),
+    ]
+    for counter, description in (
+        ("submitted", "Количество запросов, поставленных в очередь планировщика."),
+        ("completed", "Количество успешно выполненных запросов."),
+        ("failed", "Количество запросов, завершившихся ошибкой."),
+        ("rate_limited", "Количество ответов 429 от Bot API."),
+        ("deferred", "Количество откладываний запросов из-за ограничения частоты."),
+    ):
+        metrics.append(Metric(f"bot_send_{counter}_total", "counter", description, [("", {}, stats[counter])]))
+    return metrics
+
+
+def collect_retention_metrics() -> List[Metric]:
+    """Собирает количество запусков фоновой очистки и удаленные ею строки, секции и освобожденное место по таблицам."""
+
+    stats = retention_job.stats()
+    metrics = [
+        Metric(
+            "bot_retention_runs_total",
+            "counter",
+            "Количество запусков очистки по правилам хранения.",
+            [("", {}, stats["runs"])],
+        ),
+        Metric(
+            "bot_retention_failures_total",
+            "counter",
+            "Количество таблиц, которые не удалось очистить.",
+            [("", {}, stats["failures"])],
+        ),
+        Metric(
+            "bot_retention_last_run_timestamp_seconds",
+            "gauge",
+            "Время окончания последней очистки в секундах Unix.",
+            [("", {}, stats["last_run"])],
+        ),
+    ]
+    for counter, description in (
+        ("rows", "Количество строк, удаленных очисткой и записанных в архив."),
+        ("partitions", "Количество секций, удаленных очисткой целиком."),
+        ("reclaimed_bytes", "Уменьшение размера таблиц после очистки в байтах."),
+    ):
+        metrics.append(
+            Metric(
+                f"bot_retention_{counter}_total",
+                "counter",
+                description,
+                [("", {"table": table}, value) for table, value in sorted(stats[counter].items())],
+            )
+        )
+    return metrics
+
+
+DEFAULT_COLLECTORS = (
+    collect_handler_metrics,
+    collect_query_metrics,
+    collect_pool_metrics,
+    collect_cache_metrics,
+    collect_write_behind_metrics,
+    collect_telegram_api_metrics,
+    collect_send_scheduler_metrics,
+    collect_retention_metrics,
+)
+
+
+def render_metrics(collectors: Iterable[Callable[[], List[Metric]]] = DEFAULT_COLLECTORS) -> str:
+    """
+    Возвращает метрики из collectors в текстовом формате Prometheus.
+
+    Ошибка одного сборщика не мешает отдать остальные метрики.
+    """
+
+    lines = []
+    for collector in collectors:
+        try:
+            metrics = collector()
+        except Exception:
+            logger.exception("Не удалось собрать метрики %s.", collector.__name__)
+            continue
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _histogram_samples(labels: Dict[str, str], stats: Dict[str, Any]) -> List[tuple]:
+    """Превращает снимок гистограммы из instrumentation в значения _bucket, _sum и _count."""
+
+    samples = [
+        ("_bucket", {**labels, "le": _format_value(bound)}, count) for bound, count in stats["buckets"]
+    ]
+    samples.append(("_sum", labels, stats["sum"]))
+    samples.append(("_count", labels, stats["count"]))
+    return samples
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Форматирует метки в вид {name="value",...}, экранируя служебные символы значений."""
+
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsServer:
+    """
+    HTTP-сервер, который отдает метрики бота в текстовом формате Prometheus по GET-запросу на path.
+
+    Метрики собираются функцией render при каждом запросе. Сервер работает в фоновом потоке и не мешает
+    обработке обновлений.
+    """
+
+    def __init__(
+        self,
+        render: Callable[[], str] = render_metrics,
+        host: str = "127.0.0.1",
+        port: int = 9100,
+        path: str = "/metrics",
+    ):
+        self.render = render
+        self.path = path
+        self._http_server = ThreadingHTTPServer((host, port), _make_request_handler(self))
+        self._http_server.daemon_threads = True
+
+    @property
+    def server_address(self):
+        """Возвращает адрес и порт, на которых слушает сервер."""
+
+        return self._http_server.server_address
+
+    def start(self) -> threading.Thread:
+        """Запускает обработку запросов в фоновом потоке и возвращает этот поток."""
+
+        thread = threading.Thread(target=self._http_server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self) -> None:
+        """Останавливает сервер."""
+
+        self._http_server.shutdown()
+        self._http_server.server_close()
+
+
+def _make_request_handler(server: MetricsServer):
+    """Создает класс обработчика HTTP-запросов, привязанный к серверу server."""
+
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != server.path:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            body = server.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug(format, *args)
+
+    return MetricsRequestHandler
@@ -0,0 +1,206 @@
+import html
+import io
+import tempfile
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from config import REPORT_MAX_ROWS, REPORT_MAX_MESSAGES
+from data_export import ExportFile
+from db_services import REPORT_QUERIES, SELECTIONS_TIMEZONE, iter_report_rows
+from exceptions import ReportError
+
+
+# максимальная длина текста одного сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+# максимальная длина текста одной строки отчета в сообщении, более длинные строки обрезаются
+MAX_LINE_LENGTH = 500
+
+# разделитель первой и последней даты периода отчета: 2023-01-01..2023-01-31
+PERIOD_SEPARATOR = ".."
+
+# отчет администратора: заголовок с количеством строк {count} и периодом {period} и шаблон строки с местом {place}
+# и колонками строки
+Report = namedtuple("Report", "title line")
+
+REPORTS = {
+    "top_dishes": Report("Топ {count} самых популярных блюд меню{period}:", "{place}. {0} - выбрано {1} раз"),
+    "top_users": Report("Топ {count} самых активных пользователей{period}:", "{place}. {0} - выбрал блюдо {1} раз"),
+    "last_messages": Report("Последние {count} сообщений от пользователей:", "{place}. {0}"),
+}
+
+# период отчета: подпись для заголовка и границы - начало включительно и конец в часовом поясе нажатий
+ReportPeriod = namedtuple("ReportPeriod", "title start end")
+
+ReportMessages = namedtuple("ReportMessages", "messages truncated")
+
+
+def get_report(report_name: str, count: int, period: Optional[ReportPeriod] = None) -> Report:
+    """Возвращает описание отчета report_name, проверив его название, количество строк count и период period."""
+
+    if report_name not in REPORTS or report_name not in REPORT_QUERIES:
+        raise ReportError(f"Неизвестный отчет '{report_name}', доступны: {', '.join(REPORTS)}.")
+    if not 0 < count <= REPORT_MAX_ROWS:
+        raise ReportError(f"Количество строк отчета должно быть от 1 до {REPORT_MAX_ROWS}.")
+    if period is not None and REPORT_QUERIES[report_name].window_query is None:
+        raise ReportError(f"Отчет '{report_name}' не строится за период.")
+    return REPORTS[report_name]
+
+
+def get_report_period(period: str, now: Optional[datetime] = None) -> ReportPeriod:
+    """
+    Возвращает период отчета по его описанию period.
+
+    Поддерживаются today - сегодня, week - последние 7 дней, включая сегодня, дата 2023-01-31 и диапазон дат
+    2023-01-01..2023-01-31, обе даты включительно. Дни отсчитываются в часовом поясе нажатий на блюда.
+    """
+
+    today = (now or datetime.now(SELECTIONS_TIMEZONE)).astimezone(SELECTIONS_TIMEZONE).date()
+    if period == "today":
+        return ReportPeriod(" за сегодня", *_get_days_bounds(today, today))
+    if period == "week":
+        return ReportPeriod(" за 7 дней", *_get_days_bounds(today - timedelta(days=6), today))
+
+    first, _, last = period.partition(PERIOD_SEPARATOR)
+    try:
+        first_day = date.fromisoformat(first)
+        last_day = date.fromisoformat(last) if last else first_day
+    except ValueError:
+        raise ReportError(
+            f"Неизвестный период '{period}', используйте today, week или даты в виде 2023-01-01..2023-01-31."
+        )
+    if first_day > last_day:
+        raise ReportError("Первая дата периода должна быть не позже последней.")
+    if first_day == last_day:
+        return ReportPeriod(f" за {first_day:%d.%m.%Y}", *_get_days_bounds(first_day, last_day))
+    return ReportPeriod(
+        f" с {first_day:%d.%m.%Y} по {last_day:%d.%m.%Y}", *_get_days_bounds(first_day, last_day)
+    )
+
+
+def iter_report_lines(report_name: str, count: int, period: Optional[ReportPeriod] = None) -> Iterator[str]:
+    """
+    Выдает строки отчета report_name без разметки, читая из базы данных не больше count строк частями.
+
+    Если задан период period, отчет строится только по нажатиям за этот период.
+    """
+
+    report = get_report(report_name, count, period)
+    window = {"start": period.start, "end": period.end} if period is not None else {}
+    place = 0
+    for chunk in iter_report_rows(report_name, count, **window):
+        for row in chunk:
+            place += 1
+            yield report.line.format(*row, place=place)
+
+
+def render_report_messages(
+    report_name: str,
+    count: int,
+    max_messages: int = REPORT_MAX_MESSAGES,
+    limit: int = MESSAGE_LIMIT,
+    period: Optional[ReportPeriod] = None,
+) -> ReportMessages:
+    """
+    Возвращает отчет report_name в виде HTML-сообщений, каждое из которых не длиннее limit символов.
+
+    Строки читаются из базы данных частями, и чтение останавливается, как только набралось max_messages сообщений,
+    поэтому объем памяти не зависит от count. Если отчет не поместился, truncated равен True.
+    """
+
+    title = f"<b>{html.escape(_get_title(report_name, count, period))}</b>\n\n"
+    report_lines = iter_report_lines(report_name, count, period)
+    messages = []
+    try:
+        lines = (f"<i>{html.escape(_shorten(line))}</i>\n" for line in report_lines)
+        for message in split_messages(lines, title, limit):
+            if len(messages) == max_messages:
+                return ReportMessages(messages, True)
+            messages.append(message)
+    finally:
+        # закрывает серверный курсор и возвращает соединение в пул, если отчет прочитан не до конца
+        report_lines.close()
+    return ReportMessages(messages, False)
+
+
+def split_messages(lines: Iterable[str], title: str = "", limit: int = MESSAGE_LIMIT) -> Iterator[str]:
+    """
+    Собирает строки lines в сообщения не длиннее limit символов, не разрывая строки, и выдает их по порядку.
+
+    Заголовок title ставится в начало первого сообщения. Строки длиннее limit должен обрезать вызывающий код.
+    """
+
+    parts: List[str] = [title] if title else []
+    length = len(title)
+    for line in lines:
+        if parts and length + len(line) > limit:
+            yield "".join(parts)
+            parts, length = [], 0
+        parts.append(line)
+        length += len(line)
+    if parts:
+        yield "".join(parts)
+
+
+def write_report(report_name: str, count: int, file: TextIO, period: Optional[ReportPeriod] = None) -> int:
+    """Записывает отчет report_name в текстовый файл file построчно и возвращает количество строк отчета."""
+
+    file.write(_get_title(report_name, count, period) + "\n\n")
+    rows = 0
+    for line in iter_report_lines(report_name, count, period):
+        file.write(line.replace("\n", " ") + "\n")
+        rows += 1
+    return rows
+
+
+def export_report_to_temporary_file(
+    report_name: str, count: int, period: Optional[ReportPeriod] = None
+) -> ExportFile:
+    """
+    Записывает отчет report_name во временный текстовый файл и возвращает его вместе с именем и количеством строк.
+
+    Файл открыт в двоичном режиме и перемотан в начало, закрывать его должен вызывающий код.
+    """
+
+    file = tempfile.TemporaryFile()
+    try:
+        text_file = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        rows = write_report(report_name, count, text_file, period)
+        text_file.flush()
+        text_file.detach()
+    except BaseException:
+        file.close()
+        raise
+
+    file.seek(0)
+    return ExportFile(file, f"{report_name}_{date.today().isoformat()}.txt", rows)
+
+
+def get_period_argument(period: ReportPeriod) -> str:
+    """Возвращает период period в виде диапазона дат 2023-01-01..2023-01-31, который понимает get_report_period."""
+
+    last_day = (period.end - timedelta(days=1)).date()
+    return f"{period.start.date().isoformat()}{PERIOD_SEPARATOR}{last_day.isoformat()}"
+
+
+def _get_title(report_name: str, count: int, period: Optional[ReportPeriod]) -> str:
+    """Возвращает заголовок отчета report_name без разметки."""
+
+    report = get_report(report_name, count, period)
+    return report.title.format(count=count, period=period.title if period is not None else "")
+
+
+def _get_days_bounds(first_day: date, last_day: date) -> Tuple[datetime, datetime]:
+    """Возвращает начало дня first_day и начало дня, следующего за last_day, в часовом поясе нажатий на блюда."""
+
+    return (
+        SELECTIONS_TIMEZONE.localize(datetime.combine(first_day, datetime.min.time())),
+        SELECTIONS_TIMEZONE.localize(datetime.combine(last_day + timedelta(days=1), datetime.min.time())),
+    )
+
+
+def _shorten(line: str) -> str:
+    """Обрезает строку отчета до MAX_LINE_LENGTH символов, чтобы она поместилась в сообщение вместе с разметкой."""
+
+    return line if len(line) <= MAX_LINE_LENGTH else line[: MAX_LINE_LENGTH - 1] + "…"
@@ -0,0 +1,292 @@
+import gzip
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import (
+    RETENTION_INTERVAL,
+    RETENTION_BATCH_SIZE,
+    RETENTION_BATCH_PAUSE,
+    RETENTION_ARCHIVE_DIR,
+    RETENTION_LAST_MESSAGES_MAX_ROWS,
+    RETENTION_SELECTIONS_MAX_AGE_DAYS,
+    RETENTION_SELECTIONS_MAX_ROWS,
+)
+from data_export import write_jsonl_chunks
+from db_services import (
+    RETENTION_TABLES,
+    SELECTIONS_TIMEZONE,
+    delete_retention_batch,
+    drop_selection_partition,
+    get_expired_selection_partitions,
+    get_retention_max_id,
+    get_table_size,
+    is_partitioned_table,
+    is_table_in_db,
+    iter_partition_rows,
+    vacuum_table,
+)
+from exceptions import RetentionError
+
+
+logger = logging.getLogger(__name__)
+
+# правило хранения таблицы: максимальный возраст строк в виде timedelta и максимальное количество строк,
+# None - без ограничения
+RetentionPolicy = namedtuple("RetentionPolicy", "table max_age max_rows")
+
+# результат очистки таблицы: количество удаленных строк, удаленные секции, размер таблицы в байтах до и после
+# очистки и путь к архиву удаленных строк, None - ничего не удалено
+RetentionResult = namedtuple("RetentionResult", "table rows partitions size_before size_after archive_path")
+
+
+def get_retention_policies() -> List[RetentionPolicy]:
+    """Возвращает правила хранения таблиц из настроек, таблицы без ограничений пропускаются."""
+
+    policies = [
+        RetentionPolicy("last_messages", None, RETENTION_LAST_MESSAGES_MAX_ROWS or None),
+        RetentionPolicy(
+            "selection_dishes",
+            timedelta(days=RETENTION_SELECTIONS_MAX_AGE_DAYS) if RETENTION_SELECTIONS_MAX_AGE_DAYS else None,
+            RETENTION_SELECTIONS_MAX_ROWS or None,
+        ),
+    ]
+    return [policy for policy in policies if policy.max_age is not None or policy.max_rows is not None]
+
+
+class RetentionArchive:
+    """
+    Архив строк, удаленных из таблицы: файл JSON Lines, сжатый gzip.
+
+    Файл создается при первой записи, поэтому очистка без удаленных строк не оставляет пустых архивов. Каждая пачка
+    строк сбрасывается на диск до возврата из write, чтобы строки удалялись из базы данных только после записи
+    в архив.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.path = path
+        self.columns = columns
+        self.rows = 0
+        self._file = None
+
+    def write(self, rows: List[Tuple[Any, ...]]) -> None:
+        """Дописывает строки rows в архив."""
+
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = gzip.open(self.path, "at", encoding="utf-8")
+        self.rows += write_jsonl_chunks(self._file, self.columns, [rows])
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self) -> "RetentionArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def apply_retention(
+    policy: RetentionPolicy,
+    archive_dir: str = RETENTION_ARCHIVE_DIR,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    batch_pause: float = RETENTION_BATCH_PAUSE,
+    now: Optional[datetime] = None,
+) -> RetentionResult:
+    """
+    Удаляет из таблицы строки сверх правила хранения policy и возвращает отчет о том, сколько освобождено.
+
+    Строки сначала дописываются в архив в каталоге archive_dir, затем удаляются пачками по batch_size самых старых
+    строк, каждая пачка в своей транзакции с паузой batch_pause секунд, чтобы блокировки были короткими и не
+    задерживали запись новых строк. Секции selection_dishes, все нажатия которых старше max_age, архивируются
+    и удаляются целиком. Счетчики dish_popularity и user_popularity уменьшаются на удаленные нажатия в той же
+    транзакции, что и удаление. После удаления пачками выполняется VACUUM, чтобы место удаленных строк занимали
+    новые строки, а таблица и индексы не разрастались.
+    """
+
+    table = RETENTION_TABLES.get(policy.table)
+    if table is None:
+        raise RetentionError(f"Для таблицы '{policy.table}' нельзя задать правило хранения.")
+    if policy.max_age is not None and table.time_column is None:
+        raise RetentionError(
+            f"В таблице {policy.table} нет времени добавления строк, для нее задается только количество строк."
+        )
+    if not is_table_in_db(policy.table):
+        return RetentionResult(policy.table, 0, [], 0, 0, None)
+
+    now = now or datetime.now(SELECTIONS_TIMEZONE)
+    size_before = get_table_size(policy.table)
+    partitions = []
+    deleted = 0
+    archive_path = os.path.join(archive_dir, f"{policy.table}_{now:%Y%m%dT%H%M%S}.jsonl.gz")
+    with RetentionArchive(archive_path, table.columns) as archive:
+        if policy.max_age is not None:
+            before = now - policy.max_age
+            if is_partitioned_table(policy.table):
+                for partition_name in get_expired_selection_partitions(before):
+                    for chunk in iter_partition_rows(partition_name):
+                        archive.write(chunk)
+                    drop_selection_partition(partition_name)
+                    partitions.append(partition_name)
+            deleted += _delete_in_batches(policy.table, archive, batch_size, batch_pause, before=before)
+
+        if policy.max_rows is not None:
+            max_id = get_retention_max_id(policy.table, policy.max_rows)
+            if max_id is not None:
+                deleted += _delete_in_batches(policy.table, archive, batch_size, batch_pause, max_id=max_id)
+
+    if deleted:
+        vacuum_table(policy.table)
+    return RetentionResult(
+        policy.table,
+        archive.rows,
+        partitions,
+        size_before,
+        get_table_size(policy.table),
+        archive_path if archive.rows else None,
+    )
+
+
+def _delete_in_batches(
+    table_name: str, archive: RetentionArchive, batch_size: int, batch_pause: float, **condition: Any
+) -> int:
+    """Удаляет строки таблицы table_name по условию condition пачками, пока они не закончатся, и возвращает их число."""
+
+    deleted = 0
+    while True:
+        rows = delete_retention_batch(table_name, batch_size, archive.write, **condition)
+        deleted += rows
+        if rows < batch_size:
+            return deleted
+        time.sleep(batch_pause)
+
+
+def format_retention_report(results: Iterable[RetentionResult]) -> str:
+    """Возвращает текстовый отчет об очистке таблиц: удаленные строки и секции, размер до и после, путь к архиву."""
+
+    lines = []
+    for result in results:
+        line = (
+            f"{result.table}: удалено строк {result.rows}, секций {len(result.partitions)}, "
+            f"размер {_format_size(result.size_before)} -> {_format_size(result.size_after)}"
+        )
+        if result.archive_path:
+            line += f", архив {result.archive_path}"
+        lines.append(line)
+    return "\n".join(lines) or "Правила хранения не заданы."
+
+
+def _format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} МБ"
+
+
+class RetentionJob:
+    """
+    Фоновая очистка таблиц по правилам хранения.
+
+    Раз в interval секунд применяет правила policies в фоновом потоке и пишет в лог отчет об освобожденном месте.
+    Параметры archive_dir, batch_size и batch_pause передаются в apply_retention. Ошибка очистки одной таблицы
+    не мешает очистке остальных. Счетчики удаленных строк, секций и освобожденного
+    места доступны через stats().
+    """
+
+    def __init__(
+        self,
+        policies: Sequence[RetentionPolicy],
+        interval: float = 86400,
+        archive_dir: str = RETENTION_ARCHIVE_DIR,
+        batch_size: int = RETENTION_BATCH_SIZE,
+        batch_pause: float = RETENTION_BATCH_PAUSE,
+        name: str = "retention",
+    ):
+        self.policies = list(policies)
+        self.interval = interval
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.name = name
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._runs = 0
+        self._failures = 0
+        self._rows: Dict[str, int] = {}
+        self._partitions: Dict[str, int] = {}
+        self._reclaimed_bytes: Dict[str, int] = {}
+        self._last_run = 0.0
+
+    def start(self) -> threading.Thread:
+        """Запускает очистку по расписанию в фоновом потоке, первая очистка выполняется сразу."""
+
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Останавливает очистку по расписанию, дожидаясь окончания текущей пачки не дольше timeout секунд."""
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self) -> List[RetentionResult]:
+        """Применяет все правила хранения один раз и возвращает результаты по таблицам, которые удалось очистить."""
+
+        results = []
+        for policy in self.policies:
+            if self._stop.is_set():
+                break
+            try:
+                result = apply_retention(policy, self.archive_dir, self.batch_size, self.batch_pause)
+            except Exception:
+                logger.exception("Не удалось очистить таблицу %s.", policy.table)
+                with self._lock:
+                    self._failures += 1
+                continue
+            self._record(result)
+            results.append(result)
+
+        with self._lock:
+            self._runs += 1
+            self._last_run = time.time()
+        if results:
+            logger.info("Очистка по правилам хранения завершена:\n%s", format_retention_report(results))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает количество запусков и ошибок и счетчики удаленных строк, секций и освобожденного места."""
+
+        with self._lock:
+            return {
+                "runs": self._runs,
+                "failures": self._failures,
+                "last_run": self._last_run,
+                "rows": dict(self._rows),
+                "partitions": dict(self._partitions),
+                "reclaimed_bytes": dict(self._reclaimed_bytes),
+            }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def _record(self, result: RetentionResult) -> None:
+        with self._lock:
+            self._rows[result.table] = self._rows.get(result.table, 0) + result.rows
+            self._partitions[result.table] = self._partitions.get(result.table, 0) + len(result.partitions)
+            self._reclaimed_bytes[result.table] = self._reclaimed_bytes.get(result.table, 0) + max(
+                result.size_before - result.size_after, 0
+            )
+
+
+retention_job = RetentionJob(get_retention_policies(), interval=RETENTION_INTERVAL)
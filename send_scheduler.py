@@ -0,0 +1,489 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from telebot import apihelper
+
+from config import SEND_GLOBAL_RATE, SEND_CHAT_RATE, SEND_CHAT_BURST, SEND_WORKERS, SEND_MAX_RETRIES
+from instrumentation import telegram_api_stats
+
+
+logger = logging.getLogger(__name__)
+
+# приоритеты запросов к Bot API: чем меньше число, тем раньше отправляется запрос
+PRIORITY_REPLY = 0
+PRIORITY_REPORT = 1
+PRIORITY_DELETE = 2
+
+# ключ ограничителя для запросов, которые не относятся к конкретному чату
+GLOBAL_CHAT = None
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты по алгоритму token bucket: rate запросов в секунду с накоплением до capacity запросов.
+
+    rate=0 отключает ограничение.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Забирает токен, если он есть, и возвращает 0. Иначе ничего не забирает и возвращает время ожидания токена.
+        """
+
+        if not self.rate:
+            return max(self._blocked_until - time.monotonic(), 0.0)
+
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def block(self, seconds: float) -> None:
+        """Запрещает выдачу токенов на seconds секунд, например по retry_after из ответа Bot API."""
+
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+    @property
+    def idle(self) -> bool:
+        """Возвращает True, если ограничитель полностью восстановился и его можно удалить без потери состояния."""
+
+        with self._lock:
+            now = time.monotonic()
+            tokens = self._tokens + (now - self._updated) * self.rate if self.rate else self.capacity
+            return now >= self._blocked_until and tokens >= self.capacity
+
+
+class _SendJob:
+    """Запрос к Bot API в очереди SendScheduler."""
+
+    __slots__ = ("chat_id", "priority", "function", "args", "kwargs", "future", "attempts", "submitted")
+
+    def __init__(self, chat_id, priority, function, args, kwargs):
+        self.chat_id = chat_id
+        self.priority = priority
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.attempts = 0
+        self.submitted = time.monotonic()
+
+
+class SendScheduler:
+    """
+    Планировщик исходящих запросов к Bot API с ограничением частоты и повторами.
+
+    Запросы выполняются в workers фоновых потоках в порядке приоритета, при этом каждый чат получает не больше
+    chat_rate запросов в секунду (с накоплением до chat_burst), а все чаты вместе - не больше global_rate.
+    Запрос чата, исчерпавшего свой лимит, откладывается и не задерживает запросы других чатов. На ответ 429
+    планировщик приостанавливает чат на retry_after секунд и повторяет запрос, но не больше max_retries раз.
+    У каждого чата выполняется не больше одного запроса одновременно, включая отложенные, поэтому запросы одного
+    чата с одинаковым приоритетом доходят в порядке постановки в очередь, например части длинного отчета.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        workers: int = 8,
+        max_retries: int = 3,
+        max_chats: int = 100000,
+        name: str = "send-scheduler",
+    ):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self.name = name
+        self.limits_enabled = True
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._ready: List[tuple] = []
+        self._delayed: List[tuple] = []
+        # запрос, который сейчас выполняется или отложен, для каждого чата и очереди остальных запросов этих чатов
+        self._active_jobs: Dict[Hashable, _SendJob] = {}
+        self._waiting: Dict[Hashable, List[tuple]] = {}
+        self._sequence = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._rate_limited = 0
+        self._deferred = 0
+        self._queue_time_total = 0.0
+
+    def submit(
+        self, chat_id: Optional[int], function: Callable, /, *args: Any, priority: int = PRIORITY_REPLY, **kwargs: Any
+    ) -> Future:
+        """Ставит вызов function(*args, **kwargs) для чата chat_id в очередь и возвращает Future с его результатом."""
+
+        job = _SendJob(chat_id, priority, function, args, kwargs)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError(f"Планировщик {self.name} остановлен.")
+            self._ensure_started()
+            heapq.heappush(self._ready, (priority, next(self._sequence), job))
+            self._submitted += 1
+            self._condition.notify()
+        return job.future
+
+    def call(
+        self, chat_id: Optional[int], function: Callable, /, *args: Any, priority: int = PRIORITY_REPLY, **kwargs: Any
+    ) -> Any:
+        """Выполняет вызов function(*args, **kwargs) для чата chat_id через очередь и возвращает его результат."""
+
+        return self.submit(chat_id, function, *args, priority=priority, **kwargs).result()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Дожидается отправки запросов, уже стоящих в очереди, и останавливает фоновые потоки."""
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, float]:
+        """Возвращает глубину очередей и счетчики выполненных, упавших, повторенных и отложенных запросов."""
+
+        with self._condition:
+            return {
+                "queued": len(self._ready) + sum(map(len, self._waiting.values())),
+                "delayed": len(self._delayed),
+                "in_flight": self._in_flight,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retries": self._retries,
+                "rate_limited": self._rate_limited,
+                "deferred": self._deferred,
+                "queue_time_total": self._queue_time_total,
+                "chats": len(self._chat_buckets),
+            }
+
+    def _ensure_started(self) -> None:
+        """Запускает фоновые потоки при первом запросе. Вызывается под блокировкой планировщика."""
+
+        if self._threads:
+            return
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self) -> None:
+        """Цикл фонового потока: берет самый приоритетный готовый запрос и выполняет его в рамках лимитов."""
+
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            if self.limits_enabled:
+                if job.chat_id is not GLOBAL_CHAT:
+                    wait = self._chat_bucket(job.chat_id).reserve()
+                    if wait > 0:
+                        self._defer(job, wait)
+                        continue
+                self._wait_global_token()
+
+            self._execute(job)
+
+    def _next_job(self) -> Optional[_SendJob]:
+        """Ждет готовый к отправке запрос. Возвращает None, когда планировщик остановлен и очередь пуста."""
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, priority, sequence, job = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (priority, sequence, job))
+                while self._ready:
+                    priority, sequence, job = heapq.heappop(self._ready)
+                    if job.chat_id is not GLOBAL_CHAT:
+                        active_job = self._active_jobs.setdefault(job.chat_id, job)
+                        if active_job is not job:
+                            # запрос чата ждет, пока завершится предыдущий запрос этого же чата
+                            heapq.heappush(self._waiting.setdefault(job.chat_id, []), (priority, sequence, job))
+                            continue
+                    self._in_flight += 1
+                    return job
+                if self._closed and not self._delayed and not self._active_jobs:
+                    return None
+                self._condition.wait(self._delayed[0][0] - now if self._delayed else None)
+
+    def _defer(self, job: _SendJob, delay: float) -> None:
+        """Откладывает запрос на delay секунд, не занимая фоновый поток."""
+
+        with self._condition:
+            self._in_flight -= 1
+            self._deferred += 1
+            heapq.heappush(self._delayed, (time.monotonic() + delay, job.priority, next(self._sequence), job))
+            self._condition.notify()
+
+    def _wait_global_token(self) -> None:
+        """Ждет токен общего для всех чатов ограничителя."""
+
+        while True:
+            wait = self.global_bucket.reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _execute(self, job: _SendJob) -> None:
+        """Выполняет запрос и передает результат в Future, на ответ 429 откладывает повтор на retry_after секунд."""
+
+        job.attempts += 1
+        if job.attempts == 1:
+            queue_time = time.monotonic() - job.submitted
+            with self._condition:
+                self._queue_time_total += queue_time
+
+        try:
+            result = job.function(*job.args, **job.kwargs)
+        except apihelper.ApiTelegramException as error:
+            if error.error_code == 429 and job.attempts <= self.max_retries:
+                retry_after = _retry_after(error)
+                self._chat_bucket(job.chat_id).block(retry_after)
+                telegram_api_stats.record_retry(getattr(job.function, "__name__", "unknown"))
+                with self._condition:
+                    self._retries += 1
+                    self._rate_limited += 1
+                logger.warning("Bot API ограничил частоту запросов в чат %s на %s сек.", job.chat_id, retry_after)
+                self._defer(job, retry_after)
+                return
+            self._finish(job, error=error)
+        except Exception as error:
+            self._finish(job, error=error)
+        else:
+            self._finish(job, result=result)
+
+    def _finish(self, job: _SendJob, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Завершает запрос результатом или ошибкой и обновляет счетчики."""
+
+        with self._condition:
+            self._in_flight -= 1
+            if error is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._release_chat(job)
+        if error is None:
+            job.future.set_result(result)
+        else:
+            job.future.set_exception(error)
+
+    def _release_chat(self, job: _SendJob) -> None:
+        """
+        Снимает с чата завершенный запрос job и ставит в очередь следующий запрос этого чата.
+
+        Вызывается под блокировкой планировщика.
+        """
+
+        if self._active_jobs.get(job.chat_id) is not job:
+            return
+        del self._active_jobs[job.chat_id]
+        waiting = self._waiting.get(job.chat_id)
+        if waiting:
+            heapq.heappush(self._ready, heapq.heappop(waiting))
+            if not waiting:
+                del self._waiting[job.chat_id]
+        self._condition.notify_all()
+
+    def _chat_bucket(self, chat_id: Hashable) -> TokenBucket:
+        """Возвращает ограничитель чата chat_id, удаляя самые старые полностью восстановившиеся ограничители."""
+
+        if chat_id is GLOBAL_CHAT:
+            return self.global_bucket
+        with self._condition:
+            return _get_chat_bucket(self._chat_buckets, chat_id, self.chat_rate, self.chat_burst, self.max_chats)
+
+
+class AsyncSendScheduler:
+    """
+    Асинхронный вариант SendScheduler для async_bot_app.py.
+
+    Запрос выполняется в вызвавшей его задаче с теми же ограничениями: каждый чат получает не больше chat_rate
+    запросов в секунду (с накоплением до chat_burst), а все чаты вместе - не больше global_rate. Задача, чей чат
+    исчерпал лимит, ждет токен, не задерживая запросы других чатов. Запросы одного чата выполняются по одному
+    в порядке вызова. На ответ 429 чат приостанавливается на retry_after секунд и запрос повторяется, но не больше
+    max_retries раз. api_error - класс ошибки Bot API асинхронного клиента, у которой проверяется код ответа.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        max_retries: int = 3,
+        max_chats: int = 100000,
+        api_error: type = apihelper.ApiTelegramException,
+    ):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self.api_error = api_error
+        self.limits_enabled = True
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        # блокировка каждого чата, у которого есть выполняющиеся или ждущие запросы, и количество этих запросов
+        self._chat_locks: Dict[Hashable, List[Any]] = {}
+
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._rate_limited = 0
+        self._deferred = 0
+        self._queue_time_total = 0.0
+
+    async def call(
+        self, chat_id: Optional[int], function: Callable[..., Awaitable[Any]], /, *args: Any, **kwargs: Any
+    ) -> Any:
+        """Выполняет вызов function(*args, **kwargs) для чата chat_id в рамках лимитов и возвращает его результат."""
+
+        self._submitted += 1
+        submitted = time.monotonic()
+        chat_lock = self._chat_locks.setdefault(chat_id, [asyncio.Lock(), 0])
+        chat_lock[1] += 1
+        try:
+            async with chat_lock[0]:
+                await self._wait_limits(chat_id)
+                self._queue_time_total += time.monotonic() - submitted
+                return await self._execute(chat_id, function, args, kwargs)
+        finally:
+            chat_lock[1] -= 1
+            if not chat_lock[1]:
+                del self._chat_locks[chat_id]
+
+    def stats(self) -> Dict[str, float]:
+        """Возвращает количество ждущих и выполняющихся запросов и счетчики выполненных, упавших и повторенных."""
+
+        return {
+            "queued": sum(count for _, count in self._chat_locks.values()) - self._in_flight,
+            "in_flight": self._in_flight,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "retries": self._retries,
+            "rate_limited": self._rate_limited,
+            "deferred": self._deferred,
+            "queue_time_total": self._queue_time_total,
+            "chats": len(self._chat_buckets),
+        }
+
+    async def _wait_limits(self, chat_id: Optional[int]) -> None:
+        """Ждет токены ограничителя чата chat_id и общего ограничителя."""
+
+        if not self.limits_enabled:
+            return
+        if chat_id is not GLOBAL_CHAT:
+            bucket = self._chat_bucket(chat_id)
+            while (wait := bucket.reserve()) > 0:
+                self._deferred += 1
+                await asyncio.sleep(wait)
+        while (wait := self.global_bucket.reserve()) > 0:
+            await asyncio.sleep(wait)
+
+    async def _execute(self, chat_id: Optional[int], function: Callable, args: tuple, kwargs: dict) -> Any:
+        """Выполняет запрос, на ответ 429 повторяя его после паузы retry_after."""
+
+        attempts = 0
+        while True:
+            attempts += 1
+            self._in_flight += 1
+            try:
+                result = await function(*args, **kwargs)
+            except self.api_error as error:
+                if error.error_code != 429 or attempts > self.max_retries:
+                    self._failed += 1
+                    raise
+                retry_after = _retry_after(error)
+                self._chat_bucket(chat_id).block(retry_after)
+                telegram_api_stats.record_retry(getattr(function, "__name__", "unknown"))
+                self._retries += 1
+                self._rate_limited += 1
+                logger.warning("Bot API ограничил частоту запросов в чат %s на %s сек.", chat_id, retry_after)
+            except Exception:
+                self._failed += 1
+                raise
+            else:
+                self._completed += 1
+                return result
+            finally:
+                self._in_flight -= 1
+            await self._wait_limits(chat_id)
+
+    def _chat_bucket(self, chat_id: Hashable) -> TokenBucket:
+        """Возвращает ограничитель чата chat_id, удаляя самые старые полностью восстановившиеся ограничители."""
+
+        if chat_id is GLOBAL_CHAT:
+            return self.global_bucket
+        return _get_chat_bucket(self._chat_buckets, chat_id, self.chat_rate, self.chat_burst, self.max_chats)
+
+
+def _get_chat_bucket(
+    buckets: "OrderedDict[Hashable, TokenBucket]", chat_id: Hashable, rate: float, burst: float, max_chats: int
+) -> TokenBucket:
+    """Возвращает из buckets ограничитель чата chat_id, создавая его и вытесняя старые восстановившиеся ограничители."""
+
+    bucket = buckets.get(chat_id)
+    if bucket is None:
+        bucket = buckets[chat_id] = TokenBucket(rate, burst)
+        while len(buckets) > max_chats:
+            oldest_chat_id, oldest_bucket = next(iter(buckets.items()))
+            if not oldest_bucket.idle:
+                break
+            del buckets[oldest_chat_id]
+    else:
+        buckets.move_to_end(chat_id)
+    return bucket
+
+
+def _retry_after(error: Exception) -> float:
+    """Возвращает паузу retry_after в секундах из ответа 429 Bot API."""
+
+    return float((error.result_json.get("parameters") or {}).get("retry_after", 1))
+
+
+send_scheduler = SendScheduler(
+    global_rate=SEND_GLOBAL_RATE,
+    chat_rate=SEND_CHAT_RATE,
+    chat_burst=SEND_CHAT_BURST,
+    workers=SEND_WORKERS,
+    max_retries=SEND_MAX_RETRIES,
+)
@@ -1,13 +1,30 @@
-from typing import Tuple, List, Optional, Dict
-
+import html
+from typing import Tuple, List, Optional, Dict, Any
+
+from bot_answers import (
+    cb_schema_status_answer,
+    cb_schema_obsolete_indexes_answer,
+    cb_schema_partitions_answer,
+    cb_schema_tables_answer,
+    cb_upgrade_schema_answer,
+    import_menu_answer,
+    report_truncated_answer,
+)
 from db_services import (
     insert_category_in_table_menu_categories,
     get_category_id_where_category_name,
     insert_dish_in_dishes_table,
-    get_top_dishes_from_selection_dishes_table,
-    get_top_users_from_selection_dishes_table,
-    get_last_messages,
+    get_missing_schema_indexes,
+    get_missing_schema_tables,
+    get_obsolete_schema_indexes,
+    ensure_schema_indexes,
+    ensure_schema_objects,
+    is_table_in_db,
+    is_partitioned_table,
 )
+from exceptions import DuplicateCategoryError, MenuImportError
+from menu_import import import_menu
+from reports import MESSAGE_LIMIT, ReportPeriod, get_period_argument, render_report_messages
 from validators import add_category_message_validator, price_validator
 
 
@@ -15,12 +32,15 @@ def add_category_in_menu(message) -> Optional[bool]:
     """
     Достает из полученного сообщения название категории и добавляет его в таблицу с категориями меню.
 
-    В случае успеха добавления категории - вернет True, иначе - вернет None.
+    В случае успеха добавления категории - вернет True, иначе, в том числе если такая категория уже есть, - вернет None.
     """
 
     category_name = _get_category_name_from_message(message)
     if category_name:
-        insert_category_in_table_menu_categories(category_name)
+        try:
+            insert_category_in_table_menu_categories(category_name)
+        except DuplicateCategoryError:
+            return None
         return True
 
 
@@ -47,42 +67,116 @@ def get_nice_categories_format(categories_data: Optional[List[Tuple[str, ...]]])
     return "Категории в меню отсутствуют"
 
 
-def get_most_popular_dishes_report(count: int) -> str:
-    """Возвращает пользователю текстовый отчет с информацией о самых популярных позициях в меню."""
+def get_dish_parameters_report(dish_parameters: Dict[str, Any]) -> str:
+    """Возвращает пользователю текстовое описание блюда по словарю с его параметрами."""
 
-    list_top_dishes_data = get_top_dishes_from_selection_dishes_table(limit=count)
-    text_report = f"<b>Топ {count} самых популярных блюд меню:</b>\n\n"
-    place = 1
+    return (
+        f"Подробности о товаре <b>{dish_parameters['dish_name']}</b>:\n\n"
+        f"<b>Цена:</b> {dish_parameters['price']}р.\n\n"
+        f"<b>Описание:</b> {dish_parameters['description']}\n\n"
+        f"{'Активен' if dish_parameters['is_active'] else 'Нет в продаже'}"
+    )
 
-    for dish, count in list_top_dishes_data:
-        text_report += f"<i>{place}. {dish} - выбрано {count} раз</i>\n"
-        place += 1
 
-    return text_report
+def get_most_popular_dishes_report(count: int, period: Optional[ReportPeriod] = None) -> str:
+    """
+    Возвращает пользователю текстовый отчет с информацией о самых популярных позициях в меню в одном сообщении.
 
+    Если задан период period, учитываются только нажатия за этот период.
+    """
 
-def get_most_popular_users_report(count: int) -> str:
-    """Возвращает пользователю текстовый отчет с информацией о самых активных пользователях."""
+    return _get_single_message_report("top_dishes", count, period)
 
-    list_top_users_data = get_top_users_from_selection_dishes_table(limit=count)
-    text_report = f"<b>Топ {count} самых активных пользователей:</b>\n\n"
-    place = 1
 
-    for username, count in list_top_users_data:
-        text_report += f"<i>{place}. {username} - выбрал блюдо {count} раз</i>\n"
-        place += 1
+def get_most_popular_users_report(count: int, period: Optional[ReportPeriod] = None) -> str:
+    """Возвращает пользователю текстовый отчет с информацией о самых активных пользователях в одном сообщении."""
 
-    return text_report
+    return _get_single_message_report("top_users", count, period)
 
 
 def get_last_messages_report(count: int) -> str:
-    """Возвращает пользователю текстовый отчет с информацией о последних сообщениях от пользователя."""
+    """Возвращает пользователю текстовый отчет с информацией о последних сообщениях от пользователя в одном сообщении."""
+
+    return _get_single_message_report("last_messages", count)
 
-    list_last_messages = get_last_messages(limit=count)
-    text_report = f"<b> Последние {count} сообщений от пользователей:</b>\n\n"
 
-    for place, message in enumerate(list_last_messages, 1):
-        text_report += f"<i>{place}. {message[0]}</i>\n"
+def _get_single_message_report(report_name: str, count: int, period: Optional[ReportPeriod] = None) -> str:
+    """
+    Возвращает отчет report_name в одном сообщении Telegram.
+
+    Отчет, который не поместился в сообщение, обрезается, и в конце сообщения пишется команда, которой его можно
+    получить полностью файлом.
+    """
+
+    period_arguments = [get_period_argument(period)] if period is not None else []
+    command = " ".join(["/report", report_name, str(count)] + period_arguments + ["file"])
+    notice = "\n" + report_truncated_answer.answer + html.escape(command)
+    report = render_report_messages(
+        report_name, count, max_messages=1, limit=MESSAGE_LIMIT - len(notice), period=period
+    )
+    return report.messages[0] + (notice if report.truncated else "")
+
+
+def get_schema_status_report() -> str:
+    """Возвращает пользователю отчет о том, созданы ли в базе данных все нужные боту таблицы, индексы и секции."""
+
+    missing_tables = get_missing_schema_tables()
+    missing_indexes = get_missing_schema_indexes()
+    obsolete_indexes = get_obsolete_schema_indexes()
+    unpartitioned = is_table_in_db("selection_dishes") and not is_partitioned_table("selection_dishes")
+    if not missing_tables and not missing_indexes and not obsolete_indexes and not unpartitioned:
+        return cb_schema_status_answer.answer
+
+    text_report = ""
+    if missing_tables:
+        text_report = cb_schema_tables_answer.false_answer + "\n".join(
+            f"<i>{table_name}</i>" for table_name in missing_tables
+        )
+    if missing_indexes:
+        text_report += ("\n\n" if text_report else "") + cb_schema_status_answer.false_answer + "\n".join(
+            f"<i>{index.name}</i>" for index in missing_indexes
+        )
+    if obsolete_indexes:
+        text_report += ("\n\n" if text_report else "") + cb_schema_obsolete_indexes_answer.false_answer + "\n".join(
+            f"<i>{index_name}</i>" for index_name in obsolete_indexes
+        )
+    if unpartitioned:
+        text_report += ("\n\n" if text_report else "") + cb_schema_partitions_answer.false_answer
+    return text_report
+
+
+def upgrade_schema() -> str:
+    """Создает недостающие таблицы и индексы в базе данных и возвращает пользователю текстовый отчет о результате."""
+
+    ensure_schema_objects()
+    failures = ensure_schema_indexes()
+    if not failures:
+        return cb_upgrade_schema_answer.answer
+
+    return cb_upgrade_schema_answer.false_answer + "\n".join(
+        f"<i>{html.escape(failure)}</i>" for failure in failures
+    )
+
+
+def get_menu_import_report(content: bytes, file_name: str, max_errors: int = 50) -> str:
+    """
+    Импортирует меню из документа и возвращает пользователю текстовый отчет о результате.
+
+    В отчете перечисляются первые max_errors строк документа, которые не удалось импортировать.
+    """
+
+    try:
+        result = import_menu(content, file_name)
+    except MenuImportError as error:
+        return import_menu_answer.false_answer + html.escape(str(error))
+
+    text_report = f"{import_menu_answer.answer}{result.imported}\n"
+    if result.errors:
+        text_report += f"\n<b>Строки с ошибками ({len(result.errors)}):</b>\n"
+        for error in result.errors[:max_errors]:
+            text_report += f"<i>{error.row}. {html.escape(error.message)}</i>\n"
+        if len(result.errors) > max_errors:
+            text_report += f"<i>и еще {len(result.errors) - max_errors}</i>\n"
 
     return text_report
 
@@ -0,0 +1,105 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Sequence, Tuple
+
+from bot_keyboards import get_start_keyboard, get_menu_keyboard, get_admin_keyboard, get_dishes_keyboard
+from config import STARTUP_DB_WAIT, WARMUP_WORKERS
+from db_services import postgres_client, refresh_schema_state, get_all_categories_data
+
+
+logger = logging.getLogger(__name__)
+
+
+def wait_for_database(timeout: float = STARTUP_DB_WAIT, max_interval: float = 5.0) -> bool:
+    """
+    Ждет, пока база данных начнет принимать запросы, но не дольше timeout секунд.
+
+    Проверки повторяются с удваивающимся интервалом, не большим max_interval секунд. Возвращает True, если база
+    данных готова.
+    """
+
+    deadline = time.monotonic() + timeout
+    interval = 0.25
+    while True:
+        if postgres_client.is_ready():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        logger.warning("База данных недоступна, повторная проверка через %.1f сек.", min(interval, remaining))
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+
+def warm_up(workers: int = WARMUP_WORKERS) -> List[str]:
+    """
+    Заранее открывает соединения пула и заполняет кэши схемы, каталога и клавиатур.
+
+    Независимые загрузки выполняются параллельно в workers потоках: сначала соединения, схема и категории,
+    затем клавиатуры всех категорий. Ошибки загрузок не прерывают прогрев, возвращается список их описаний.
+    """
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warm-up") as executor:
+        failures = _run_steps(
+            executor,
+            (
+                ("пул соединений", postgres_client.pool.fill, ()),
+                ("схема базы данных", refresh_schema_state, ()),
+            ),
+        )
+        failures += _run_steps(
+            executor,
+            (
+                ("стартовая клавиатура", get_start_keyboard, ()),
+                ("клавиатура меню", get_menu_keyboard, ()),
+                ("клавиатура администратора", get_admin_keyboard, ()),
+            ),
+        )
+        try:
+            categories = get_all_categories_data()
+        except Exception as error:
+            return failures + [f"категории меню: {error}"]
+        failures += _run_steps(
+            executor,
+            [
+                (f"блюда категории {category_id}", get_dishes_keyboard, (category_id,))
+                for category_id, *_ in categories
+            ],
+        )
+    return failures
+
+
+def _run_steps(
+    executor: ThreadPoolExecutor, steps: Sequence[Tuple[str, Callable[..., Any], tuple]]
+) -> List[str]:
+    """Выполняет шаги прогрева параллельно и возвращает описания шагов, которые завершились ошибкой."""
+
+    futures = [(name, executor.submit(function, *args)) for name, function, args in steps]
+    failures = []
+    for name, future in futures:
+        try:
+            future.result()
+        except Exception as error:
+            failures.append(f"{name}: {error}")
+    return failures
+
+
+def start_up(timeout: float = STARTUP_DB_WAIT) -> bool:
+    """
+    Готовит бота к приему обновлений: дожидается базы данных и прогревает кэши.
+
+    Если база данных не стала доступна за timeout секунд, бот запускается без прогрева, а соединения и кэши
+    заполнятся при первых обращениях. Возвращает True, если база данных готова.
+    """
+
+    started = time.monotonic()
+    if not wait_for_database(timeout):
+        logger.error("База данных недоступна, бот запускается без прогрева кэшей.")
+        return False
+
+    failures = warm_up()
+    for failure in failures:
+        logger.warning("Не удалось прогреть %s", failure)
+    logger.info("Прогрев завершен за %.2f сек.", time.monotonic() - started)
+    return True
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import LAST_MESSAGE_STORE, LAST_MESSAGE_STORE_SIZE, LAST_MESSAGE_TTL
+
+
+class MemoryLastMessageStore:
+    """
+    Потокобезопасное хранилище id последнего сообщения бота в каждом чате в памяти процесса.
+
+    Хранит не больше maxsize чатов, вытесняя давно не активные, и забывает сообщения старше ttl секунд.
+    """
+
+    blocking = False
+
+    def __init__(self, maxsize: int = 100000, ttl: float = 172800):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._messages: "OrderedDict[int, Any]" = OrderedDict()
+
+    def swap(self, chat_id: int, message_id: int) -> Optional[int]:
+        """Запоминает message_id как последнее сообщение чата chat_id и возвращает id предыдущего, если он еще актуален."""
+
+        now = time.monotonic()
+        with self._lock:
+            previous = self._messages.pop(chat_id, None)
+            self._messages[chat_id] = (message_id, now)
+            while len(self._messages) > self.maxsize:
+                self._messages.popitem(last=False)
+
+        if previous is None or now - previous[1] > self.ttl:
+            return None
+        return previous[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает количество чатов в хранилище."""
+
+        with self._lock:
+            return {"chats": len(self._messages)}
+
+
+class PostgresLastMessageStore:
+    """
+    Хранилище id последнего сообщения бота в каждом чате в таблице chat_last_messages базы данных.
+
+    Переживает перезапуск бота и может использоваться несколькими процессами одновременно.
+    Таблица создается при первом обращении. Сообщения старше ttl секунд считаются неактуальными.
+    """
+
+    blocking = True
+
+    def __init__(self, postgres_client: Any, ttl: float = 172800):
+        self.postgres_client = postgres_client
+        self.ttl = ttl
+        self._table_created = False
+
+    def swap(self, chat_id: int, message_id: int) -> Optional[int]:
+        """Запоминает message_id как последнее сообщение чата chat_id и возвращает id предыдущего, если он еще актуален."""
+
+        if not self._table_created:
+            self.postgres_client.create_table(
+                "chat_last_messages",
+                """chat_id BIGINT PRIMARY KEY,
+                message_id BIGINT NOT NULL,
+                updated_at timestamp with time zone NOT NULL DEFAULT now()""",
+            )
+            self._table_created = True
+
+        result = self.postgres_client.fetch_one(
+            """
+            WITH previous AS (
+                SELECT message_id, updated_at FROM chat_last_messages WHERE chat_id = %(chat_id)s FOR UPDATE
+            )
+            INSERT INTO chat_last_messages (chat_id, message_id) VALUES (%(chat_id)s, %(message_id)s)
+            ON CONFLICT (chat_id) DO UPDATE SET message_id = EXCLUDED.message_id, updated_at = now()
+            RETURNING (
+                SELECT message_id FROM previous WHERE updated_at > now() - make_interval(secs => %(ttl)s)
+            )
+            """,
+            {"chat_id": chat_id, "message_id": message_id, "ttl": self.ttl},
+        )
+        return result[0] if result else None
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает количество чатов в хранилище."""
+
+        return {"chats": self.postgres_client.fetch_one("SELECT count(*) FROM chat_last_messages")[0]}
+
+
+def create_last_message_store():
+    """Создает хранилище последних сообщений, выбранное настройкой LAST_MESSAGE_STORE."""
+
+    if LAST_MESSAGE_STORE == "postgres":
+        from db_services import postgres_client
+
+        return PostgresLastMessageStore(postgres_client, ttl=LAST_MESSAGE_TTL)
+    return MemoryLastMessageStore(maxsize=LAST_MESSAGE_STORE_SIZE, ttl=LAST_MESSAGE_TTL)
+
+
+last_message_store = create_last_message_store()
@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import TestCase, main, mock, skipIf
+
+from bot_answers import cb_unknown_answer
+from callback_router import PageId
+from state_store import MemoryLastMessageStore
+
+try:
+    import async_bot_app
+except ImportError:
+    async_bot_app = None
+
+
+@skipIf(async_bot_app is None, "для асинхронного режима бота нужны пакеты aiohttp и asyncpg")
+class AsyncDishCallbackTest(TestCase):
+    """Тесты асинхронного обработчика нажатия на кнопку блюда."""
+
+    def setUp(self):
+        self.calls = []
+        self.selections = []
+        self.dishes = {5: {"id": 5, "dish_name": "Борщ", "category_id": 1, "price": 300, "description": "",
+                           "is_active": True}}
+        self.store = MemoryLastMessageStore()
+
+        def record(name, result=None):
+            async def method(*args, **kwargs):
+                self.calls.append((name, args, kwargs))
+                return result
+
+            return method
+
+        async def get_dish_parameters(dish_id):
+            return self.dishes.get(dish_id)
+
+        async def add_dish_selection(user_name, dish_id):
+            self.selections.append((user_name, dish_id))
+
+        patches = (
+            mock.patch.object(async_bot_app, "NAVIGATION_MODE", "edit"),
+            mock.patch.object(async_bot_app.send_scheduler, "limits_enabled", False),
+            mock.patch.object(async_bot_app, "last_message_store", self.store),
+            mock.patch.object(async_bot_app, "get_dish_parameters", get_dish_parameters),
+            mock.patch.object(async_bot_app, "add_dish_selection_in_selection_dishes_table", add_dish_selection),
+            mock.patch.object(async_bot_app.bot, "edit_message_text", record("edit_message_text")),
+            mock.patch.object(async_bot_app.bot, "send_message", record("send_message", SimpleNamespace(id=99))),
+            mock.patch.object(async_bot_app.bot, "delete_message", record("delete_message")),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        message = SimpleNamespace(
+            chat=SimpleNamespace(id=1), message_id=10, content_type="text", text="Выберите блюдо:"
+        )
+        self.callback = SimpleNamespace(message=message, from_user=SimpleNamespace(full_name="Иван"))
+
+    def press(self, page: PageId) -> None:
+        """Нажимает кнопку блюда page и дожидается удаления предыдущего сообщения чата."""
+
+        async def run():
+            await async_bot_app.callback_parameters_from_dish(self.callback, page)
+            await asyncio.gather(*async_bot_app.delete_message_tasks)
+
+        asyncio.run(run())
+
+    def test_answer_becomes_last_message(self):
+        """Сообщение с ответом запоминается как последнее сообщение чата, а предыдущее сообщение удаляется."""
+
+        self.store.swap(1, 7)
+
+        self.press(PageId(5, 0))
+
+        self.assertEqual([name for name, _, _ in self.calls], ["edit_message_text", "delete_message"])
+        self.assertEqual(self.calls[1][1], (1, 7))
+        self.assertEqual(self.store.swap(1, 11), 10)
+        self.assertEqual(self.selections, [("Иван", 5)])
+
+    def test_missing_dish_answered_as_unknown_button(self):
+        """На кнопку блюда, которого уже нет в меню, бот отвечает как на неизвестную кнопку и не записывает нажатие."""
+
+        self.press(PageId(6, 0))
+
+        self.assertEqual(self.calls[0][2]["text"], cb_unknown_answer.answer)
+        self.assertEqual(self.selections, [])
+        self.assertEqual(self.store.swap(1, 11), 10)
+
+
+if __name__ == "__main__":
+    main()
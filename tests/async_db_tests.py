@@ -0,0 +1,188 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest import TestCase, main, mock, skipIf
+
+import async_db
+from caches import MenuCatalogCache
+from db_services import MenuPage
+
+if async_db.asyncpg is not None:
+    import async_db_services
+    from async_db import AsyncPostgresClient
+
+
+class FakeAsyncConnection:
+    """Соединение asyncpg, которое отвечает на запросы заранее заданными строками вместо обращения к базе данных."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def execute(self, query, *params):
+        self.pool.queries.append((query, params))
+
+    async def fetch(self, query, *params):
+        self.pool.queries.append((query, params))
+        for fragment, answer in self.pool.answers.items():
+            if fragment in query:
+                if isinstance(answer, Exception):
+                    raise answer
+                return answer
+        return []
+
+    async def fetchrow(self, query, *params):
+        rows = await self.fetch(query, *params)
+        return rows[0] if rows else None
+
+
+class FakeAsyncPool:
+    """Пул asyncpg, который выдает FakeAsyncConnection и запоминает выполненные запросы."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.queries = []
+        self.in_use = 0
+        self.closed = False
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        self.in_use += 1
+        try:
+            yield FakeAsyncConnection(self)
+        finally:
+            self.in_use -= 1
+
+    def get_size(self):
+        return 2
+
+    def get_idle_size(self):
+        return 2 - self.in_use
+
+    async def close(self):
+        self.closed = True
+
+
+@skipIf(async_db.asyncpg is None, "для асинхронного режима бота нужен пакет asyncpg")
+class AsyncPostgresClientTest(TestCase):
+    """Тесты асинхронного клиента базы данных AsyncPostgresClient."""
+
+    def setUp(self):
+        self.pool = FakeAsyncPool({"FROM dishes": [(1, "Борщ")]})
+        self.created = []
+
+        async def create_pool(**kwargs):
+            self.created.append(kwargs)
+            await asyncio.sleep(0)
+            return self.pool
+
+        patch = mock.patch.object(async_db.asyncpg, "create_pool", create_pool)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.client = AsyncPostgresClient("menu", "bot", "", "localhost", port="5433", min_size=1, max_size=4)
+
+    def test_pool_created_once(self):
+        """Пул создается при первом запросе один раз, даже если первые запросы пришли одновременно."""
+
+        async def run():
+            return await asyncio.gather(*(self.client.fetch_all("SELECT * FROM dishes") for _ in range(5)))
+
+        self.assertEqual(asyncio.run(run()), [[(1, "Борщ")]] * 5)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(
+            self.created[0],
+            {"database": "menu", "user": "bot", "password": "", "host": "localhost", "port": 5433,
+             "min_size": 1, "max_size": 4},
+        )
+
+    def test_fetch_one_and_close(self):
+        """fetch_one возвращает первую строку или None, а после закрытия пула статистика показывает пустой пул."""
+
+        async def run():
+            found = await self.client.fetch_one("SELECT * FROM dishes WHERE dish_id = $1", 1)
+            missing = await self.client.fetch_one("SELECT * FROM menu_categories")
+            stats = self.client.stats()
+            await self.client.close()
+            return found, missing, stats
+
+        found, missing, stats = asyncio.run(run())
+
+        self.assertEqual((found, missing), ((1, "Борщ"), None))
+        self.assertEqual(stats, {"size": 2, "idle": 2, "in_use": 0, "max_size": 4})
+        self.assertTrue(self.pool.closed)
+        self.assertEqual(self.client.stats()["size"], 0)
+
+
+@skipIf(async_db.asyncpg is None, "для асинхронного режима бота нужен пакет asyncpg")
+class AsyncDbServicesTest(TestCase):
+    """Тесты асинхронных загрузчиков каталога меню из async_db_services."""
+
+    def setUp(self):
+        self.answers = {}
+        self.pool = FakeAsyncPool(self.answers)
+        client = AsyncPostgresClient("menu", "bot", "", "localhost")
+        client._pool = self.pool
+        self.cache = MenuCatalogCache()
+
+        patches = (
+            mock.patch.object(async_db_services, "async_postgres_client", client),
+            mock.patch.object(async_db_services, "catalog_cache", self.cache),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    @staticmethod
+    def undefined_table():
+        return async_db.asyncpg.UndefinedTableError('relation "menu_categories" does not exist')
+
+    def test_categories_loaded_once(self):
+        """Категории загружаются из базы данных один раз, а дальше читаются из кэша каталога."""
+
+        self.answers["FROM menu_categories"] = [(1, "Супы"), (2, "Десерты")]
+
+        async def run():
+            return [await async_db_services.get_all_categories_data() for _ in range(2)]
+
+        self.assertEqual(asyncio.run(run()), [[(1, "Супы"), (2, "Десерты")]] * 2)
+        self.assertEqual(len(self.pool.queries), 1)
+
+    def test_dishes_page_with_cursors(self):
+        """Страница блюд собирается из строк, загруженных с запасом, и получает курсоры соседних страниц."""
+
+        self.answers["dish_id <= $2"] = [(2,)]
+        self.answers["FROM dishes"] = [(5, "Борщ"), (6, "Щи"), (7, "Уха")]
+
+        page = asyncio.run(async_db_services.get_dishes_page(3, after=4, page_size=2))
+
+        self.assertEqual(page, MenuPage([(5, "Борщ"), (6, "Щи")], 2, 6))
+        self.assertEqual(self.pool.queries[0][1], (3, 4, 3))
+
+    def test_missing_tables_return_empty_results(self):
+        """Пока таблицы меню не созданы, загрузчики возвращают пустые результаты, а не ошибку."""
+
+        self.answers["FROM catalog_version"] = self.undefined_table()
+        self.answers["FROM menu_categories"] = self.undefined_table()
+
+        async def run():
+            return (
+                await async_db_services.select_catalog_version(),
+                await async_db_services.get_all_categories_data(),
+                await async_db_services.get_categories_page(),
+            )
+
+        self.assertEqual(asyncio.run(run()), (None, [], MenuPage([], None, None)))
+
+    def test_dish_parameters(self):
+        """Параметры блюда возвращаются словарем, а для блюда, которого нет в меню, возвращается None."""
+
+        self.answers["FROM dishes"] = [(5, "Борщ", 1, 300, "Со сметаной", True)]
+        dish = asyncio.run(async_db_services.get_dish_parameters("5"))
+        self.answers["FROM dishes"] = []
+        missing = asyncio.run(async_db_services.get_dish_parameters("6"))
+
+        self.assertEqual((dish["dish_name"], dish["category_id"], dish["price"]), ("Борщ", 1, 300))
+        self.assertIsNone(missing)
+        self.assertEqual([params for _, params in self.pool.queries], [(5,), (6,)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from unittest import TestCase, main
+
+from benchmark import FakeTelegramApi, percentile, run_benchmark
+
+
+class BenchmarkTest(TestCase):
+    """Тесты нагрузочного прогона обработчиков бота."""
+
+    def test_percentile(self):
+        """Перцентиль считается методом ближайшего ранга."""
+
+        values = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_fake_telegram_api(self):
+        """Поддельный Bot API отвечает сообщением на отправку и считает вызовы методов."""
+
+        telegram_api = FakeTelegramApi()
+        response = telegram_api("post", "https://api.telegram.org/bot0:token/sendMessage", {"chat_id": 5})
+
+        self.assertEqual(response.json()["result"]["chat"]["id"], 5)
+        self.assertEqual(telegram_api.calls["sendMessage"], 1)
+
+    def test_run_benchmark_with_stand_in(self):
+        """Все сценарии проходят через настоящие обработчики бота без ошибок."""
+
+        results = run_benchmark(
+            ["menu", "dishes", "admin", "text"], updates=20, concurrency=2, warmup=2, seed=1
+        )
+
+        self.assertEqual([result.errors for result in results], [0, 0, 0, 0])
+        self.assertTrue(all(result.updates_per_second > 0 for result in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import asyncio
+from unittest import TestCase, main, mock
+
+import bot_keyboards
+import caches
+from caches import MenuCatalogCache, SchemaStateCache, KeyboardCache
+from db_services import MenuPage
+
+
+class MenuCatalogCacheTest(TestCase):
+    """Тесты кэша каталога меню MenuCatalogCache."""
+
+    def setUp(self):
+        self.cache = MenuCatalogCache()
+        self.loads = 0
+
+    def loader(self, value):
+        def load():
+            self.loads += 1
+            return value
+
+        return load
+
+    def async_loader(self, value):
+        async def load():
+            self.loads += 1
+            return value
+
+        return load
+
+    def test_categories_loaded_once(self):
+        """Категории загружаются из базы один раз, дальше отдаются из кэша."""
+
+        for _ in range(3):
+            self.assertEqual(self.cache.get_categories(self.loader([(1, "Супы")])), [(1, "Супы")])
+
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.cache.stats()["hits"], 2)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_category_keys_normalized(self):
+        """Id категории из коллбека (строка) и из базы (число) указывают на одну запись."""
+
+        self.cache.get_dishes(5, self.loader([(1, "Борщ")]))
+        self.assertEqual(self.cache.get_dishes("5", self.loader(None)), [(1, "Борщ")])
+        self.assertEqual(self.loads, 1)
+
+    def test_invalidate_category(self):
+        """После добавления блюда список блюд категории загружается заново, остальные остаются в кэше."""
+
+        self.cache.get_dishes("1", self.loader([(1, "Борщ")]))
+        self.cache.get_dishes("2", self.loader([(2, "Чай")]))
+        self.cache.invalidate_category(1)
+
+        self.assertEqual(
+            self.cache.get_dishes("1", self.loader([(1, "Борщ"), (3, "Солянка")])),
+            [(1, "Борщ"), (3, "Солянка")],
+        )
+        self.cache.get_dishes("2", self.loader(None))
+        self.assertEqual(self.loads, 3)
+
+    def test_invalidate_category_pages(self):
+        """Инвалидация категории сбрасывает только ее страницы блюд."""
+
+        self.cache.get_dishes_page(1, 0, 8, self.loader("первая"))
+        self.cache.get_dishes_page(1, 8, 8, self.loader("вторая"))
+        self.cache.get_dishes_page(2, 0, 8, self.loader("другая"))
+        self.cache.invalidate_category("1")
+
+        self.assertEqual(self.cache.get_dishes_page("1", 8, 8, self.loader("новая")), "новая")
+        self.assertEqual(self.cache.get_dishes_page("2", 0, 8, self.loader(None)), "другая")
+        self.assertEqual(self.loads, 4)
+
+    def test_async_loader_shares_cache(self):
+        """Асинхронное чтение использует те же записи кэша, что и синхронное."""
+
+        async def load():
+            self.loads += 1
+            return [(1, "Борщ")]
+
+        self.assertEqual(asyncio.run(self.cache.get_dishes_async(1, load)), [(1, "Борщ")])
+        self.assertEqual(self.cache.get_dishes("1", self.loader(None)), [(1, "Борщ")])
+        self.assertEqual(self.loads, 1)
+
+    def test_stale_load_not_stored(self):
+        """Результат загрузки, во время которой каталог был инвалидирован, не сохраняется в кэш."""
+
+        def load():
+            self.cache.invalidate_categories()
+            return [(1, "Старое")]
+
+        self.cache.get_categories(load)
+        self.assertEqual(self.cache.get_categories(self.loader([(1, "Новое")])), [(1, "Новое")])
+
+    def test_db_version_change_invalidates(self):
+        """Изменение версии каталога в базе данных другим процессом очищает кэш, ошибка проверки версии - нет."""
+
+        db_versions = [1, 1, RuntimeError("база недоступна"), 2]
+
+        def version_loader():
+            version = db_versions.pop(0)
+            if isinstance(version, Exception):
+                raise version
+            return version
+
+        cache = MenuCatalogCache(version_loader=version_loader, check_interval=0)
+        cache.get_categories(self.loader([(1, "Старое")]))
+        self.assertEqual(cache.get_categories(self.loader(None)), [(1, "Старое")])
+        with self.assertLogs(caches.logger, "WARNING"):
+            self.assertEqual(cache.get_categories(self.loader(None)), [(1, "Старое")])
+        self.assertEqual(cache.get_categories(self.loader([(1, "Новое")])), [(1, "Новое")])
+        self.assertEqual(self.loads, 2)
+
+    def test_db_version_checked_once_per_interval(self):
+        """Версия каталога в базе данных проверяется не чаще раза в check_interval секунд."""
+
+        checks = []
+        cache = MenuCatalogCache(version_loader=lambda: checks.append(1) or 1, check_interval=60)
+        for _ in range(5):
+            cache.get_dish(1, self.loader({"id": 1}))
+        self.assertEqual(len(checks), 1)
+
+    def test_async_db_version_change_invalidates(self):
+        """Асинхронное чтение проверяет версию каталога через async_version_loader."""
+
+        db_versions = [1, 2]
+
+        async def version_loader():
+            return db_versions.pop(0)
+
+        async def read(value):
+            return await cache.get_dishes_async(1, self.async_loader(value))
+
+        cache = MenuCatalogCache(async_version_loader=version_loader, check_interval=0)
+        self.assertEqual(asyncio.run(read("старое")), "старое")
+        self.assertEqual(asyncio.run(read("новое")), "новое")
+
+    def test_ttl_expires_cache(self):
+        """Через ttl секунд после заполнения кэш очищается, даже если версия каталога неизвестна."""
+
+        now = [100.0]
+        with mock.patch.object(caches.time, "monotonic", lambda: now[0]):
+            cache = MenuCatalogCache(check_interval=1000, ttl=30)
+            cache.get_categories(self.loader([(1, "Старое")]))
+            now[0] += 29
+            self.assertEqual(cache.get_categories(self.loader(None)), [(1, "Старое")])
+            now[0] += 1
+            self.assertEqual(cache.get_categories(self.loader([(1, "Новое")])), [(1, "Новое")])
+        self.assertEqual(self.loads, 2)
+
+
+class SchemaStateCacheTest(TestCase):
+    """Тесты кэша состояния схемы SchemaStateCache."""
+
+    def test_filled_once_and_refreshed(self):
+        """Список таблиц запрашивается при первой проверке и повторно только после refresh."""
+
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return [("menu_categories",)] if len(calls) > 1 else []
+
+        cache = SchemaStateCache()
+        self.assertFalse(cache.has_relation("menu_categories", loader))
+        self.assertFalse(cache.has_relation("menu_categories", loader))
+        self.assertEqual(len(calls), 1)
+
+        cache.refresh(loader)
+        self.assertTrue(cache.has_relation("menu_categories", loader))
+        self.assertEqual(cache.version, 2)
+
+    def test_refreshed_after_max_age(self):
+        """С max_age кэш сам перечитывает список таблиц, чтобы заметить таблицы, созданные другим процессом."""
+
+        relations = []
+        now = [100.0]
+        cache = SchemaStateCache(max_age=60)
+        with mock.patch.object(caches.time, "monotonic", lambda: now[0]):
+            self.assertFalse(cache.has_relation("selection_dishes_default", lambda: list(relations)))
+            relations.append(("selection_dishes_default",))
+            now[0] += 60
+            self.assertFalse(cache.has_relation("selection_dishes_default", lambda: list(relations)))
+            now[0] += 1
+            self.assertTrue(cache.has_relation("selection_dishes_default", lambda: list(relations)))
+
+
+class KeyboardCacheTest(TestCase):
+    """Тесты кэша клавиатур KeyboardCache."""
+
+    def setUp(self):
+        self.cache = KeyboardCache(maxsize=2)
+        self.builds = 0
+
+    def builder(self, markup):
+        def build():
+            self.builds += 1
+            return markup
+
+        return build
+
+    def test_rebuilt_on_version_change(self):
+        """Клавиатура строится заново только при изменении версии данных."""
+
+        self.cache.get(("menu",), 1, self.builder("{}"))
+        self.cache.get(("menu",), 1, self.builder("{}"))
+        self.assertEqual(self.builds, 1)
+
+        self.assertEqual(self.cache.get(("menu",), 2, self.builder("[]")), "[]")
+        self.assertEqual(self.builds, 2)
+
+    def test_menu_keyboard_follows_db_version(self):
+        """Готовая клавиатура меню строится заново, когда другой процесс изменил версию каталога в базе данных."""
+
+        db_version = [1]
+        categories = [[(1, "Супы")]]
+        catalog_cache = MenuCatalogCache(version_loader=lambda: db_version[0], check_interval=0)
+
+        def get_categories_page(after):
+            return catalog_cache.get_categories_page(after, 10, lambda: MenuPage(categories[0], None, None))
+
+        patches = (
+            mock.patch.object(bot_keyboards, "catalog_cache", catalog_cache),
+            mock.patch.object(bot_keyboards, "keyboard_cache", self.cache),
+            mock.patch.object(bot_keyboards, "get_categories_page", get_categories_page),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        first = bot_keyboards.get_menu_keyboard()
+        self.assertEqual(bot_keyboards.get_menu_keyboard(), first)
+        db_version[0], categories[0] = 2, [(1, "Супы"), (2, "Десерты")]
+
+        self.assertIn("category_2", bot_keyboards.get_menu_keyboard())
+
+    def test_lru_eviction(self):
+        """При превышении maxsize вытесняется давно не использованная клавиатура."""
+
+        self.cache.get(("dishes", "1"), 0, self.builder("1"))
+        self.cache.get(("dishes", "2"), 0, self.builder("2"))
+        self.cache.get(("dishes", "1"), 0, self.builder("1"))
+        self.cache.get(("dishes", "3"), 0, self.builder("3"))
+
+        self.assertEqual(self.cache.stats()["size"], 2)
+        self.cache.get(("dishes", "1"), 0, self.builder("1"))
+        self.assertEqual(self.builds, 3)
+        self.cache.get(("dishes", "2"), 0, self.builder("2"))
+        self.assertEqual(self.builds, 4)
+
+
+if __name__ == "__main__":
+    main()
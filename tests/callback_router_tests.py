@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+from unittest import TestCase, main
+
+from callback_router import CallbackData, CallbackRouter, PageId, make_callback_data, make_page_callback_data, parse_page_id
+
+
+class CallbackRouterTest(TestCase):
+    """Тесты маршрутизатора нажатий на inline-кнопки."""
+
+    def setUp(self):
+        self.router = CallbackRouter()
+        self.calls = []
+        self.router.route("back_to_menu")(lambda callback: self.calls.append(("back_to_menu",)))
+        self.router.route("dish", id_type=int)(lambda callback, dish_id: self.calls.append(("dish", dish_id)))
+        self.router.unknown(lambda callback: self.calls.append(("unknown", callback.data)))
+
+    def dispatch(self, data):
+        return self.router.dispatch(SimpleNamespace(data=data))
+
+    def test_resolve(self):
+        """Действие без id ищется по callback_data целиком, а id действия приводится к указанному типу."""
+
+        self.assertEqual(self.router.resolve("back_to_menu")[1], CallbackData("back_to_menu", None))
+        self.assertEqual(self.router.resolve(make_callback_data("dish", 12))[1], CallbackData("dish", 12))
+
+    def test_dispatch(self):
+        """Обработчик действия с id получает id вторым аргументом."""
+
+        self.dispatch("back_to_menu")
+        self.dispatch("dish_7")
+        self.assertEqual(self.calls, [("back_to_menu",), ("dish", 7)])
+
+    def test_unknown(self):
+        """Неизвестные действия, некорректные id и пустые данные передаются обработчику неизвестных нажатий."""
+
+        for data in ("old_screen", "dish_", "dish_abc", "back_to_menu_1", "", None):
+            self.dispatch(data)
+        self.assertEqual([call[0] for call in self.calls], ["unknown"] * 6)
+
+    def test_page_id(self):
+        """Курсор страницы передается в id кнопки и не нужен для первой страницы."""
+
+        self.assertEqual(make_page_callback_data("category", 5), "category_5")
+        self.assertEqual(parse_page_id("5"), PageId(5, 0))
+        self.assertEqual(parse_page_id("5_16"), PageId(5, 16))
+        with self.assertRaises(ValueError):
+            parse_page_id("5_")
+
+    def test_register_errors(self):
+        """Повторная регистрация действия и разделитель в названии действия с id запрещены."""
+
+        with self.assertRaises(ValueError):
+            self.router.route("dish", id_type=int)(lambda callback, dish_id: None)
+        with self.assertRaises(ValueError):
+            self.router.route("top_dish", id_type=int)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from unittest import TestCase, main, mock
+
+import db
+import db_services
+from write_behind import WriteBehindQueue
+
+
+class FakeCopyCursor:
+    """Курсор, который запоминает данные, переданные в COPY, вместо обращения к базе данных."""
+
+    def __init__(self):
+        self.copied = []
+
+    def copy_expert(self, query, file):
+        self.copied.append(file.read())
+
+
+class CopyRowsTest(TestCase):
+    """Тесты загрузки строк в таблицу через COPY."""
+
+    def test_copy_text_value_escapes_special_characters(self):
+        """Служебные символы текстового формата COPY экранируются, а None записывается как NULL."""
+
+        self.assertEqual(db._copy_text_value(None), "\\N")
+        self.assertEqual(db._copy_text_value(5), "5")
+        self.assertEqual(db._copy_text_value("a\\b"), "a\\\\b")
+        self.assertEqual(db._copy_text_value("a\tb\nc\rd"), "a\\tb\\nc\\rd")
+        self.assertEqual(db._copy_text_value("\\N"), "\\\\N")
+
+    def test_copy_rows_writes_one_line_per_row(self):
+        """Каждая строка записывается одной строкой COPY с полями через табуляцию."""
+
+        cursor = FakeCopyCursor()
+        db.copy_rows(cursor, "dishes", ("name_dish", "price"), [("Борщ", 5), ("Чай\tчерный", None)])
+
+        self.assertEqual(cursor.copied, ["Борщ\t5\nЧай\\tчерный\t\\N\n"])
+
+
+class BufferedLastMessagesTest(TestCase):
+    """Тесты буферизованной записи сообщений пользователей в таблицу last_messages."""
+
+    def test_messages_copied_in_one_batch(self):
+        """При LAST_MESSAGES_BUFFERED сообщения попадают в базу одной пачкой через COPY, а не отдельными INSERT."""
+
+        copied, inserted = [], []
+        writer = WriteBehindQueue(db_services._copy_last_messages, batch_size=100, flush_interval=60)
+        patches = (
+            mock.patch.object(db_services, "LAST_MESSAGES_BUFFERED", True),
+            mock.patch.object(db_services, "last_messages_writer", writer),
+            mock.patch.object(
+                db_services.postgres_client,
+                "copy_in_table",
+                lambda table_name, columns, rows: copied.append((table_name, columns, list(rows))),
+            ),
+            mock.patch.object(db_services.postgres_client, "insert_in_table", lambda **kwargs: inserted.append(kwargs)),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        for message in ("привет", "меню\nпожалуйста"):
+            db_services.add_message_in_last_messages_table(message)
+        writer.close()
+
+        self.assertEqual(inserted, [])
+        self.assertEqual(copied, [("last_messages", ("text_message",), [("привет",), ("меню\nпожалуйста",)])])
+
+
+if __name__ == "__main__":
+    main()
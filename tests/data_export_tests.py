@@ -0,0 +1,51 @@
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest import TestCase, main
+
+import pytz
+
+from data_export import export_data, write_csv_chunks, write_jsonl_chunks
+from exceptions import DataExportError
+
+
+class DataExportTest(TestCase):
+    """Тесты записи выгрузки данных в файл частями."""
+
+    def test_write_csv_chunks(self):
+        """В CSV записываются заголовок и строки из всех частей."""
+
+        file = io.StringIO()
+        rows = write_csv_chunks(
+            file, ("dish_id", "dish"), iter([[(1, "Борщ"), (2, "Суп, грибной")], [(3, "Чай")]])
+        )
+
+        self.assertEqual(rows, 3)
+        self.assertEqual(
+            file.getvalue().splitlines(), ["dish_id,dish", "1,Борщ", '2,"Суп, грибной"', "3,Чай"]
+        )
+
+    def test_write_jsonl_chunks(self):
+        """Каждая строка записывается отдельным JSON объектом, числа и даты приводятся к типам JSON."""
+
+        file = io.StringIO()
+        moment = datetime(2023, 1, 31, 12, 0, tzinfo=pytz.utc)
+        rows = write_jsonl_chunks(file, ("price", "datetime"), iter([[(Decimal("5.50"), moment)]]))
+
+        self.assertEqual(rows, 1)
+        self.assertEqual(
+            json.loads(file.getvalue()), {"price": 5.5, "datetime": "2023-01-31T12:00:00+00:00"}
+        )
+
+    def test_export_data_rejects_unknown_source_and_format(self):
+        """Неизвестные источник и формат выгрузки отклоняются до обращения к базе данных."""
+
+        with self.assertRaises(DataExportError):
+            export_data("users", io.StringIO())
+        with self.assertRaises(DataExportError):
+            export_data("menu", io.StringIO(), "xlsx")
+
+
+if __name__ == "__main__":
+    main()
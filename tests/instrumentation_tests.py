@@ -0,0 +1,74 @@
+from unittest import TestCase, main
+
+from instrumentation import Histogram, HandlerTimer, QueryTimer, TimingRegistry, normalize_statement
+
+
+class InstrumentationTest(TestCase):
+    """Тесты замеров времени выполнения запросов и обработчиков."""
+
+    def test_normalize_statement(self):
+        """Литералы заменяются на ?, а списки значений многострочного INSERT сворачиваются."""
+
+        self.assertEqual(
+            normalize_statement(b"SELECT *  FROM dishes\n WHERE dish_id = 15 AND name_dish = 'It''s'"),
+            "SELECT * FROM dishes WHERE dish_id = ? AND name_dish = ?",
+        )
+        self.assertEqual(
+            normalize_statement("INSERT INTO t (a, b) VALUES ('x', 1),('y', 2),('z', 3)"),
+            "INSERT INTO t (a, b) VALUES (?, ?), ...",
+        )
+        self.assertEqual(normalize_statement('EXECUTE "select_dish_parameters" (7)'), 'EXECUTE "select_dish_parameters" (?)')
+
+    def test_histogram_snapshot(self):
+        """Снимок гистограммы содержит накопленные количества по корзинам и оценки перцентилей."""
+
+        histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+        for value in (0.005, 0.005, 0.05, 0.5):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+
+        self.assertEqual(snapshot["count"], 4)
+        self.assertEqual(snapshot["buckets"], [(0.01, 2), (0.1, 3), (1.0, 4), (float("inf"), 4)])
+        self.assertEqual(snapshot["p50"], 0.01)
+        self.assertEqual(snapshot["p99"], 0.5)
+
+    def test_registry_limits_names(self):
+        """Имена сверх max_names учитываются под общим именем."""
+
+        registry = TimingRegistry(max_names=1, overflow_name="other")
+        registry.observe("first", 0.1, calls=1)
+        registry.observe("second", 0.1, calls=1)
+
+        self.assertEqual(set(registry.snapshot()), {"first", "other"})
+
+    def test_query_timer(self):
+        """Выполнения одного запроса с разными параметрами учитываются вместе с количеством строк."""
+
+        timer = QueryTimer(slow_threshold=10)
+        timer("SELECT 1 FROM dishes WHERE dish_id = 1", 0.002, 1)
+        timer("SELECT 1 FROM dishes WHERE dish_id = 2", 0.003, 0)
+        stats = timer.snapshot()["SELECT ? FROM dishes WHERE dish_id = ?"]
+
+        self.assertEqual((stats["calls"], stats["rows"], stats["count"]), (2, 1, 2))
+
+    def test_handler_timer(self):
+        """Декоратор учитывает вызовы обработчика и его исключения."""
+
+        timer = HandlerTimer(slow_threshold=10)
+
+        @timer
+        def handler(fail):
+            if fail:
+                raise ValueError
+            return "ok"
+
+        self.assertEqual(handler(False), "ok")
+        with self.assertRaises(ValueError):
+            handler(True)
+        stats = timer.snapshot()["handler"]
+
+        self.assertEqual((stats["calls"], stats["errors"]), (2, 1))
+
+
+if __name__ == "__main__":
+    main()
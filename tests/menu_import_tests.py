@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import db_services
+from exceptions import MenuImportError
+from menu_import import import_menu, parse_menu_document, validate_menu_records
+
+
+class MenuImportTest(TestCase):
+    """Тесты разбора и проверки документа для импорта меню."""
+
+    def test_parse_csv(self):
+        """CSV с заголовком разбирается в список словарей."""
+
+        records = parse_menu_document(
+            "category,dish,price,description\nСупы,Борщ,5.50,Со сметаной\n".encode("utf-8"), "menu.csv"
+        )
+        self.assertEqual(records[0]["dish"], "Борщ")
+
+    def test_parse_json(self):
+        """JSON со списком объектов разбирается в список словарей."""
+
+        records = parse_menu_document(
+            '[{"category": "Супы", "dish": "Борщ", "price": 5}]'.encode("utf-8"), "menu.json"
+        )
+        self.assertEqual(records[0]["price"], 5)
+
+    def test_parse_errors(self):
+        """Документ неверного формата отклоняется целиком."""
+
+        with self.assertRaises(MenuImportError):
+            parse_menu_document(b"dish,price\n", "menu.csv")
+        with self.assertRaises(MenuImportError):
+            parse_menu_document(b"{}", "menu.json")
+        with self.assertRaises(MenuImportError):
+            parse_menu_document(b"", "menu.xlsx")
+
+    def test_validate_records(self):
+        """Ошибочные строки попадают в отчет с номером строки, корректные - в список блюд."""
+
+        dishes, rows, errors = validate_menu_records(
+            [
+                {"category": "Супы", "dish": "Борщ", "price": "5.50", "description": ""},
+                {"category": "Супы", "dish": "", "price": "5"},
+                {"category": "Супы", "dish": "Солянка", "price": "дорого"},
+                {"category": "Супы", "dish": "Уха", "price": "1000"},
+            ]
+        )
+
+        self.assertEqual(dishes, [("Супы", "Борщ", "5.50", None)])
+        self.assertEqual(rows, [1])
+        self.assertEqual([error.row for error in errors], [2, 3, 4])
+
+    def test_zero_price_from_json(self):
+        """Нулевая цена числом из JSON проверяется как "0", а не как пустая строка."""
+
+        dishes, _, errors = validate_menu_records(
+            [{"category": "Напитки", "dish": "Вода", "price": 0}, {"category": "Напитки", "dish": "Чай", "price": None}]
+        )
+
+        self.assertEqual(dishes, [("Напитки", "Вода", "0", None)])
+        self.assertEqual([error.row for error in errors], [2])
+
+    def test_unknown_categories_reported(self):
+        """Блюда из неизвестных категорий попадают в отчет об ошибках, если категории не создаются."""
+
+        content = "category,dish,price\nСупы,Борщ,5\nЧай,Черный,2\n".encode("utf-8")
+        with patch("menu_import.import_dishes_in_dishes_table", return_value=["Чай"]) as import_dishes:
+            result = import_menu(content, "menu.csv", create_missing_categories=False)
+
+        import_dishes.assert_called_once()
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(result.errors[0].row, 2)
+
+
+class ImportDishesTest(TestCase):
+    """Тесты загрузки блюд импорта в базу данных."""
+
+    def test_category_added_concurrently(self):
+        """Категория, которую одновременно создал другой запрос, не вставляется повторно, а перечитывается."""
+
+        statements, copied = [], []
+
+        class FakeCursor:
+            def __init__(self):
+                self.rows = []
+
+            def execute(self, query, params=None):
+                statements.append((query, params))
+                self.rows = [] if len(statements) == 1 else [("Супы", 7)]
+
+            def fetchall(self):
+                return self.rows
+
+        @contextmanager
+        def cursor():
+            yield FakeCursor()
+
+        def execute_values(cursor, query, rows, fetch=False):
+            statements.append((query, rows))
+            # вставка не вернула строку: категорию "Супы" уже добавил другой импорт
+            return [("Чай", 8)]
+
+        with patch.object(db_services.postgres_client, "cursor", cursor), patch.object(
+            db_services.extras, "execute_values", execute_values
+        ), patch.object(db_services, "copy_rows", lambda cursor, table, columns, rows: copied.extend(rows)):
+            missing = db_services.import_dishes_in_dishes_table(
+                [("Супы", "Борщ", "5", None), ("Чай", "Черный", "2", None)]
+            )
+
+        self.assertEqual(missing, [])
+        self.assertIn("ON CONFLICT DO NOTHING", statements[1][0])
+        self.assertEqual(statements[2][1], (["Супы"],))
+        self.assertEqual(copied, [("Борщ", 7, "5", None), ("Черный", 8, "2", None)])
+
+
+if __name__ == "__main__":
+    main()
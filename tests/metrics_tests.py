@@ -0,0 +1,61 @@
+from unittest import TestCase, main
+from urllib.request import urlopen
+
+from metrics import Metric, MetricsServer, render_metrics
+
+
+def collect_test_metrics():
+    return [
+        Metric("test_requests_total", "counter", "Количество запросов.", [("", {"method": 'send"Message'}, 3)]),
+        Metric(
+            "test_duration_seconds",
+            "histogram",
+            "Время выполнения.",
+            [("_bucket", {"le": "+Inf"}, 2), ("_sum", {}, 0.25), ("_count", {}, 2)],
+        ),
+    ]
+
+
+def collect_broken_metrics():
+    raise RuntimeError
+
+
+class MetricsTest(TestCase):
+    """Тесты отдачи метрик в формате Prometheus."""
+
+    def test_render_metrics(self):
+        """Метрики выводятся с описанием и типом, значения меток экранируются, ошибки сборщиков пропускаются."""
+
+        text = render_metrics([collect_broken_metrics, collect_test_metrics])
+
+        self.assertIn("# TYPE test_requests_total counter\n", text)
+        self.assertIn('test_requests_total{method="send\\"Message"} 3\n', text)
+        self.assertIn('test_duration_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn("test_duration_seconds_sum 0.25\n", text)
+
+    def test_render_default_metrics(self):
+        """Стандартные метрики бота собираются без обращения к базе данных."""
+
+        text = render_metrics()
+
+        self.assertIn("# TYPE bot_db_pool_connections gauge", text)
+        self.assertIn('bot_cache_hit_ratio{cache="catalog"}', text)
+        self.assertIn('bot_write_behind_queue_depth{queue="selection_dishes-writer"}', text)
+
+    def test_metrics_server(self):
+        """Сервер отдает метрики по пути /metrics."""
+
+        server = MetricsServer(render=lambda: render_metrics([collect_test_metrics]), port=0)
+        server.start()
+        try:
+            host, port = server.server_address
+            with urlopen(f"http://{host}:{port}/metrics") as response:
+                body = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+
+        self.assertIn("test_requests_total", body)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+from types import SimpleNamespace
+from unittest import TestCase, main, mock
+
+from telebot import apihelper
+
+import bot_app
+from bot_answers import cb_unknown_answer
+from callback_router import PageId
+from state_store import MemoryLastMessageStore
+
+
+def api_error(description):
+    """Возвращает ошибку Bot API с кодом 400 и описанием description."""
+
+    return apihelper.ApiTelegramException(
+        "editMessageText", None, {"error_code": 400, "description": description}
+    )
+
+
+def call_directly(chat_id, function, /, *args, priority=0, **kwargs):
+    """Заменяет SendScheduler.call: выполняет запрос сразу в текущем потоке."""
+
+    return function(*args, **kwargs)
+
+
+class SendAnswerTest(TestCase):
+    """Тесты ответа пользователю редактированием сообщения с нажатой кнопкой или новым сообщением."""
+
+    def setUp(self):
+        self.calls = []
+        self.edit_error = None
+
+        def edit_message_text(**kwargs):
+            self.calls.append(("edit_message_text", kwargs))
+            if self.edit_error is not None:
+                raise self.edit_error
+
+        def record(name, result=None):
+            return lambda **kwargs: self.calls.append((name, kwargs)) or result
+
+        patches = (
+            mock.patch.object(bot_app, "NAVIGATION_MODE", "edit"),
+            mock.patch.object(bot_app.send_scheduler, "call", call_directly),
+            mock.patch.object(bot_app.bot, "edit_message_text", edit_message_text),
+            mock.patch.object(bot_app.bot, "edit_message_reply_markup", record("edit_message_reply_markup")),
+            mock.patch.object(bot_app.bot, "send_message", record("send_message", SimpleNamespace(id=99))),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.message = SimpleNamespace(
+            chat=SimpleNamespace(id=1), message_id=10, content_type="text", text="Выберите категорию:"
+        )
+        self.callback = SimpleNamespace(message=self.message)
+
+    def called(self):
+        return [name for name, _ in self.calls]
+
+    def test_callback_edits_message(self):
+        """Ответ на нажатие кнопки записывается в сообщение с этой кнопкой."""
+
+        result = bot_app.send_answer(self.callback, text="Выберите блюдо:", reply_markup="{}")
+
+        self.assertEqual(result, (1, 10))
+        self.assertEqual(self.called(), ["edit_message_text"])
+        self.assertEqual(self.calls[0][1]["message_id"], 10)
+
+    def test_same_text_edits_only_keyboard(self):
+        """Если текст не меняется, редактируются только кнопки сообщения."""
+
+        result = bot_app.send_answer(self.callback, text="Выберите категорию:", reply_markup="{}")
+
+        self.assertEqual(result, (1, 10))
+        self.assertEqual(self.called(), ["edit_message_reply_markup"])
+
+    def test_not_modified_keeps_message(self):
+        """Ответ Bot API 'message is not modified' не приводит к отправке нового сообщения."""
+
+        self.edit_error = api_error("Bad Request: message is not modified")
+
+        self.assertEqual(bot_app.send_answer(self.callback, text="Выберите блюдо:"), (1, 10))
+        self.assertEqual(self.called(), ["edit_message_text"])
+
+    def test_failed_edit_falls_back_to_send(self):
+        """Если сообщение нельзя отредактировать, ответ отправляется новым сообщением."""
+
+        self.edit_error = api_error("Bad Request: message to edit not found")
+
+        self.assertEqual(bot_app.send_answer(self.callback, text="Выберите блюдо:"), (1, 99))
+        self.assertEqual(self.called(), ["edit_message_text", "send_message"])
+
+    def test_document_message_answered_with_new_message(self):
+        """Сообщение без текста, например документ, не редактируется, а ответ отправляется новым сообщением."""
+
+        self.message.content_type = "document"
+
+        self.assertEqual(bot_app.send_answer(self.callback, text="Выберите блюдо:"), (1, 99))
+        self.assertEqual(self.called(), ["send_message"])
+
+    def test_user_message_and_send_mode_answered_with_new_message(self):
+        """На сообщение пользователя и в режиме NAVIGATION_MODE="send" ответ всегда отправляется новым сообщением."""
+
+        self.assertEqual(bot_app.send_answer(self.message, text="Здравствуйте"), (1, 99))
+        with mock.patch.object(bot_app, "NAVIGATION_MODE", "send"):
+            self.assertEqual(bot_app.send_answer(self.callback, text="Выберите блюдо:"), (1, 99))
+        self.assertEqual(self.called(), ["send_message", "send_message"])
+
+
+class DishCallbackTest(TestCase):
+    """Тесты обработчика нажатия на кнопку блюда."""
+
+    def setUp(self):
+        self.sent = []
+        self.selections = []
+
+        patches = (
+            mock.patch.object(bot_app, "NAVIGATION_MODE", "send"),
+            mock.patch.object(bot_app.send_scheduler, "call", call_directly),
+            mock.patch.object(bot_app, "last_message_store", MemoryLastMessageStore()),
+            mock.patch.object(bot_app, "get_dish_parameters", lambda dish_id: None),
+            mock.patch.object(
+                bot_app, "add_dish_selection_in_selection_dishes_table", lambda **kwargs: self.selections.append(kwargs)
+            ),
+            mock.patch.object(
+                bot_app.bot, "send_message", lambda **kwargs: self.sent.append(kwargs) or SimpleNamespace(id=99)
+            ),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_missing_dish_answered_as_unknown_button(self):
+        """На кнопку блюда, которого уже нет в меню, бот отвечает как на неизвестную кнопку и не записывает нажатие."""
+
+        message = SimpleNamespace(chat=SimpleNamespace(id=1), message_id=10, content_type="text", text="")
+        callback = SimpleNamespace(message=message, from_user=SimpleNamespace(full_name="Иван"))
+
+        bot_app.callback_parameters_from_dish(callback, PageId(6, 0))
+
+        self.assertEqual([kwargs["text"] for kwargs in self.sent], [cb_unknown_answer.answer])
+        self.assertEqual(self.selections, [])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import json
+from unittest import TestCase, main
+
+from bot_keyboards import build_dishes_keyboard, build_menu_keyboard
+from db_services import MenuPage, make_menu_page
+
+
+def buttons(markup):
+    """Возвращает callback_data всех кнопок клавиатуры по рядам."""
+
+    return [[button["callback_data"] for button in row] for row in json.loads(markup)["inline_keyboard"]]
+
+
+class MenuPaginationTest(TestCase):
+    """Тесты страниц категорий и блюд."""
+
+    def test_make_menu_page(self):
+        """Лишняя строка запроса означает следующую страницу с курсором по последней строке страницы."""
+
+        rows = [(1, "Борщ"), (2, "Солянка"), (5, "Уха")]
+        self.assertEqual(make_menu_page(rows, 2, None), MenuPage([(1, "Борщ"), (2, "Солянка")], None, 2))
+        self.assertEqual(make_menu_page(rows, 3, 0), MenuPage(rows, 0, None))
+
+    def test_dishes_keyboard(self):
+        """Кнопки блюд запоминают курсор страницы, а кнопки перехода ведут на соседние страницы категории."""
+
+        markup = build_dishes_keyboard(3, MenuPage([(9, "Борщ"), (12, "Уха")], 0, 12), after=8)
+        self.assertEqual(
+            buttons(markup),
+            [["back_to_menu"], ["dish_9_8"], ["dish_12_8"], ["category_3", "category_3_12"]],
+        )
+
+    def test_menu_keyboard(self):
+        """Единственная страница категорий строится без кнопок перехода, а первая страница открывается как меню."""
+
+        self.assertEqual(buttons(build_menu_keyboard(MenuPage([(1, "Супы")], None, None))), [["back_to_start"], ["category_1"]])
+        self.assertEqual(buttons(build_menu_keyboard(MenuPage([], 0, None)))[-1], ["menu"])
+
+
+if __name__ == "__main__":
+    main()
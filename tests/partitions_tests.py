@@ -0,0 +1,109 @@
+from datetime import datetime
+from unittest import TestCase, main, mock
+
+from psycopg2 import errors
+
+import db_services
+from db_services import SELECTIONS_TIMEZONE, ensure_selection_partitions, get_selection_partition_bounds
+
+
+class SelectionPartitionsTest(TestCase):
+    """Тесты секций таблицы selection_dishes по месяцам."""
+
+    def setUp(self):
+        self.partitions = [("selection_dishes",), ("selection_dishes_y2023m12",)]
+        self.created = []
+
+        def create_range_partition(partition_name, table_name, start, end):
+            self.created.append((partition_name, start, end))
+            self.partitions.append((partition_name,))
+
+        patches = (
+            mock.patch.object(db_services, "_get_selection_partitions_name", lambda: list(self.partitions)),
+            mock.patch.object(db_services.postgres_client, "create_range_partition", create_range_partition),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        db_services.selection_partitions.refresh(db_services._get_selection_partitions_name)
+        self.addCleanup(db_services.selection_partitions.refresh, list)
+
+    def test_creates_missing_partitions_ahead(self):
+        """Создаются только недостающие секции месяца нажатий и следующих месяцев, повторный вызов ничего не создает."""
+
+        moment = SELECTIONS_TIMEZONE.localize(datetime(2023, 12, 31, 23, 59))
+        self.assertEqual(
+            ensure_selection_partitions([moment], months_ahead=2),
+            ["selection_dishes_y2024m01", "selection_dishes_y2024m02"],
+        )
+        self.assertEqual(self.created[0][1:], ("2024-01-01T00:00:00+03:00", "2024-02-01T00:00:00+03:00"))
+        self.assertEqual(ensure_selection_partitions([moment], months_ahead=2), [])
+
+    def test_month_is_taken_in_selections_timezone(self):
+        """Момент в другом часовом поясе попадает в секцию месяца по часовому поясу нажатий."""
+
+        moment = datetime.fromisoformat("2023-11-30T22:30:00+00:00")
+        self.assertEqual(ensure_selection_partitions([moment], months_ahead=0), [])
+        start, end = get_selection_partition_bounds((2023, 12))
+        self.assertTrue(start <= moment < end)
+
+    def test_unpartitioned_table(self):
+        """Если таблица не разбита на секции, секции не создаются."""
+
+        self.partitions = []
+        db_services.selection_partitions.refresh(db_services._get_selection_partitions_name)
+        self.assertEqual(ensure_selection_partitions([datetime.now(SELECTIONS_TIMEZONE)]), [])
+        self.assertEqual(self.created, [])
+
+    def test_partition_over_default_rows_moves_them(self):
+        """Если нажатия месяца уже попали в секцию по умолчанию, секция создается с переносом этих нажатий."""
+
+        moved = []
+
+        def create_range_partition(partition_name, table_name, start, end):
+            raise errors.CheckViolation("updated partition constraint for default partition would be violated")
+
+        moment = SELECTIONS_TIMEZONE.localize(datetime(2024, 1, 15))
+        create = mock.patch.object(db_services.postgres_client, "create_range_partition", create_range_partition)
+        move = mock.patch.object(
+            db_services, "_create_selection_partition_from_default", lambda *args: moved.append(args)
+        )
+        with create, move:
+            self.assertEqual(ensure_selection_partitions([moment], months_ahead=0), ["selection_dishes_y2024m01"])
+
+        self.assertEqual(moved, [("selection_dishes_y2024m01", *get_selection_partition_bounds((2024, 1)))])
+
+    def test_insert_without_partition_rereads_partitions(self):
+        """Если секции месяца нажатий нет из-за устаревшего кэша секций, кэш перечитывается и запись повторяется."""
+
+        writes = []
+
+        def write_dish_selections(rows):
+            writes.append(rows)
+            if len(writes) == 1:
+                raise errors.CheckViolation('no partition of relation "selection_dishes" found for row')
+
+        # кэш считает таблицу не разбитой на секции, хотя другой процесс уже разбил ее
+        self.partitions, partitions = [], self.partitions
+        db_services.selection_partitions.refresh(db_services._get_selection_partitions_name)
+        self.partitions = partitions
+
+        rows = [("анна", "7", SELECTIONS_TIMEZONE.localize(datetime(2024, 1, 15)))]
+        with mock.patch.object(db_services, "_write_dish_selections", write_dish_selections):
+            db_services._insert_dish_selections(rows)
+
+        self.assertEqual(writes, [rows, rows])
+        self.assertIn("selection_dishes_y2024m01", [name for name, *_ in self.created])
+
+    def test_missing_default_partition_reported(self):
+        """Отсутствие секции по умолчанию у таблицы, разбитой на секции, считается устаревшей схемой."""
+
+        with mock.patch.object(db_services, "is_table_in_db", lambda table_name: True):
+            self.assertEqual(db_services.get_missing_schema_tables(), [db_services.SELECTION_DEFAULT_PARTITION])
+            self.partitions.append((db_services.SELECTION_DEFAULT_PARTITION,))
+            db_services.selection_partitions.refresh(db_services._get_selection_partitions_name)
+            self.assertEqual(db_services.get_missing_schema_tables(), [])
+
+
+if __name__ == "__main__":
+    main()
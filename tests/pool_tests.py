@@ -0,0 +1,132 @@
+import threading
+from unittest import TestCase, main
+
+from psycopg2 import extensions
+
+from db import PostgresConnectionPool
+from exceptions import PoolTimeoutError
+
+
+class FakeConnection:
+    """Заглушка соединения psycopg2, достаточная для проверки логики пула."""
+
+    def __init__(self):
+        self.closed = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class PostgresConnectionPoolTest(TestCase):
+    """Тесты пула соединений PostgresConnectionPool."""
+
+    def setUp(self):
+        self.opened = []
+
+        def connect():
+            connection = FakeConnection()
+            self.opened.append(connection)
+            return connection
+
+        self.pool = PostgresConnectionPool(connect, min_size=1, max_size=2, timeout=0.05)
+
+    def test_min_size_connections_opened(self):
+        """Пул сразу открывает min_size соединений."""
+
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(self.pool.stats()["idle"], 1)
+
+    def test_connection_reused(self):
+        """Возвращенное соединение выдается повторно, а не открывается новое."""
+
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_timeout_when_exhausted(self):
+        """Если все соединения заняты, по истечении времени ожидания появляется PoolTimeoutError."""
+
+        self.pool.getconn()
+        self.pool.getconn()
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.getconn()
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["in_use"], 2)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["waits"], 0)
+
+    def test_waiting_thread_gets_released_connection(self):
+        """Ожидающий поток получает соединение, которое вернул другой поток."""
+
+        self.pool.timeout = 1
+        first = self.pool.getconn()
+        self.pool.getconn()
+        received = []
+
+        thread = threading.Thread(target=lambda: received.append(self.pool.getconn()))
+        thread.start()
+        self.pool.putconn(first)
+        thread.join()
+
+        self.assertEqual(received, [first])
+        self.assertEqual(self.pool.stats()["waits"], 1)
+
+    def test_aborted_transaction_rolled_back(self):
+        """Соединение с незавершенной транзакцией откатывается при возврате в пул."""
+
+        connection = self.pool.getconn()
+        connection.status = extensions.TRANSACTION_STATUS_INERROR
+        self.pool.putconn(connection)
+        self.assertEqual(connection.rollbacks, 1)
+
+    def test_closed_connection_discarded(self):
+        """Закрытое соединение не возвращается в пул."""
+
+        connection = self.pool.getconn()
+        connection.closed = 2
+        self.pool.putconn(connection)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["size"], 0)
+        self.assertIsNot(self.pool.getconn(), connection)
+
+    def test_lazy_pool_connects_on_first_use(self):
+        """Ленивый пул не открывает соединений при создании, а fill дополняет его до min_size."""
+
+        opened = []
+        pool = PostgresConnectionPool(
+            lambda: opened.append(FakeConnection()) or opened[-1], min_size=2, max_size=3, lazy=True
+        )
+        self.assertEqual(opened, [])
+
+        self.assertEqual(pool.fill(), 2)
+        self.assertEqual(pool.fill(), 0)
+        self.assertEqual(pool.stats()["idle"], 2)
+
+    def test_failed_connect_releases_slot(self):
+        """Если соединение не открылось, место в пуле освобождается."""
+
+        def connect():
+            raise OSError
+
+        pool = PostgresConnectionPool(connect, min_size=1, max_size=1, lazy=True)
+        with self.assertRaises(OSError):
+            pool.fill()
+        self.assertEqual(pool.stats()["size"], 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest import TestCase, main, mock
+
+import db
+from db import PooledConnection, PostgresClient
+
+
+class FakeCursor:
+    """Курсор, который запоминает выполненные на соединении запросы вместо обращения к базе данных."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        self.connection.statements.append("PREPARE" if "PREPARE" in repr(query) else "EXECUTE")
+
+    def fetchall(self):
+        return [(1, "Борщ")]
+
+    def fetchone(self):
+        return 1, "Борщ"
+
+
+class PreparedStatementsTest(TestCase):
+    """Тесты подготовленных запросов на соединениях пула."""
+
+    def setUp(self):
+        self.client = PostgresClient("menu", "bot", "", "localhost")
+        self.client.register_prepared_statement(
+            "select_dishes", "SELECT dish_id, name_dish FROM dishes WHERE category_id = $1", ("integer",)
+        )
+        self.connections = [self.make_connection(), self.make_connection()]
+        self.current = self.connections[0]
+
+        @contextmanager
+        def cursor():
+            yield FakeCursor(self.current)
+
+        patch = mock.patch.object(self.client, "cursor", cursor)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    @staticmethod
+    def make_connection():
+        return SimpleNamespace(prepared_statements=set(), statements=[])
+
+    def test_prepared_once_per_connection(self):
+        """Запрос подготавливается один раз на каждом соединении, а дальше выполняется через EXECUTE."""
+
+        self.assertEqual(self.client.fetch_all_prepared("select_dishes", (3,)), [(1, "Борщ")])
+        self.client.fetch_one_prepared("select_dishes", (3,))
+        self.current = self.connections[1]
+        self.client.fetch_all_prepared("select_dishes", (3,))
+
+        self.assertEqual(self.connections[0].statements, ["PREPARE", "EXECUTE", "EXECUTE"])
+        self.assertEqual(self.connections[1].statements, ["PREPARE", "EXECUTE"])
+        self.assertEqual(self.connections[1].prepared_statements, {"select_dishes"})
+
+    def test_new_connection_prepares_again(self):
+        """Соединение, открытое пулом взамен закрытого, не знает о подготовленных запросах и готовит их заново."""
+
+        self.client.fetch_all_prepared("select_dishes", (3,))
+        self.current = self.make_connection()
+        self.client.fetch_all_prepared("select_dishes", (3,))
+
+        self.assertEqual(self.current.statements, ["PREPARE", "EXECUTE"])
+
+    def test_connections_remember_prepared_statements(self):
+        """Пул открывает соединения класса PooledConnection с общим списком функций query_hooks."""
+
+        connect = mock.Mock(return_value=SimpleNamespace())
+        with mock.patch.object(db.psycopg2, "connect", connect):
+            connection = self.client._connect()
+
+        self.assertIs(connect.call_args.kwargs["connection_factory"], PooledConnection)
+        self.assertIs(connection.query_hooks, self.client.query_hooks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import io
+from datetime import datetime
+from unittest import TestCase, main, mock
+
+import reports
+import services
+from exceptions import ReportError
+
+
+def fake_report_rows(rows):
+    """Возвращает замену iter_report_rows, которая выдает rows частями по две строки и запоминает, закрыт ли курсор."""
+
+    state = {"closed": False, "read": 0}
+
+    def iter_report_rows(report_name, count, chunk_size=2):
+        try:
+            for start in range(0, min(count, len(rows)), 2):
+                chunk = rows[start : min(start + 2, count)]
+                state["read"] += len(chunk)
+                yield chunk
+        finally:
+            state["closed"] = True
+
+    return iter_report_rows, state
+
+
+class ReportsTest(TestCase):
+    """Тесты отчетов администратора, разбитых на сообщения."""
+
+    def test_split_messages(self):
+        """Сообщения не длиннее лимита, строки не разрываются и идут по порядку, заголовок только в первом сообщении."""
+
+        lines = [f"{number:03}\n" for number in range(10)]
+        messages = list(reports.split_messages(lines, "T\n", limit=10))
+        self.assertTrue(all(len(message) <= 10 for message in messages))
+        self.assertEqual("".join(messages), "T\n" + "".join(lines))
+        self.assertEqual(messages[:2], ["T\n000\n001\n", "002\n003\n"])
+
+    def test_render_report_messages_escapes_user_text(self):
+        """Текст сообщений пользователей экранируется, чтобы не ломать HTML-разметку отчета."""
+
+        iter_report_rows, _ = fake_report_rows([("<b>привет</b>",)])
+        with mock.patch.object(reports, "iter_report_rows", iter_report_rows):
+            result = reports.render_report_messages("last_messages", 1)
+        self.assertFalse(result.truncated)
+        self.assertIn("<i>1. &lt;b&gt;привет&lt;/b&gt;</i>", result.messages[0])
+
+    def test_render_report_messages_truncates(self):
+        """Отчет, не поместившийся в max_messages сообщений, обрезается, а чтение из базы данных останавливается."""
+
+        rows = [(f"Блюдо {number}", number) for number in range(100)]
+        iter_report_rows, state = fake_report_rows(rows)
+        with mock.patch.object(reports, "iter_report_rows", iter_report_rows):
+            result = reports.render_report_messages("top_dishes", 100, max_messages=2, limit=200)
+        self.assertTrue(result.truncated)
+        self.assertEqual(len(result.messages), 2)
+        self.assertTrue(state["closed"])
+        self.assertLess(state["read"], len(rows))
+
+    def test_get_report_validates_arguments(self):
+        """Неизвестный отчет и количество строк вне допустимого диапазона отклоняются."""
+
+        with self.assertRaises(ReportError):
+            reports.get_report("unknown", 10)
+        with self.assertRaises(ReportError):
+            reports.get_report("top_users", 0)
+        with self.assertRaises(ReportError):
+            reports.get_report("top_users", reports.REPORT_MAX_ROWS + 1)
+
+    def test_get_report_period(self):
+        """Периоды today, week и диапазон дат задают границы целых дней в часовом поясе нажатий."""
+
+        now = reports.SELECTIONS_TIMEZONE.localize(datetime(2023, 3, 10, 15, 30))
+        today = reports.get_report_period("today", now)
+        self.assertEqual(today.title, " за сегодня")
+        self.assertEqual((today.start.day, today.end.day), (10, 11))
+        week = reports.get_report_period("week", now)
+        self.assertEqual((week.start.day, week.end.day), (4, 11))
+        custom = reports.get_report_period("2023-02-27..2023-03-01", now)
+        self.assertEqual(custom.title, " с 27.02.2023 по 01.03.2023")
+        self.assertEqual((custom.start.month, custom.start.day, custom.end.day), (2, 27, 2))
+        self.assertEqual(custom.start.utcoffset(), reports.SELECTIONS_TIMEZONE.utcoffset(datetime(2023, 2, 27)))
+
+        for period in ("month", "2023-03-01..2023-02-01"):
+            with self.assertRaises(ReportError):
+                reports.get_report_period(period, now)
+
+    def test_render_report_for_period(self):
+        """Отчет за период читает строки за границы периода и подписывает период в заголовке."""
+
+        period = reports.get_report_period("2023-03-01")
+        calls = []
+
+        def iter_report_rows(report_name, count, **window):
+            calls.append(window)
+            yield [("Борщ", 2)]
+
+        with mock.patch.object(reports, "iter_report_rows", iter_report_rows):
+            result = reports.render_report_messages("top_dishes", 3, period=period)
+        self.assertEqual(calls, [{"start": period.start, "end": period.end}])
+        self.assertTrue(result.messages[0].startswith("<b>Топ 3 самых популярных блюд меню за 01.03.2023:</b>"))
+
+        with self.assertRaises(ReportError):
+            reports.get_report("last_messages", 10, period)
+
+    def test_period_argument_round_trip(self):
+        """Период, записанный диапазоном дат, разбирается get_report_period в те же границы."""
+
+        now = reports.SELECTIONS_TIMEZONE.localize(datetime(2023, 3, 10, 15, 30))
+        for period in (reports.get_report_period("week", now), reports.get_report_period("2023-03-01", now)):
+            parsed = reports.get_report_period(reports.get_period_argument(period), now)
+            self.assertEqual((parsed.start, parsed.end), (period.start, period.end))
+        self.assertEqual(reports.get_period_argument(reports.get_report_period("week", now)), "2023-03-04..2023-03-10")
+
+    def test_single_message_report_explains_truncation(self):
+        """Отчет в одном сообщении не длиннее лимита Telegram и подсказывает, как получить обрезанный отчет файлом."""
+
+        rows = [(f"Сообщение {number} " + "x" * 100,) for number in range(100)]
+        iter_report_rows, _ = fake_report_rows(rows)
+        with mock.patch.object(reports, "iter_report_rows", iter_report_rows):
+            report = services.get_last_messages_report(100)
+        self.assertLessEqual(len(report), reports.MESSAGE_LIMIT)
+        self.assertTrue(report.endswith("/report last_messages 100 file"))
+
+        iter_report_rows, _ = fake_report_rows(rows[:3])
+        with mock.patch.object(reports, "iter_report_rows", iter_report_rows):
+            self.assertNotIn("/report", services.get_last_messages_report(3))
+
+    def test_write_report(self):
+        """Отчет записывается в файл построчно без разметки, а переводы строк внутри сообщений заменяются пробелами."""
+
+        iter_report_rows, _ = fake_report_rows([("первое\nсообщение",), ("второе",)])
+        file = io.StringIO()
+        with mock.patch.object(reports, "iter_report_rows", iter_report_rows):
+            rows = reports.write_report("last_messages", 5, file)
+        self.assertEqual(rows, 2)
+        self.assertEqual(
+            file.getvalue(), "Последние 5 сообщений от пользователей:\n\n1. первое сообщение\n2. второе\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
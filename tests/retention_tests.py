@@ -0,0 +1,149 @@
+import gzip
+import json
+import tempfile
+from datetime import datetime, timedelta
+from unittest import TestCase, main, mock
+
+import retention
+from exceptions import RetentionError
+from retention import RetentionJob, RetentionPolicy, apply_retention
+
+
+class FakeTable:
+    """Таблица в памяти вместо базы данных для функций, которые использует retention."""
+
+    def __init__(self, rows, partitions=None, partitioned=False):
+        self.rows = list(rows)
+        self.partitions = dict(partitions or {})
+        self.partitioned = partitioned
+        self.batches = []
+        self.dropped = []
+        self.vacuumed = 0
+
+    def delete_retention_batch(self, table_name, batch_size, archive, before=None, max_id=None):
+        expired = [row for row in self.rows if max_id is None or row[0] <= max_id][:batch_size]
+        if expired:
+            archive(expired)
+        self.rows = [row for row in self.rows if row not in expired]
+        self.batches.append(len(expired))
+        return len(expired)
+
+    def get_retention_max_id(self, table_name, keep_rows):
+        return self.rows[-keep_rows - 1][0] if len(self.rows) > keep_rows else None
+
+    def drop_selection_partition(self, partition_name):
+        self.dropped.append(partition_name)
+        del self.partitions[partition_name]
+
+    def vacuum_table(self, table_name):
+        self.vacuumed += 1
+
+    def patches(self):
+        return (
+            mock.patch.object(retention, "is_table_in_db", lambda table_name: True),
+            mock.patch.object(retention, "is_partitioned_table", lambda table_name: self.partitioned),
+            mock.patch.object(
+                retention, "get_table_size", lambda table_name: 1024 * (len(self.rows) + len(self.partitions))
+            ),
+            mock.patch.object(retention, "delete_retention_batch", self.delete_retention_batch),
+            mock.patch.object(retention, "get_retention_max_id", self.get_retention_max_id),
+            mock.patch.object(retention, "get_expired_selection_partitions", lambda before: sorted(self.partitions)),
+            mock.patch.object(
+                retention, "iter_partition_rows", lambda partition_name: iter([self.partitions[partition_name]])
+            ),
+            mock.patch.object(retention, "drop_selection_partition", self.drop_selection_partition),
+            mock.patch.object(retention, "vacuum_table", self.vacuum_table),
+        )
+
+
+def read_archive(path):
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+class RetentionTest(TestCase):
+    """Тесты очистки таблиц по правилам хранения."""
+
+    def setUp(self):
+        self.archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_dir.cleanup)
+
+    def install(self, table):
+        for patch in table.patches():
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_row_cap_deletes_in_batches_after_archiving(self):
+        """Строки сверх максимального количества удаляются пачками, попадают в архив, а после удаления идет VACUUM."""
+
+        table = FakeTable([(number, f"сообщение {number}") for number in range(1, 11)])
+        self.install(table)
+
+        result = apply_retention(
+            RetentionPolicy("last_messages", None, 3), archive_dir=self.archive_dir.name, batch_size=3, batch_pause=0
+        )
+
+        self.assertEqual([row[0] for row in table.rows], [8, 9, 10])
+        self.assertEqual(table.batches, [3, 3, 1])
+        self.assertEqual(table.vacuumed, 1)
+        self.assertEqual((result.rows, result.size_before, result.size_after), (7, 10240, 3072))
+        self.assertEqual(
+            [row["last_message_id"] for row in read_archive(result.archive_path)], [1, 2, 3, 4, 5, 6, 7]
+        )
+
+    def test_expired_partitions_are_archived_and_dropped(self):
+        """Секции старше максимального возраста архивируются и удаляются целиком без построчного удаления."""
+
+        moment = datetime(2023, 1, 5, 12, 0)
+        table = FakeTable(
+            [],
+            partitions={"selection_dishes_y2023m01": [(1, "user", 3, moment), (2, "user", 4, moment)]},
+            partitioned=True,
+        )
+        self.install(table)
+
+        result = apply_retention(
+            RetentionPolicy("selection_dishes", timedelta(days=90), None), archive_dir=self.archive_dir.name
+        )
+
+        self.assertEqual(result.partitions, ["selection_dishes_y2023m01"])
+        self.assertEqual(table.dropped, ["selection_dishes_y2023m01"])
+        self.assertEqual(table.vacuumed, 0)
+        self.assertEqual(read_archive(result.archive_path)[0]["datetime"], moment.isoformat())
+
+    def test_nothing_to_delete_leaves_no_archive(self):
+        """Если удалять нечего, архив не создается."""
+
+        self.install(FakeTable([(1, "сообщение")]))
+        result = apply_retention(RetentionPolicy("last_messages", None, 5), archive_dir=self.archive_dir.name)
+        self.assertEqual((result.rows, result.archive_path), (0, None))
+
+    def test_max_age_requires_time_column(self):
+        """Для таблицы без времени добавления строк нельзя задать максимальный возраст."""
+
+        with self.assertRaises(RetentionError):
+            apply_retention(RetentionPolicy("last_messages", timedelta(days=1), None))
+
+    def test_job_counts_results_and_failures(self):
+        """Задача очистки продолжает работу после ошибки одной таблицы и считает удаленные строки."""
+
+        table = FakeTable([(number, "сообщение") for number in range(1, 6)])
+        self.install(table)
+        job = RetentionJob(
+            [RetentionPolicy("unknown", None, 1), RetentionPolicy("last_messages", None, 2)],
+            archive_dir=self.archive_dir.name,
+            batch_pause=0,
+        )
+
+        with self.assertLogs(retention.logger, "ERROR"):
+            results = job.run_once()
+
+        stats = job.stats()
+        self.assertEqual(len(results), 1)
+        self.assertEqual((stats["runs"], stats["failures"]), (1, 1))
+        self.assertEqual(stats["rows"], {"last_messages": 3})
+        self.assertEqual(stats["reclaimed_bytes"], {"last_messages": 3072})
+
+
+if __name__ == "__main__":
+    main()
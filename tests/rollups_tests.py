@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+from datetime import datetime
+from unittest import TestCase, main, mock
+
+from psycopg2 import errors
+
+import db_services
+
+
+class FakeCursor:
+    """Курсор, который запоминает выполненные запросы и возвращает заранее заданные строки из results."""
+
+    def __init__(self, results):
+        self.statements = []
+        self.results = results
+
+    def execute(self, query, params=None):
+        self.statements.append((" ".join(query.split()), params))
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+
+class PopularityRollupsTest(TestCase):
+    """Тесты счетчиков популярности блюд и пользователей."""
+
+    def setUp(self):
+        self.cursors = []
+        self.missing_tables = ()
+        self.results = []
+
+        @contextmanager
+        def cursor():
+            fake_cursor = FakeCursor(self.results)
+            self.cursors.append(fake_cursor)
+            yield fake_cursor
+
+        def execute_values(cursor, query, rows, page_size=100, fetch=False):
+            query = " ".join(query.split())
+            for table_name in self.missing_tables:
+                if f"INTO {table_name} " in query:
+                    raise errors.UndefinedTable(f'relation "{table_name}" does not exist')
+            cursor.statements.append((query, list(rows)))
+
+        patches = (
+            mock.patch.object(db_services.postgres_client, "cursor", cursor),
+            mock.patch.object(db_services.postgres_client, "create_table", lambda *args, **kwargs: None),
+            mock.patch.object(db_services.postgres_client, "create_index", lambda *args, **kwargs: None),
+            mock.patch.object(db_services.extras, "execute_values", execute_values),
+            mock.patch.object(db_services, "ensure_selection_partitions", lambda moments: []),
+            mock.patch.object(db_services, "refresh_schema_state", lambda: None),
+            mock.patch.object(db_services, "is_partitioned_table", lambda table_name: False),
+            mock.patch.object(db_services.selection_partitions, "refresh", lambda loader: None),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_selections_increment_rollups_in_same_transaction(self):
+        """Пачка нажатий и увеличение счетчиков идут одной транзакцией, счетчики сгруппированы и отсортированы."""
+
+        moment = datetime(2023, 3, 1, 12, 0)
+        db_services._insert_dish_selections([("анна", "7", moment), ("борис", "3", moment), ("анна", "7", moment)])
+
+        self.assertEqual(len(self.cursors), 1)
+        statements = self.cursors[0].statements
+        self.assertTrue(statements[0][0].startswith("INSERT INTO selection_dishes"))
+        self.assertEqual(statements[2][1], [(3, 1), (7, 2)])
+        self.assertEqual(statements[3][1], [("анна", 2), ("борис", 1)])
+
+    def test_rollups_checked_by_database_not_schema_cache(self):
+        """Счетчики обновляются, даже если кэш состояния схемы еще не знает о таблицах счетчиков."""
+
+        with mock.patch.object(db_services, "is_table_in_db", lambda table_name: False):
+            db_services._insert_dish_selections([("анна", "7", datetime(2023, 3, 1))])
+
+        self.assertIn("INTO dish_popularity", self.cursors[0].statements[2][0])
+
+    def test_missing_rollups_keep_selections(self):
+        """Если таблиц счетчиков нет в базе данных, нажатия все равно записываются."""
+
+        self.missing_tables = ("dish_popularity",)
+        db_services._insert_dish_selections([("анна", "7", datetime(2023, 3, 1))])
+
+        queries = [query for query, _ in self.cursors[0].statements]
+        self.assertTrue(queries[0].startswith("INSERT INTO selection_dishes"))
+        self.assertEqual(queries[-1], "ROLLBACK TO SAVEPOINT popularity_rollups")
+
+    def test_retention_batch_decrements_rollups(self):
+        """Удаление старых нажатий уменьшает счетчики в той же транзакции, а дошедшие до нуля счетчики удаляются."""
+
+        moment = datetime(2023, 3, 1, 12, 0)
+        self.results.append([(1, "анна", 7, moment), (2, "борис", 3, moment), (3, "анна", 7, moment)])
+        archived = []
+
+        self.assertEqual(db_services.delete_retention_batch("selection_dishes", 10, archived.append, max_id=3), 3)
+
+        self.assertEqual(len(self.cursors), 1)
+        self.assertEqual(len(archived), 1)
+        statements = self.cursors[0].statements
+        self.assertTrue(statements[0][0].startswith("DELETE FROM selection_dishes"))
+        self.assertTrue(statements[2][0].startswith("UPDATE dish_popularity"))
+        self.assertEqual(statements[2][1], [(3, 1), (7, 2)])
+        self.assertEqual(
+            statements[3],
+            ("DELETE FROM dish_popularity WHERE dish_id = ANY(%s) AND selections_count <= 0", ([3, 7],)),
+        )
+        self.assertEqual(statements[4][1], [("анна", 2), ("борис", 1)])
+
+    def test_dropped_partition_decrements_rollups(self):
+        """Удаление секции уменьшает счетчики на ее нажатия в той же транзакции."""
+
+        self.results.extend([[(7, 2)], [("анна", 2)]])
+
+        db_services.drop_selection_partition("selection_dishes_y2023m01")
+
+        self.assertEqual(len(self.cursors), 1)
+        queries = [query for query, _ in self.cursors[0].statements]
+        self.assertEqual(queries[2], "DROP TABLE IF EXISTS selection_dishes_y2023m01 CASCADE")
+        self.assertTrue(queries[4].startswith("UPDATE dish_popularity"))
+        self.assertTrue(queries[6].startswith("UPDATE user_popularity"))
+
+    def test_rebuild_backfills_rollups_in_one_transaction(self):
+        """
+        Пересчет очищает счетчики и заполняет их по всей истории нажатий одной транзакцией.
+
+        Перед пересчетом транзакция блокирует запись нажатий, чтобы в него попали пачки, записанные без счетчиков.
+        """
+
+        db_services.rebuild_popularity_rollups()
+
+        self.assertEqual(len(self.cursors), 1)
+        queries = [query for query, _ in self.cursors[0].statements]
+        self.assertEqual(
+            queries[:2], ["LOCK TABLE selection_dishes IN SHARE MODE", "TRUNCATE dish_popularity, user_popularity"]
+        )
+        self.assertEqual(
+            queries[2:],
+            [
+                "INSERT INTO dish_popularity (dish_id, selections_count) "
+                "SELECT dish_id, count(*) FROM selection_dishes GROUP BY dish_id",
+                "INSERT INTO user_popularity (username, selections_count) "
+                "SELECT username, count(*) FROM selection_dishes GROUP BY username",
+            ],
+        )
+
+    def test_upgrade_creates_and_backfills_rollups_once(self):
+        """Обновление схемы создает недостающие таблицы счетчиков и заполняет их по истории нажатий один раз."""
+
+        tables = {"menu_categories", "dishes", "catalog_version", "selection_dishes"}
+        rebuilds = []
+        is_table_in_db = mock.patch.object(db_services, "is_table_in_db", lambda table_name: table_name in tables)
+        rebuild = mock.patch.object(db_services, "rebuild_popularity_rollups", lambda: rebuilds.append(1))
+        with is_table_in_db, rebuild:
+            self.assertEqual(db_services.get_missing_schema_tables(), ["dish_popularity", "user_popularity"])
+            db_services.ensure_schema_objects()
+
+        self.assertEqual(len(rebuilds), 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from unittest import TestCase, main, mock
+
+from psycopg2 import errors
+
+import db_services
+
+
+class SchemaIndexesTest(TestCase):
+    """Тесты обновления индексов схемы на существующей базе данных."""
+
+    def setUp(self):
+        self.relations = {"menu_categories", "dishes", "dishes_category_id_idx"} | {
+            index.name for index in db_services.SCHEMA_INDEXES if index.table == "menu_categories"
+        }
+        self.dropped = []
+        self.failing_indexes = set()
+
+        def create_index(index_name, table_name, columns, unique=False, concurrently=False, method=None):
+            if index_name in self.failing_indexes:
+                raise errors.Error("не удалось построить индекс")
+            self.relations.add(index_name)
+
+        def drop_index(index_name, concurrently=False):
+            if index_name in self.relations:
+                self.dropped.append(index_name)
+                self.relations.discard(index_name)
+
+        patches = (
+            mock.patch.object(db_services, "is_table_in_db", lambda table_name: table_name in self.relations),
+            mock.patch.object(db_services, "is_index_in_db", lambda index_name: index_name in self.relations),
+            mock.patch.object(db_services, "is_partitioned_table", lambda table_name: False),
+            mock.patch.object(db_services, "refresh_schema_state", lambda: None),
+            mock.patch.object(db_services.postgres_client, "create_index", create_index),
+            mock.patch.object(db_services.postgres_client, "drop_index", drop_index),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_obsolete_index_dropped_after_replacement(self):
+        """Замененный индекс удаляется после того, как построен заменивший его индекс."""
+
+        self.assertEqual(db_services.get_obsolete_schema_indexes(), ["dishes_category_id_idx"])
+        self.assertEqual(db_services.ensure_schema_indexes(), [])
+
+        self.assertIn("dishes_category_id_dish_id_idx", self.relations)
+        self.assertEqual(self.dropped, ["dishes_category_id_idx"])
+        self.assertEqual(db_services.get_obsolete_schema_indexes(), [])
+
+    def test_obsolete_index_kept_without_replacement(self):
+        """Если заменивший индекс построить не удалось, старый индекс остается, чтобы поиск блюд не лишился индекса."""
+
+        self.failing_indexes.add("dishes_category_id_dish_id_idx")
+
+        failures = db_services.ensure_schema_indexes()
+
+        self.assertEqual(len(failures), 1)
+        self.assertTrue(failures[0].startswith("dishes_category_id_dish_id_idx"))
+        self.assertIn("dishes_category_id_idx", self.relations)
+
+
+if __name__ == "__main__":
+    main()
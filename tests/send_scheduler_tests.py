@@ -0,0 +1,263 @@
+import asyncio
+import io
+import threading
+import time
+from types import SimpleNamespace
+from unittest import TestCase, main, mock
+
+from telebot import apihelper
+
+import bot_app
+from send_scheduler import AsyncSendScheduler, SendScheduler, TokenBucket, PRIORITY_REPLY, PRIORITY_DELETE
+
+
+def too_many_requests(retry_after):
+    """Возвращает ошибку Bot API с кодом 429 и паузой retry_after секунд."""
+
+    return apihelper.ApiTelegramException(
+        "sendMessage",
+        None,
+        {"error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": retry_after}},
+    )
+
+
+class TokenBucketTest(TestCase):
+    """Тесты ограничителя частоты."""
+
+    def test_reserve(self):
+        """Ограничитель выдает capacity токенов подряд, а затем возвращает время ожидания следующего."""
+
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertGreater(bucket.reserve(), 0.05)
+        self.assertFalse(bucket.idle)
+
+    def test_block(self):
+        """После block ограничитель не выдает токены даже без ограничения частоты."""
+
+        bucket = TokenBucket(rate=0, capacity=1)
+        self.assertEqual(bucket.reserve(), 0)
+        bucket.block(10)
+        self.assertGreater(bucket.reserve(), 9)
+
+
+class SendSchedulerTest(TestCase):
+    """Тесты планировщика запросов к Bot API."""
+
+    def setUp(self):
+        self.scheduler = SendScheduler(global_rate=0, chat_rate=0, workers=1, name="test-send-scheduler")
+
+    def tearDown(self):
+        self.scheduler.close()
+
+    def test_priority(self):
+        """Ответы пользователю отправляются раньше удалений, поставленных в очередь до них."""
+
+        sent = []
+        gate = threading.Event()
+        self.scheduler.submit(1, gate.wait)
+        futures = [
+            self.scheduler.submit(1, sent.append, "delete", priority=PRIORITY_DELETE),
+            self.scheduler.submit(1, sent.append, "reply", priority=PRIORITY_REPLY),
+        ]
+        gate.set()
+        for future in futures:
+            future.result(timeout=1)
+
+        self.assertEqual(sent, ["reply", "delete"])
+
+    def test_keyword_chat_id(self):
+        """Аргумент chat_id вызываемой функции не конфликтует с чатом запроса."""
+
+        self.assertEqual(self.scheduler.call(5, lambda chat_id, text: (chat_id, text), chat_id=5, text="hi"), (5, "hi"))
+
+    def test_retry_after(self):
+        """На ответ 429 запрос повторяется после паузы retry_after."""
+
+        attempts = []
+
+        def send():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise too_many_requests(0.05)
+            return "ok"
+
+        self.assertEqual(self.scheduler.call(1, send), "ok")
+        self.assertGreaterEqual(attempts[1] - attempts[0], 0.05)
+        stats = self.scheduler.stats()
+        self.assertEqual((stats["retries"], stats["rate_limited"], stats["completed"]), (1, 1, 1))
+
+    def test_document_rewound_before_retry(self):
+        """Документ, отправка которого повторяется после ответа 429, читается с начала и закрывается после отправки."""
+
+        sent = []
+        done = threading.Event()
+
+        def send_document(chat_id, file, visible_file_name=None):
+            sent.append(file.read())
+            if len(sent) == 1:
+                raise too_many_requests(0.01)
+            done.set()
+
+        document = SimpleNamespace(file=io.BytesIO(b"dish_id,name_dish"), file_name="menu.csv")
+        with mock.patch.object(bot_app, "send_scheduler", self.scheduler), mock.patch.object(
+            bot_app.bot, "send_document", send_document
+        ):
+            bot_app._submit_document(1, document)
+            self.assertTrue(done.wait(5))
+            self.scheduler.close()
+
+        self.assertEqual(sent, [b"dish_id,name_dish", b"dish_id,name_dish"])
+        self.assertTrue(document.file.closed)
+
+    def test_chat_requests_in_order(self):
+        """Запросы одного чата выполняются по одному в порядке постановки в очередь даже при нескольких потоках."""
+
+        scheduler = SendScheduler(global_rate=0, chat_rate=0, workers=8, name="test-chat-order")
+        sent = {1: [], 2: []}
+
+        def send(chat_id, part):
+            # первая часть отправляется дольше остальных, чтобы свободные потоки успели взять следующие
+            time.sleep(0.02 if part == 0 else 0.001)
+            sent[chat_id].append(part)
+
+        try:
+            futures = [scheduler.submit(chat_id, send, chat_id, part) for part in range(10) for chat_id in (1, 2)]
+            for future in futures:
+                future.result(timeout=5)
+        finally:
+            scheduler.close()
+
+        self.assertEqual(sent, {1: list(range(10)), 2: list(range(10))})
+        self.assertEqual(scheduler.stats()["queued"], 0)
+
+    def test_deferred_request_keeps_chat_order(self):
+        """Запрос, отложенный после ответа 429, не обгоняется следующими запросами того же чата."""
+
+        scheduler = SendScheduler(global_rate=0, chat_rate=0, workers=4, name="test-chat-retry-order")
+        sent, attempts = [], []
+
+        def send(part):
+            attempts.append(part)
+            if attempts == [0]:
+                raise too_many_requests(0.05)
+            sent.append(part)
+
+        try:
+            futures = [scheduler.submit(1, send, part) for part in range(3)]
+            for future in futures:
+                future.result(timeout=5)
+        finally:
+            scheduler.close()
+
+        self.assertEqual(sent, [0, 1, 2])
+
+    def test_errors(self):
+        """Ошибки, кроме 429, и 429 сверх max_retries передаются вызывающему коду."""
+
+        self.scheduler.max_retries = 1
+
+        def fail():
+            raise too_many_requests(0.01)
+
+        with self.assertRaises(apihelper.ApiTelegramException):
+            self.scheduler.call(1, fail)
+        with self.assertRaises(ZeroDivisionError):
+            self.scheduler.call(1, lambda: 1 / 0)
+        self.assertEqual(self.scheduler.stats()["failed"], 2)
+
+    def test_chat_limit(self):
+        """Чат, исчерпавший свой лимит, откладывается и не задерживает запросы других чатов."""
+
+        scheduler = SendScheduler(global_rate=0, chat_rate=2, chat_burst=1, workers=1, name="test-chat-limit")
+        try:
+            sent = []
+            futures = [
+                scheduler.submit(1, sent.append, "first"),
+                scheduler.submit(1, sent.append, "second"),
+                scheduler.submit(2, sent.append, "other"),
+            ]
+            for future in futures:
+                future.result(timeout=2)
+            self.assertEqual(sent, ["first", "other", "second"])
+            self.assertEqual(scheduler.stats()["deferred"], 1)
+        finally:
+            scheduler.close()
+
+
+class AsyncSendSchedulerTest(TestCase):
+    """Тесты асинхронного планировщика запросов к Bot API."""
+
+    def test_chat_requests_in_order(self):
+        """Запросы одного чата выполняются по одному в порядке вызова, а запросы разных чатов - одновременно."""
+
+        scheduler = AsyncSendScheduler(global_rate=0, chat_rate=0)
+        sent, running, concurrency = {1: [], 2: []}, [], []
+
+        async def send(chat_id, part):
+            running.append(chat_id)
+            concurrency.append(list(running))
+            # первая часть отправляется дольше остальных, чтобы следующие части успели ее обогнать
+            await asyncio.sleep(0.02 if part == 0 else 0)
+            sent[chat_id].append(part)
+            running.remove(chat_id)
+
+        async def run():
+            calls = [scheduler.call(chat_id, send, chat_id, part) for part in range(5) for chat_id in (1, 2)]
+            await asyncio.gather(*calls)
+
+        asyncio.run(run())
+
+        self.assertEqual(sent, {1: list(range(5)), 2: list(range(5))})
+        self.assertIn([1, 2], concurrency)
+        self.assertTrue(all(len(set(chats)) == len(chats) for chats in concurrency))
+        self.assertEqual(scheduler.stats()["queued"], 0)
+
+    def test_retry_after(self):
+        """На ответ 429 запрос повторяется после паузы retry_after, а ошибки сверх max_retries передаются дальше."""
+
+        scheduler = AsyncSendScheduler(global_rate=0, chat_rate=0, max_retries=1)
+        attempts = []
+
+        async def send():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise too_many_requests(0.05)
+            return "ok"
+
+        async def fail():
+            raise too_many_requests(0.01)
+
+        self.assertEqual(asyncio.run(scheduler.call(1, send)), "ok")
+        with self.assertRaises(apihelper.ApiTelegramException):
+            asyncio.run(scheduler.call(1, fail))
+
+        self.assertGreaterEqual(attempts[1] - attempts[0], 0.05)
+        stats = scheduler.stats()
+        self.assertEqual((stats["retries"], stats["completed"], stats["failed"]), (2, 1, 1))
+
+    def test_chat_limit(self):
+        """Чат, исчерпавший свой лимит, ждет токен и не задерживает запросы других чатов."""
+
+        scheduler = AsyncSendScheduler(global_rate=0, chat_rate=10, chat_burst=1)
+        sent = []
+
+        async def send(text):
+            sent.append(text)
+
+        async def run():
+            await asyncio.gather(
+                scheduler.call(1, send, "first"), scheduler.call(1, send, "second"), scheduler.call(2, send, "other")
+            )
+
+        started = time.monotonic()
+        asyncio.run(run())
+
+        self.assertEqual(sent, ["first", "other", "second"])
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertGreaterEqual(scheduler.stats()["deferred"], 1)
+
+
+if __name__ == "__main__":
+    main()
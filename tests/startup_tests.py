@@ -0,0 +1,41 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import startup
+
+
+class StartupTest(TestCase):
+    """Тесты ожидания базы данных и прогрева кэшей при старте бота."""
+
+    def test_wait_for_database_retries_until_ready(self):
+        """Проверка готовности повторяется, пока база данных не ответит."""
+
+        with patch.object(startup.postgres_client, "is_ready", side_effect=[False, False, True]) as is_ready, \
+                patch.object(startup.time, "sleep"):
+            self.assertTrue(startup.wait_for_database(timeout=60))
+        self.assertEqual(is_ready.call_count, 3)
+
+    def test_wait_for_database_gives_up(self):
+        """По истечении времени ожидания возвращается False."""
+
+        with patch.object(startup.postgres_client, "is_ready", return_value=False):
+            self.assertFalse(startup.wait_for_database(timeout=0))
+
+    def test_warm_up_collects_failures(self):
+        """Ошибки отдельных шагов прогрева не прерывают остальные шаги."""
+
+        with patch.object(startup.postgres_client.pool, "fill", side_effect=OSError("нет соединения")), \
+                patch.object(startup, "refresh_schema_state"), \
+                patch.object(startup, "get_start_keyboard"), \
+                patch.object(startup, "get_menu_keyboard"), \
+                patch.object(startup, "get_admin_keyboard"), \
+                patch.object(startup, "get_all_categories_data", return_value=[(1, "Супы"), (2, "Напитки")]), \
+                patch.object(startup, "get_dishes_keyboard") as get_dishes_keyboard:
+            failures = startup.warm_up(workers=2)
+
+        self.assertEqual(failures, ["пул соединений: нет соединения"])
+        self.assertEqual(sorted(call.args for call in get_dishes_keyboard.call_args_list), [(1,), (2,)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from state_store import MemoryLastMessageStore
+
+
+class MemoryLastMessageStoreTest(TestCase):
+    """Тесты хранилища последних сообщений в памяти MemoryLastMessageStore."""
+
+    def test_chats_isolated(self):
+        """Последнее сообщение хранится отдельно для каждого чата."""
+
+        store = MemoryLastMessageStore()
+        self.assertIsNone(store.swap(1, 10))
+        self.assertIsNone(store.swap(2, 20))
+
+        self.assertEqual(store.swap(1, 11), 10)
+        self.assertEqual(store.swap(2, 21), 20)
+
+    def test_lru_eviction(self):
+        """При превышении maxsize забывается давно не активный чат."""
+
+        store = MemoryLastMessageStore(maxsize=2)
+        store.swap(1, 10)
+        store.swap(2, 20)
+        store.swap(1, 11)
+        store.swap(3, 30)
+
+        self.assertEqual(store.stats()["chats"], 2)
+        self.assertIsNone(store.swap(2, 21))
+        self.assertEqual(store.swap(3, 31), 30)
+
+    def test_expired_message_not_returned(self):
+        """Сообщение старше ttl не возвращается для удаления."""
+
+        store = MemoryLastMessageStore(ttl=60)
+        with patch("state_store.time.monotonic", return_value=0):
+            store.swap(1, 10)
+        with patch("state_store.time.monotonic", return_value=61):
+            self.assertIsNone(store.swap(1, 11))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import json
+import threading
+from unittest import TestCase, main
+from urllib import request
+from urllib.error import HTTPError
+
+from webhook_server import WebhookServer, SECRET_TOKEN_HEADER
+
+
+class FakeBot:
+    """Заглушка бота, которая запоминает переданные ей обновления."""
+
+    def __init__(self, release=None):
+        self.updates = []
+        self.processed = threading.Event()
+        self.release = release
+
+    def process_new_updates(self, updates):
+        if self.release is not None:
+            self.release.wait(5)
+        self.updates.extend(updates)
+        self.processed.set()
+
+
+class FakeTelegramClient:
+    """Заглушка Telegram, отправляющая обновления на вебхук так же, как это делают серверы Telegram."""
+
+    def __init__(self, url, secret_token=None):
+        self.url = url
+        self.secret_token = secret_token
+        self.update_id = 0
+
+    def send_callback(self, data: str) -> int:
+        self.update_id += 1
+        return self.send(
+            {
+                "update_id": self.update_id,
+                "callback_query": {
+                    "id": str(self.update_id),
+                    "from": {"id": 1, "is_bot": False, "first_name": "Тест"},
+                    "chat_instance": "1",
+                    "data": data,
+                    "message": {
+                        "message_id": 10,
+                        "date": 0,
+                        "chat": {"id": 1, "type": "private"},
+                        "text": "Выберите действие:",
+                    },
+                },
+            }
+        )
+
+    def send(self, update) -> int:
+        body = update if isinstance(update, bytes) else json.dumps(update).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.secret_token:
+            headers[SECRET_TOKEN_HEADER] = self.secret_token
+        try:
+            with request.urlopen(request.Request(self.url, data=body, headers=headers)) as response:
+                return response.status
+        except HTTPError as error:
+            return error.code
+
+
+class WebhookServerTest(TestCase):
+    """Тесты приема обновлений встроенным вебхук-сервером WebhookServer."""
+
+    def start_server(self, bot, **parameters):
+        server = WebhookServer(bot, host="127.0.0.1", port=0, secret_token="secret", **parameters)
+        server.start()
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address
+        return server, f"http://{host}:{port}/webhook"
+
+    def test_update_processed(self):
+        """Корректное обновление передается боту."""
+
+        bot = FakeBot()
+        _, url = self.start_server(bot)
+
+        self.assertEqual(FakeTelegramClient(url, "secret").send_callback("menu"), 200)
+        self.assertTrue(bot.processed.wait(5))
+        self.assertEqual(bot.updates[0].callback_query.data, "menu")
+
+    def test_wrong_secret_rejected(self):
+        """Запрос без правильного секретного токена отклоняется."""
+
+        bot = FakeBot()
+        _, url = self.start_server(bot)
+
+        self.assertEqual(FakeTelegramClient(url, "wrong").send_callback("menu"), 403)
+        self.assertEqual(FakeTelegramClient(url).send_callback("menu"), 403)
+        self.assertEqual(bot.updates, [])
+
+    def test_malformed_update_rejected(self):
+        """Тело запроса, не являющееся обновлением Telegram, отклоняется."""
+
+        _, url = self.start_server(FakeBot())
+        client = FakeTelegramClient(url, "secret")
+
+        self.assertEqual(client.send(b"not json"), 400)
+        self.assertEqual(client.send({"message": {}}), 400)
+
+    def test_overload_rejected(self):
+        """Если пул обработки и очередь заполнены, сервер отвечает 503."""
+
+        release = threading.Event()
+        server, url = self.start_server(FakeBot(release), workers=1, queue_size=1)
+        client = FakeTelegramClient(url, "secret")
+
+        statuses = [client.send_callback("menu") for _ in range(3)]
+        release.set()
+
+        self.assertEqual(statuses, [200, 200, 503])
+        self.assertEqual(server.stats()["rejected"], 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import threading
+import time
+from unittest import TestCase, main
+
+from write_behind import WriteBehindQueue, OVERFLOW_DROP
+
+
+class WriteBehindQueueTest(TestCase):
+    """Тесты фоновой очереди записи WriteBehindQueue."""
+
+    def setUp(self):
+        self.batches = []
+        self.flushed = threading.Event()
+
+    def flush(self, batch):
+        self.batches.append(list(batch))
+        self.flushed.set()
+
+    def test_flush_on_batch_size(self):
+        """Пачка сбрасывается, как только набирается batch_size записей."""
+
+        writer = WriteBehindQueue(self.flush, batch_size=3, flush_interval=60)
+        for item in range(3):
+            writer.put(item)
+
+        self.assertTrue(self.flushed.wait(5))
+        self.assertEqual(self.batches, [[0, 1, 2]])
+        writer.close()
+
+    def test_flush_on_interval(self):
+        """Неполная пачка сбрасывается по истечении flush_interval."""
+
+        writer = WriteBehindQueue(self.flush, batch_size=100, flush_interval=0.05)
+        writer.put("a")
+
+        self.assertTrue(self.flushed.wait(5))
+        self.assertEqual(self.batches, [["a"]])
+        writer.close()
+
+    def test_close_flushes_remaining(self):
+        """При закрытии очереди все накопленные записи попадают в базу."""
+
+        writer = WriteBehindQueue(self.flush, batch_size=100, flush_interval=60)
+        for item in range(5):
+            writer.put(item)
+        writer.close()
+
+        self.assertEqual(sum(self.batches, []), [0, 1, 2, 3, 4])
+        self.assertEqual(writer.stats()["written"], 5)
+        self.assertFalse(writer.put(6))
+
+    def test_drop_on_overflow(self):
+        """При переполнении очереди в режиме drop запись отбрасывается и учитывается в статистике."""
+
+        release = threading.Event()
+
+        def slow_flush(batch):
+            release.wait(5)
+            self.flush(batch)
+
+        writer = WriteBehindQueue(
+            slow_flush, batch_size=1, flush_interval=60, max_queue_size=1, overflow=OVERFLOW_DROP
+        )
+        results = [writer.put(item) for item in range(4)]
+        release.set()
+        writer.close()
+
+        self.assertIn(False, results)
+        self.assertEqual(writer.stats()["dropped"], results.count(False))
+
+    def test_put_without_blocking(self):
+        """С block=False запись отбрасывается сразу, даже если очередь настроена ждать освобождения места."""
+
+        release = threading.Event()
+
+        def slow_flush(batch):
+            release.wait(5)
+            self.flush(batch)
+
+        writer = WriteBehindQueue(slow_flush, batch_size=1, flush_interval=60, max_queue_size=1, put_timeout=5)
+        started = time.monotonic()
+        results = [writer.put(item, block=False) for item in range(4)]
+        elapsed = time.monotonic() - started
+        release.set()
+        writer.close()
+
+        self.assertLess(elapsed, 1)
+        self.assertIn(False, results)
+        self.assertEqual(writer.stats()["dropped"], results.count(False))
+
+    def test_flush_error_counted(self):
+        """Ошибка записи пачки не останавливает очередь и учитывается в статистике."""
+
+        def failing_flush(batch):
+            raise RuntimeError("база недоступна")
+
+        writer = WriteBehindQueue(failing_flush, batch_size=10, flush_interval=60, max_retries=2, retry_delay=0)
+        writer.put(1)
+        writer.put(2)
+        writer.close()
+
+        self.assertEqual(writer.stats()["failed"], 2)
+        self.assertEqual(writer.stats()["retries"], 2)
+
+    def test_flush_retried_after_transient_error(self):
+        """Пачка, которую не удалось записать из-за временной ошибки базы, записывается повторной попыткой."""
+
+        attempts = []
+
+        def flaky_flush(batch):
+            attempts.append(list(batch))
+            if len(attempts) < 3:
+                raise RuntimeError("переключение на реплику")
+            self.flush(batch)
+
+        writer = WriteBehindQueue(flaky_flush, batch_size=2, flush_interval=60, retry_delay=0.01)
+        writer.put(1)
+        writer.put(2)
+        self.assertTrue(self.flushed.wait(5))
+        writer.close()
+
+        self.assertEqual(self.batches, [[1, 2]])
+        self.assertEqual(len(attempts), 3)
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["failed"], stats["retries"]), (2, 0, 2))
+
+    def test_bad_rows_dropped_from_split_batch(self):
+        """Пачка с ошибочными записями делится, и отбрасываются только они, а остальные записываются без повторов."""
+
+        def flush(batch):
+            if any(item < 0 for item in batch):
+                raise ValueError("нарушение внешнего ключа")
+            self.flush(batch)
+
+        writer = WriteBehindQueue(
+            flush, batch_size=8, flush_interval=60, retry_errors=(ConnectionError,), split_errors=(ValueError,)
+        )
+        for item in (1, 2, -3, 4, 5, 6, -7, 8):
+            writer.put(item)
+        with self.assertLogs("write_behind", "WARNING"):
+            writer.close()
+
+        self.assertEqual(sorted(sum(self.batches, [])), [1, 2, 4, 5, 6, 8])
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["failed"], stats["retries"]), (6, 2, 0))
+
+    def test_permanent_error_not_retried(self):
+        """Ошибка, которой нет в retry_errors, не повторяется, и пачка сразу учитывается как не записанная."""
+
+        attempts = []
+
+        def flush(batch):
+            attempts.append(batch)
+            raise LookupError("таблица не существует")
+
+        writer = WriteBehindQueue(flush, batch_size=10, flush_interval=60, retry_errors=(ConnectionError,))
+        writer.put(1)
+        writer.put(2)
+        with self.assertLogs("write_behind", "ERROR"):
+            writer.close()
+
+        self.assertEqual(len(attempts), 1)
+        self.assertEqual((writer.stats()["failed"], writer.stats()["retries"]), (2, 0))
+
+    def test_counters_from_many_threads(self):
+        """Счетчики очереди не теряют обновлений, когда записи ставят в очередь несколько потоков одновременно."""
+
+        writer = WriteBehindQueue(lambda batch: None, batch_size=100, flush_interval=0.01, max_queue_size=100000)
+        threads = [
+            threading.Thread(target=lambda: [writer.put(item) for item in range(2000)]) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        stats = writer.stats()
+        self.assertEqual((stats["enqueued"], stats["written"]), (16000, 16000))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,27 @@
 from typing import Optional, List
 
 from config import ADMIN_CHAT_ID
-from db_services import get_all_tables_name_from_db
+from db_services import is_table_in_db
 
 
 def get_menu_validator() -> Optional[bool]:
     """Проверяет, есть ли в базе данных таблица с названиями категорий меню."""
 
-    all_tables_in_db = get_all_tables_name_from_db()
-    if ("menu_categories",) in all_tables_in_db:
+    if is_table_in_db("menu_categories"):
         return True
 
 
+def admin_chat_validator(chat_id: int) -> bool:
+    """
+    Проверяет, является ли чат chat_id чатом администратора.
+
+    Список id админов берётся из переменной окружения. По умолчанию используется заглушка.
+    """
+
+    admin_chat_id = ADMIN_CHAT_ID or "0000000000"
+    return str(chat_id) in admin_chat_id.split()
+
+
 def price_validator(price: str) -> bool:
     """Проверяет, является ли строка с информацией о цене товара числом и больше 0."""
 
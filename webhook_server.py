@@ -0,0 +1,153 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from telebot import types
+
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """
+    HTTP-сервер для приема обновлений Telegram через вебхук.
+
+    Принимает POST-запросы на path, проверяет секретный токен из заголовка X-Telegram-Bot-Api-Secret-Token,
+    разбирает обновление и передает его в bot.process_new_updates в ограниченном пуле потоков.
+    Если все workers потоков заняты и в очереди уже queue_size обновлений, сервер отвечает 503, и Telegram
+    повторит доставку обновления позже.
+    """
+
+    def __init__(
+        self,
+        bot: Any,
+        host: str = "0.0.0.0",
+        port: int = 8443,
+        path: str = "/webhook",
+        secret_token: Optional[str] = None,
+        workers: int = 4,
+        queue_size: int = 100,
+    ):
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._received = 0
+        self._rejected = 0
+        self._failed = 0
+        self._http_server = ThreadingHTTPServer((host, port), _make_request_handler(self))
+
+    @property
+    def server_address(self):
+        """Возвращает адрес и порт, на которых слушает сервер."""
+
+        return self._http_server.server_address
+
+    def serve_forever(self) -> None:
+        """Запускает обработку запросов в текущем потоке до вызова shutdown."""
+
+        self._http_server.serve_forever()
+
+    def start(self) -> threading.Thread:
+        """Запускает обработку запросов в фоновом потоке и возвращает этот поток."""
+
+        thread = threading.Thread(target=self.serve_forever, name="webhook-server", daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self) -> None:
+        """Останавливает прием запросов и дожидается обработки уже принятых обновлений."""
+
+        self._http_server.shutdown()
+        self._http_server.server_close()
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счетчики принятых, отклоненных из-за перегрузки и упавших при обработке обновлений."""
+
+        with self._lock:
+            return {
+                "received": self._received,
+                "rejected": self._rejected,
+                "failed": self._failed,
+            }
+
+    def handle_update(self, headers: Any, body: bytes) -> int:
+        """Проверяет и разбирает тело запроса с обновлением и ставит его в обработку. Возвращает HTTP-статус ответа."""
+
+        if self.secret_token and headers.get(SECRET_TOKEN_HEADER) != self.secret_token:
+            return 403
+
+        try:
+            update = types.Update.de_json(json.loads(body.decode("utf-8")))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400
+        if update is None:
+            return 400
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            return 503
+
+        with self._lock:
+            self._received += 1
+        self._executor.submit(self._process_update, update)
+        return 200
+
+    def _process_update(self, update: types.Update) -> None:
+        """Передает обновление обработчикам бота и освобождает место в очереди."""
+
+        try:
+            self.bot.process_new_updates([update])
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            logger.exception("Ошибка при обработке обновления %s.", update.update_id)
+        finally:
+            self._slots.release()
+
+
+def _make_request_handler(server: WebhookServer):
+    """Создает класс обработчика HTTP-запросов, привязанный к серверу server."""
+
+    class WebhookRequestHandler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            if self.path != server.path:
+                self._reply(404)
+                return
+
+            length = int(self.headers.get("Content-Length") or 0)
+            self._reply(server.handle_update(self.headers, self.rfile.read(length)))
+
+        def _reply(self, status: int) -> None:
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug(format, *args)
+
+    return WebhookRequestHandler
+
+
+def run_webhook_server(bot: Any, url: str, **server_parameters: Any) -> None:
+    """
+    Регистрирует вебхук url в Telegram и обрабатывает входящие обновления до остановки процесса.
+
+    Параметры server_parameters передаются в WebhookServer.
+    """
+
+    server = WebhookServer(bot, **server_parameters)
+    bot.set_webhook(url=url, secret_token=server.secret_token)
+    try:
+        server.serve_forever()
+    finally:
+        server.shutdown()
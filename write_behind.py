@@ -0,0 +1,249 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP = "drop"
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Фоновая очередь отложенной записи в базу данных.
+
+    Записи складываются в ограниченную очередь и сбрасываются фоновым потоком пачками через функцию flush, как только
+    набирается batch_size записей или проходит flush_interval секунд с момента первой записи в пачке.
+
+    При переполнении очереди поведение задается параметром overflow: OVERFLOW_BLOCK - ждать освобождения места не
+    дольше put_timeout секунд, OVERFLOW_DROP - сразу отбросить запись. Отброшенные записи учитываются в stats().
+    Если пачку не удалось записать из-за ошибки из retry_errors, например на время перезапуска базы данных, запись
+    повторяется до max_retries раз с паузой retry_delay секунд, которая удваивается после каждой попытки. Пачка
+    с ошибкой из split_errors, например с нарушением внешнего ключа в одной из записей, делится пополам до тех пор,
+    пока не останутся отдельные ошибочные записи, и отбрасываются только они. Остальные ошибки не повторяются.
+    Перед завершением процесса оставшиеся записи сбрасываются в базу.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], None],
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000,
+        overflow: str = OVERFLOW_BLOCK,
+        put_timeout: float = 1.0,
+        max_retries: int = 5,
+        retry_delay: float = 0.5,
+        retry_errors: Tuple[Type[BaseException], ...] = (Exception,),
+        split_errors: Tuple[Type[BaseException], ...] = (),
+        name: str = "write-behind",
+    ):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP):
+            raise ValueError(f"Неизвестное поведение при переполнении очереди: {overflow}.")
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.retry_errors = retry_errors
+        self.split_errors = split_errors
+        self.name = name
+        self._flush = flush
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+
+        # счетчики обновляют одновременно потоки обработчиков и фоновый поток записи
+        self._stats_lock = threading.Lock()
+        self._enqueued = 0
+        self._dropped = 0
+        self._written = 0
+        self._failed = 0
+        self._retries = 0
+        self._batches = 0
+
+    def put(self, item: Any, block: bool = True) -> bool:
+        """
+        Ставит запись в очередь. Возвращает False, если запись отброшена из-за переполнения или закрытия очереди.
+
+        С block=False запись при переполнении отбрасывается сразу, даже при OVERFLOW_BLOCK: так ставят записи из
+        цикла событий asyncio, который нельзя останавливать на put_timeout секунд.
+        """
+
+        if self._closed:
+            self._count("_dropped")
+            return False
+        self._ensure_started()
+
+        try:
+            if block and self.overflow == OVERFLOW_BLOCK:
+                self._queue.put(item, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            self._count("_dropped")
+            logger.warning("Очередь %s переполнена, запись отброшена.", self.name)
+            return False
+
+        self._count("_enqueued")
+        return True
+
+    def flush(self) -> None:
+        """Синхронно сбрасывает в базу все записи, находящиеся в очереди."""
+
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Останавливает фоновый поток и сбрасывает в базу все оставшиеся записи."""
+
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает глубину очереди и счетчики принятых, записанных, отброшенных и не записанных из-за ошибок записей.
+
+        retries - количество повторных попыток записи пачек после ошибок.
+        """
+
+        with self._stats_lock:
+            return {
+                "depth": self._queue.qsize(),
+                "max_depth": self._queue.maxsize,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "retries": self._retries,
+                "batches": self._batches,
+            }
+
+    def _count(self, counter: str, value: int = 1) -> None:
+        """Увеличивает счетчик counter на value под блокировкой."""
+
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+    def _ensure_started(self) -> None:
+        """Запускает фоновый поток при первой записи в очередь."""
+
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        """Цикл фонового потока: собирает пачки записей и сбрасывает их в базу."""
+
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[Any]) -> None:
+        """
+        Передает пачку записей в функцию flush, повторяя запись после временных ошибок.
+
+        Записи, которые не удалось записать, логируются и учитываются в stats().
+        """
+
+        with self._flush_lock:
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Any]) -> None:
+        """Записывает пачку batch, повторяя ее после ошибок из retry_errors и деля после ошибок из split_errors."""
+
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._flush(batch)
+            except self.split_errors:
+                if len(batch) == 1:
+                    self._count("_failed")
+                    logger.exception("Запись очереди %s отброшена из-за ошибки в ее данных.", self.name)
+                    return
+                logger.warning(
+                    "В пачке из %s записей очереди %s есть ошибочные записи, пачка записывается по частям.",
+                    len(batch),
+                    self.name,
+                    exc_info=True,
+                )
+                middle = len(batch) // 2
+                self._write_batch(batch[:middle])
+                self._write_batch(batch[middle:])
+                return
+            except self.retry_errors:
+                if attempt == self.max_retries:
+                    self._count("_failed", len(batch))
+                    logger.exception("Не удалось записать пачку из %s записей очереди %s.", len(batch), self.name)
+                    return
+                logger.warning(
+                    "Не удалось записать пачку из %s записей очереди %s, повтор через %s сек.",
+                    len(batch),
+                    self.name,
+                    delay,
+                    exc_info=True,
+                )
+                self._count("_retries")
+                time.sleep(delay)
+                delay *= 2
+            except Exception:
+                self._count("_failed", len(batch))
+                logger.exception("Не удалось записать пачку из %s записей очереди %s.", len(batch), self.name)
+                return
+            else:
+                with self._stats_lock:
+                    self._written += len(batch)
+                    self._batches += 1
+                return